@@ -0,0 +1,68 @@
+"""
+Benchmarks of the time to import the modules of quantlaw. Each module is imported
+in a fresh interpreter, as e.g. each worker process or command line invocation
+does. The time of an interpreter that imports nothing is subtracted.
+
+Run from the root of the repository with
+`python -m benchmarks.bench_import --budget 150`.
+The exit code is 1 if the median import time of a module exceeds the budget in
+milliseconds.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+modules = (
+    "quantlaw",
+    "quantlaw.de_extract.statutes_areas",
+    "quantlaw.de_extract.statutes_parse",
+    "quantlaw.de_extract.statutes_engine",
+    "quantlaw.utils.networkx",
+    "quantlaw.utils.beautiful_soup",
+    "quantlaw.de_extract.cli",
+)
+
+
+def time_import(module, repeat=5):
+    """
+    Returns: The median seconds to start an interpreter and import a module
+    """
+    env = dict(os.environ)
+    src_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_path, env.get("PYTHONPATH")]))
+    statement = f"import {module}" if module else "pass"
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], env=env, check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def bench_import(budget_ms=None, repeat=5):
+    """
+    Returns: True if all modules are imported within the budget
+    """
+    baseline = time_import(None, repeat)
+    within_budget = True
+    for module in modules:
+        milliseconds = (time_import(module, repeat) - baseline) * 1000
+        exceeded = budget_ms is not None and milliseconds > budget_ms
+        within_budget &= not exceeded
+        print(
+            f"import {module:40} {milliseconds:8.1f} ms"
+            + (" exceeds budget" if exceeded else "")
+        )
+    return within_budget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget", type=float, help="Budget in milliseconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if bench_import(args.budget, args.repeat) else 1)
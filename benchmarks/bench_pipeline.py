@@ -0,0 +1,97 @@
+"""
+Benchmarks for quantlaw.utils.pipeline
+
+Run from the root of the repository with `python -m benchmarks.bench_pipeline`.
+"""
+
+import random
+import time
+import timeit
+
+from quantlaw.utils.pipeline import PipelineStep
+
+
+class SleepStep(PipelineStep):
+    """
+    Step whose items are the seconds to sleep. Sleeping does not occupy a core,
+    so that the scheduling can be measured on machines with few cores.
+    """
+
+    def get_item_cost(self, item):
+        return item
+
+    def execute_item(self, item):
+        time.sleep(item)
+        return item
+
+
+class SleepStepLargestFirst(SleepStep):
+    largest_first = True
+
+
+class SleepStepAdaptive(SleepStep):
+    adaptive_chunksize = True
+
+
+class SleepStepOneByOne(SleepStep):
+    # Dispatches the items one by one
+    chunksize = 1
+
+
+def generate_skewed_items(n_items=200, n_large=3, seed=0):
+    """
+    Returns: Many small items and a few large ones at the end, e.g. the large
+        statutes at the end of a sorted list of files.
+    """
+    rnd = random.Random(seed)
+    small = [rnd.uniform(0.001, 0.01) for _ in range(n_items - n_large)]
+    large = [rnd.uniform(0.2, 0.4) for _ in range(n_large)]
+    return small + large
+
+
+def bench_largest_first(processes=4, repeat=3):
+    items = generate_skewed_items()
+    lower_bound = max(max(items), sum(items) / processes)
+    for step_class in [SleepStep, SleepStepLargestFirst]:
+        step = step_class(processes=processes)
+        makespans = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            step.execute_items(items)
+            makespans.append(time.perf_counter() - start)
+        print(
+            f"{step_class.__name__:22} makespan {min(makespans):6.3f} s "
+            f"(lower bound {lower_bound:.3f} s)"
+        )
+    print("Duration stats of the last run:", step.get_duration_stats())
+
+
+def bench_adaptive_chunksize(processes=4, repeat=3):
+    for name, items in [
+        ("fast items", [0.0] * 20000),
+        ("slow items", [0.05] * 80),
+    ]:
+        for step_class in [
+            SleepStep,
+            SleepStepOneByOne,
+            SleepStepLargestFirst,
+            SleepStepAdaptive,
+        ]:
+            step = step_class(processes=processes)
+            seconds = min(
+                timeit.repeat(
+                    lambda: step.execute_items(items), number=1, repeat=repeat
+                )
+            )
+            report = ""
+            if step.chosen_chunksize:
+                report = (
+                    f"chunksize {step.chosen_chunksize:4} "
+                    f"IPC overhead {step.ipc_overhead_fraction:6.1%}"
+                )
+            print(f"{name} {step_class.__name__:22} {seconds:6.3f} s {report}")
+
+
+if __name__ == "__main__":
+    bench_largest_first()
+    bench_adaptive_chunksize()
@@ -0,0 +1,149 @@
+"""
+Benchmarks for quantlaw.de_extract.statutes_areas
+
+Run from the root of the repository with
+`python -m benchmarks.bench_statutes_areas`.
+"""
+
+import multiprocessing
+import os
+import random
+import timeit
+
+from benchmarks.corpus import (
+    generate_law_names,
+    generate_laws_lookup,
+    generate_statute_texts,
+)
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_areas_patterns import reference_range_pattern
+
+WORDS = (
+    "die der das und oder wird kann soll muss gilt Behörde Bundes Landes Aufgabe "
+    "Verordnung Gesetz Antrag Frist Artenschutz Start Partei Arbeit"
+).split()
+
+
+def generate_sparse_text(n_words=200000, n_citations=5, seed=0):
+    """
+    Returns: A text that contains only a few citations but many words
+        containing "art", which are false candidates of the trigger scan.
+    """
+    rnd = random.Random(seed)
+    words = [rnd.choice(WORDS) for _ in range(n_words)]
+    for _ in range(n_citations):
+        words.insert(rnd.randrange(n_words), "§ 12 Abs. 3 Satz 1 des Grundgesetzes")
+    return " ".join(words)
+
+
+def unfiltered_search_main_area(text, pos=0):
+    return reference_range_pattern.search(text, pos)
+
+
+def bench_search_main_area(text, repeat=3):
+    for name, func in [
+        ("reference_range_pattern.search", unfiltered_search_main_area),
+        ("StatutesExtractor.search_main_area", StatutesExtractor.search_main_area),
+    ]:
+
+        def run():
+            pos = 0
+            match = func(text, pos)
+            while match:
+                match = func(text, match.end())
+
+        seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+        print(f"{name:40} {len(text) / seconds / 1e6:8.2f} MB/s")
+
+
+worker_extractor = None
+
+
+def init_worker(laws_lookup):
+    global worker_extractor
+    worker_extractor = StatutesExtractor(laws_lookup)
+
+
+def find_all_spans(text):
+    """
+    Returns: The matches of text as tuples, to avoid pickling the text with each
+        match.
+    """
+    return [
+        (
+            (m.start, m.end, m.suffix_len, m.law_len, m.law_match_type)
+            if m.has_main_area()
+            else (m.start, m.end)
+        )
+        for m in worker_extractor.find_all(text)
+    ]
+
+
+def bench_parallel_find_all(n_documents=64, n_sentences=500, workers=None, repeat=3):
+    """
+    Compares the extraction of several texts in a thread pool that shares one
+    extractor with a process pool that holds one extractor per worker.
+    """
+    workers = workers or os.cpu_count()
+    law_names = generate_law_names(5000)
+    laws_lookup = generate_laws_lookup(law_names)
+    texts = generate_statute_texts(
+        n_documents=n_documents, n_sentences=n_sentences, law_names=law_names
+    )
+    n_chars = sum(len(text) for text in texts)
+
+    extractor = StatutesExtractor(laws_lookup)
+    concurrent_extractor = StatutesExtractor(laws_lookup, concurrent=True)
+
+    def process_pool():
+        with multiprocessing.Pool(workers, init_worker, (laws_lookup,)) as pool:
+            pool.map(find_all_spans, texts, chunksize=1)
+
+    for name, func in [
+        ("sequential", lambda: [list(extractor.find_all(t)) for t in texts]),
+        ("threads", lambda: extractor.find_all_in_texts(texts, workers)),
+        (
+            "threads, concurrent=True",
+            lambda: concurrent_extractor.find_all_in_texts(texts, workers),
+        ),
+        ("process pool", process_pool),
+    ]:
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(f"{name:28} {workers:3} workers {n_chars / seconds / 1e6:8.2f} MB/s")
+
+
+def bench_find_all_in_windows(
+    n_sentences=20000, window_sizes=(250000, 1000000), workers=None, repeat=3
+):
+    """
+    Compares find_all with find_all_in_windows on a single large text. The windows
+    are searched in a process pool, so that the speedup scales with the number of
+    CPUs minus the time to copy the slices of the text to the processes.
+    """
+    workers = workers or os.cpu_count()
+    law_names = generate_law_names(5000)
+    laws_lookup = generate_laws_lookup(law_names)
+    text = generate_statute_texts(
+        n_documents=1, n_sentences=n_sentences, law_names=law_names
+    )[0]
+    extractor = StatutesExtractor(laws_lookup)
+
+    runs = [("find_all", lambda: list(extractor.find_all(text)))]
+    for window_size in window_sizes:
+        runs.append(
+            (
+                f"find_all_in_windows({window_size})",
+                lambda size=window_size: extractor.find_all_in_windows(
+                    text, size, workers
+                ),
+            )
+        )
+    for name, func in runs:
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(f"{name:32} {workers:3} workers {len(text) / seconds / 1e6:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    bench_search_main_area(generate_sparse_text())
+    bench_parallel_find_all()
+    bench_find_all_in_windows()
@@ -0,0 +1,65 @@
+"""
+Benchmarks for quantlaw.de_extract.statutes_mentions
+
+Run from the root of the repository with
+`python -m benchmarks.bench_statutes_mentions`.
+"""
+
+import timeit
+
+from benchmarks.corpus import (
+    generate_law_names,
+    generate_laws_lookup,
+    generate_statute_texts,
+)
+from quantlaw.de_extract.statutes_abstract import StatutesProcessor
+from quantlaw.de_extract.statutes_areas_patterns import law_name_token_pattern
+from quantlaw.de_extract.statutes_mentions import LawNameScanner
+from quantlaw.de_extract.stemming import stem_law_name
+
+
+def match_law_name_at_word_boundaries(processor, text):
+    """
+    The approach without LawNameScanner: Calls match_law_name at every word of the
+    stemmed text.
+    """
+    stemmed = "".join(
+        stem_law_name(token) if token.strip() == token else " "
+        for token in law_name_token_pattern.findall(text)
+    )
+    mentions = []
+    pos = 0
+    for token in law_name_token_pattern.findall(stemmed):
+        if token[0].isalnum() and pos >= (mentions[-1][1] if mentions else 0):
+            law_name = processor.match_law_name(stemmed[pos:])
+            if law_name:
+                end = pos + len(law_name)
+                if end == len(stemmed) or not stemmed[end].isalnum():
+                    mentions.append((pos, end))
+        pos += len(token)
+    return mentions
+
+
+def bench_law_name_scanner(n_laws=(100, 1000, 5000), n_sentences=2000, repeat=3):
+    for n in n_laws:
+        law_names = generate_law_names(n)
+        laws_lookup = generate_laws_lookup(law_names)
+        text = generate_statute_texts(
+            n_documents=1, n_sentences=n_sentences, law_names=law_names
+        )[0]
+        processor = StatutesProcessor(laws_lookup)
+        scanner = LawNameScanner(laws_lookup)
+        runs = [
+            (
+                "match_law_name",
+                lambda: match_law_name_at_word_boundaries(processor, text),
+            ),
+            ("LawNameScanner.find_all", lambda: scanner.find_all(text)),
+        ]
+        for name, func in runs:
+            seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+            print(f"{name:24} {n:5} laws {len(text) / seconds / 1e6:8.3f} MB/s")
+
+
+if __name__ == "__main__":
+    bench_law_name_scanner()
@@ -0,0 +1,218 @@
+"""
+Benchmarks for quantlaw.de_extract.statutes_parse
+
+Run with `python benchmarks/bench_statutes_parse.py`.
+"""
+
+import timeit
+import tracemalloc
+
+from regex import regex
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.de_extract.statutes_parse_patterns import numb_ff_pattern, sgb_dict
+from quantlaw.de_extract.statutes_reference_path import ReferencePath
+from quantlaw.de_extract.stemming import stem_law_name
+
+
+def generate_citations(n_sections=200):
+    return [
+        f"§ {i} Abs. {j} Satz 1, 2 und 3 Nr. {k}"
+        for i in range(n_sections)
+        for j in range(1, 4)
+        for k in range(1, 6)
+    ]
+
+
+def bench_parse_main_compact(citations, repeat=3):
+    parser = StatutesParser({})
+    for compact in [False, True]:
+        ReferencePath.clear_interned()
+        tracemalloc.start()
+        results = [parser.parse_main(c, compact=compact) for c in citations]
+        # Memory of the results without the cache of the parser
+        parser.citation_parts.clear()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del results
+
+        seconds = min(
+            timeit.repeat(
+                lambda: [parser.parse_main(c, compact=compact) for c in citations],
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"parse_main(compact={compact!s:5}) "
+            f"{len(citations) / seconds:10.0f} citations/s "
+            f"{memory / len(citations):8.0f} bytes/citation"
+        )
+
+
+def generate_enumeration(n_parts):
+    """
+    Returns: A citation with a long enumeration. E.g. "§§ 1, 2, 3, ... 200"
+    """
+    return "§§ " + ", ".join(str(i) for i in range(1, n_parts + 1))
+
+
+def quadratic_infer_units_loop(parser, reference_paths):
+    """
+    Loop to infer units as implemented before positional iteration was used
+    """
+    for reference_path in reference_paths[1:]:
+        prev_reference_path = reference_paths[reference_paths.index(reference_path) - 1]
+        parser.infer_units(reference_path, prev_reference_path)
+
+
+def linear_infer_units_loop(parser, reference_paths):
+    prev_unit_ranks = None
+    for prev_reference_path, reference_path in zip(
+        reference_paths, reference_paths[1:]
+    ):
+        parser.infer_units(reference_path, prev_reference_path, prev_unit_ranks)
+        prev_unit_ranks = parser.get_unit_ranks(part[0] for part in reference_path)
+
+
+def bench_infer_units_enumeration(sizes=(100, 1000, 5000), repeat=3):
+    parser = StatutesParser({})
+    for n_parts in sizes:
+        citation = generate_enumeration(n_parts)
+        for name, loop in [
+            ("quadratic", quadratic_infer_units_loop),
+            ("linear", linear_infer_units_loop),
+        ]:
+
+            def run():
+                reference_paths = [
+                    list(parser.split_citation_part(string))
+                    for enum_part in parser.split_citation_into_enum_parts(citation)
+                    for string in enum_part
+                ]
+                loop(parser, reference_paths)
+
+            seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+            print(f"infer units {name:9} {n_parts:6} parts {seconds * 1000:10.2f} ms")
+
+        seconds = min(
+            timeit.repeat(lambda: parser.parse_main(citation), number=1, repeat=repeat)
+        )
+        print(f"parse_main            {n_parts:6} parts {seconds * 1000:10.2f} ms")
+
+
+def bench_parse_matches(n_citations=5000, repeat=3):
+    laws_lookup = {"grundgesetz": "GG", "buergerlich gesetzbuch": "BGB"}
+    text = " Lorem ipsum. ".join(
+        f"§ {i % 50} Abs. {i % 3 + 1} des {['Grundgesetzes', 'BGB'][i % 2]}"
+        for i in range(n_citations)
+    )
+    matches = list(StatutesExtractor(laws_lookup).find_all(text))
+    parser = StatutesParser(laws_lookup)
+
+    def loop():
+        for match in matches:
+            if match.has_main_area():
+                parser.parse_main(match.main_text())
+                parser.parse_law(match.law_text(), match.law_match_type, "ABC")
+
+    for name, func in [
+        ("per match loop", loop),
+        ("parse_matches", lambda: parser.parse_matches(matches, "ABC")),
+    ]:
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(f"{name:20} {len(matches) / seconds:10.0f} citations/s")
+
+
+def bench_parse_main_match(citations, repeat=3):
+    main_matches = [StatutesExtractor.search_main_area(c) for c in citations]
+    for name, func in [
+        ("parse_main", lambda p, m: p.parse_main(m[0])),
+        ("parse_main_match", lambda p, m: p.parse_main_match(m)),
+    ]:
+
+        def run():
+            # A new parser per run, as parse_main_match caches captured tokens
+            parser = StatutesParser({})
+            for main_match in main_matches:
+                func(parser, main_match)
+
+        seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+        print(f"{name:20} {len(main_matches) / seconds:10.0f} citations/s")
+
+
+def normalize_by_subs(citation):
+    """
+    Normalization of fix_errors_in_citation and split_citation_part as
+    implemented before the patterns were precompiled and merged
+    """
+    result = regex.sub(r"\s+", " ", citation)
+    result = regex.sub(r"§(?=\d)", "§ ", result)
+    result = regex.sub(r",\sbis\s", " bis ", result)
+    return regex.sub(
+        r"(\d+(?>\.\d+)?[a-z]?|\b[ivx]+|\b[a-z]\)?)(\sff?\.|\sff\b)",
+        r"\1ff.",
+        result,
+        flags=regex.IGNORECASE,
+    )
+
+
+def normalize_by_patterns(citation):
+    return numb_ff_pattern.sub(
+        r"\1ff.", StatutesParser.fix_errors_in_citation(citation)
+    )
+
+
+def bench_normalization(citations, repeat=3):
+    citations = citations + [c.replace(" ", "  ", 1) + " ff." for c in citations]
+    for name, func in [
+        ("regex.sub per call", normalize_by_subs),
+        ("precompiled", normalize_by_patterns),
+    ]:
+        seconds = min(
+            timeit.repeat(lambda: [func(c) for c in citations], number=1, repeat=repeat)
+        )
+        print(f"normalize {name:20} {len(citations) / seconds:10.0f} citations/s")
+
+
+def linear_sgb_lawid(parser, law_text):
+    """
+    Resolution of SGB law ids as implemented before laws_lookup_values was used
+    """
+    lawid = sgb_dict[stem_law_name(law_text)]
+    if type(lawid) is tuple:
+        if lawid[0] in parser.laws_lookup.values():
+            return lawid[0]
+        return lawid[1]
+    return lawid
+
+
+def bench_parse_law_sgb(n_laws=100000, n_citations=2000, repeat=3):
+    laws_lookup = {f"gesetz nr {i}": f"G-{i}" for i in range(n_laws)}
+    laws_lookup["sozialgesetzbuch neunt buch"] = "SGB-IX"
+    law_texts = [
+        ["SGB IX", "SGB X", "Neunten Buches Sozialgesetzbuch", "SGB 10"][i % 4]
+        for i in range(n_citations)
+    ]
+    for name, func in [
+        ("linear scan", lambda p, t: linear_sgb_lawid(p, t)),
+        ("parse_law", lambda p, t: p.parse_law(t, "sgb")),
+    ]:
+
+        def run():
+            parser = StatutesParser(laws_lookup)
+            for law_text in law_texts:
+                func(parser, law_text)
+
+        seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+        print(f"sgb {name:16} {n_citations / seconds:10.0f} citations/s")
+
+
+if __name__ == "__main__":
+    bench_parse_main_compact(generate_citations())
+    bench_parse_main_match(generate_citations())
+    bench_normalization(generate_citations())
+    bench_infer_units_enumeration()
+    bench_parse_matches()
+    bench_parse_law_sgb()
@@ -0,0 +1,257 @@
+"""
+Deterministic generators of synthetic German statute texts and crossreference graphs
+for benchmarks. The same arguments always produce the same output.
+"""
+
+import csv
+import gzip
+import os
+import random
+
+from quantlaw.de_extract.stemming import stem_law_name
+
+FILLER_WORDS = (
+    "die der das den dem des und oder nicht wird werden kann soll muss gilt ist "
+    "sind hat haben nach für von mit bei zur zum auf aus über unter sowie jedoch "
+    "Behörde Antrag Frist Bescheid Verfahren Anspruch Leistung Aufgabe Landes "
+    "Bundes Behörden Vorschrift Anwendung Zustimmung Verpflichtung Entscheidung "
+    "Artenschutz Partei Arbeitgeber Vertragsstaat Berichterstattung Start"
+).split()
+
+LAW_NAME_WORDS = (
+    "Verwaltungs Verfahrens Kosten Gebühren Umwelt Steuer Arbeits Sozial "
+    "Wohnungs Gewerbe Jugend Daten Energie Verkehrs Bau Straf Zivil Handels"
+).split()
+
+LAW_NAME_SUFFIXES = ["gesetz", "ordnung", "verordnung", "gesetzbuch"]
+
+# Different ways the units from unit_patterns are written in citations
+UNITS = [
+    ["Abs.", "Absatz", "Abs"],
+    ["Satz", "S."],
+    ["Nr.", "Nummer"],
+    ["Buchstabe", "Buchst."],
+    ["Halbsatz"],
+    ["Alternative", "Alt."],
+]
+
+CONNECTORS = [
+    ", ",
+    " und ",
+    " oder ",
+    " sowie ",
+    " bis ",
+    " i.V.m. ",
+    " in Verbindung mit ",
+]
+
+SGB_NAMES = [
+    "SGB IX",
+    "SGB X",
+    "SGB V",
+    "Zweiten Buches Sozialgesetzbuch",
+    "Neunten Buches Sozialgesetzbuch",
+    "Zehnten Buches Sozialgesetzbuch",
+]
+
+EU_NAMES = [
+    "Verordnung (EU) Nr. 1303/2013",
+    "Richtlinie 2006/123/EG",
+    "Verordnung (EG) Nr. 883/2004",
+    "Richtlinie 2011/83/EU",
+]
+
+IGNORE_NAMES = [
+    "Gesetzes vom 3. April 2020 (BGBl. I S. 999)",
+    "Anordnung vom 12. Mai 1999 (BGBl. I S. 123)",
+    "Abkommens zwischen der Bundesrepublik Deutschland und Frankreich",
+]
+
+
+def generate_law_names(n_laws=1000, seed=0):
+    """
+    Returns: A dict of law names and their abbreviations. E.g.
+        `{"Verwaltungskostengesetz 12": "VK12G"}`
+    """
+    rnd = random.Random(seed)
+    law_names = {"Bürgerliches Gesetzbuch": "BGB", "Grundgesetz": "GG"}
+    while len(law_names) < n_laws:
+        first, second = rnd.sample(LAW_NAME_WORDS, 2)
+        suffix = rnd.choice(LAW_NAME_SUFFIXES)
+        name = f"{first}{second.lower()}{suffix} {len(law_names)}"
+        law_names[name] = f"{first[0]}{second[0]}{len(law_names)}{suffix[0].upper()}"
+    return law_names
+
+
+def generate_laws_lookup(law_names):
+    """
+    Returns: A laws_lookup for StatutesProcessor that recognizes the law names and
+        their abbreviations.
+    """
+    laws_lookup = {}
+    for name, abbreviation in law_names.items():
+        laws_lookup[stem_law_name(name)] = abbreviation
+        laws_lookup[stem_law_name(abbreviation)] = abbreviation
+    return laws_lookup
+
+
+def generate_main_area(rnd, max_enumeration=150):
+    """
+    Returns: The main area of a citation. E.g. "§ 12 Abs. 3 Satz 1 und 2"
+    """
+    if rnd.random() < 0.02:
+        # Long enumeration
+        return "§§ " + ", ".join(
+            str(i) for i in range(1, rnd.randint(10, max_enumeration))
+        )
+
+    trigger = rnd.choice(["§", "§", "§", "Art.", "Artikel"])
+    parts = [f"{trigger} {rnd.randint(1, 400)}{rnd.choice(['', '', '', 'a', 'b'])}"]
+    for unit_variants in UNITS[: rnd.randint(0, len(UNITS))]:
+        if rnd.random() < 0.6:
+            parts.append(f"{rnd.choice(unit_variants)} {rnd.randint(1, 9)}")
+    main = " ".join(parts)
+
+    if rnd.random() < 0.3:
+        main += f"{rnd.choice(CONNECTORS)}{rnd.randint(1, 9)}"
+    return main
+
+
+def generate_law_name(rnd, law_names):
+    """
+    Returns: A tuple of the suffix and the law name that may follow the main area
+        of a citation. Both are empty for internal references.
+    """
+    choice = rnd.random()
+    if choice < 0.35:
+        return "", ""
+    elif choice < 0.75:
+        name = rnd.choice(law_names)
+    elif choice < 0.85:
+        name = rnd.choice(SGB_NAMES)
+    elif choice < 0.92:
+        name = rnd.choice(EU_NAMES)
+    else:
+        name = rnd.choice(IGNORE_NAMES)
+    return rnd.choice([" des ", " der ", " "]), name
+
+
+def generate_statute_text(
+    n_sentences=1000, citation_density=0.3, law_names=None, seed=0
+):
+    """
+    Generates a text that resembles a German statute.
+
+    Args:
+        n_sentences: Number of sentences in the text
+        citation_density: Average number of citations per sentence
+        law_names: Law names as returned by generate_law_names to cite
+        seed: Seed of the random generator
+
+    Returns: The generated text
+    """
+    rnd = random.Random(seed)
+    law_names = list(law_names or generate_law_names(seed=seed))
+    sentences = []
+    for _ in range(n_sentences):
+        words = [rnd.choice(FILLER_WORDS) for _ in range(rnd.randint(8, 30))]
+        while rnd.random() < citation_density / (1 + citation_density):
+            suffix, law_name = generate_law_name(rnd, law_names)
+            citation = generate_main_area(rnd) + suffix + law_name
+            words.insert(rnd.randrange(len(words)), citation)
+        sentence = " ".join(words)
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+    return " ".join(sentences)
+
+
+def generate_statute_texts(n_documents=100, n_sentences=200, seed=0, **kwargs):
+    """
+    Returns: A list of texts generated by generate_statute_text
+    """
+    return [
+        generate_statute_text(n_sentences=n_sentences, seed=seed + i, **kwargs)
+        for i in range(n_documents)
+    ]
+
+
+def generate_crossreference_csvs(
+    folder,
+    file_basename,
+    n_laws=20,
+    n_sections=50,
+    n_subsections=3,
+    n_references=2000,
+    seed=0,
+):
+    """
+    Writes a synthetic crossreference graph as nodelist and edgelist in the format
+    expected by quantlaw.utils.networkx.load_graph_from_csv_files.
+
+    Each law contains items (chapters) that contain seqitems (sections) that
+    contain subseqitems (subsections). Reference edges connect random seqitems.
+
+    Returns: The number of nodes and edges written.
+    """
+    rnd = random.Random(seed)
+    nodes = [
+        dict(
+            key="root",
+            level=-1,
+            type="root",
+            heading="root",
+            law_name="",
+            chars_n=0,
+            chars_nowhites=0,
+            tokens_n=0,
+            tokens_unique=0,
+        )
+    ]
+    edges = []
+    seqitems = []
+    for law_idx in range(n_laws):
+        law_name = f"Gesetz {law_idx}"
+        counter = iter(range(1, 1000000))
+
+        def add_node(level, node_type, heading, parent):
+            key = f"L{law_idx:04d}_{next(counter):06d}"
+            chars_n = rnd.randint(50, 5000)
+            nodes.append(
+                dict(
+                    key=key,
+                    level=level,
+                    type=node_type,
+                    heading=heading,
+                    law_name=law_name,
+                    chars_n=chars_n,
+                    chars_nowhites=chars_n * 5 // 6,
+                    tokens_n=chars_n // 6,
+                    tokens_unique=chars_n // 10,
+                )
+            )
+            edges.append(dict(u=parent, v=key, edge_type="containment"))
+            return key
+
+        document = add_node(0, "document", law_name, "root")
+        section_nr = 0
+        for chapter_idx in range(max(n_sections // 10, 1)):
+            item = add_node(1, "item", f"Abschnitt {chapter_idx + 1}", document)
+            for _ in range(10):
+                section_nr += 1
+                seqitem = add_node(2, "seqitem", f"§ {section_nr}", item)
+                seqitems.append(seqitem)
+                for subsection_idx in range(n_subsections):
+                    add_node(3, "subseqitem", f"({subsection_idx + 1})", seqitem)
+
+    for _ in range(n_references):
+        edges.append(
+            dict(u=rnd.choice(seqitems), v=rnd.choice(seqitems), edge_type="reference")
+        )
+
+    for suffix, rows in [("nodes", nodes), ("edges", edges)]:
+        path = os.path.join(folder, f"{file_basename}.{suffix}.csv.gz")
+        with gzip.open(path, "wt", encoding="utf8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return len(nodes), len(edges)
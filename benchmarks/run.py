@@ -0,0 +1,202 @@
+"""
+Benchmark suite for the extraction, parsing and graph utilities of quantlaw. It runs
+offline on a deterministic synthetic corpus and reports throughput, latency
+percentiles and peak memory per component.
+
+Run from the root of the repository with e.g.
+
+    python -m benchmarks.run --documents 50 --graph-laws 20
+
+Use `--json results.json` to store the results, e.g. to compare them between
+commits.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.corpus import (
+    generate_crossreference_csvs,
+    generate_law_names,
+    generate_laws_lookup,
+    generate_statute_texts,
+)
+from benchmarks.utils import format_result, measure
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_areas_patterns import reference_range_pattern
+from quantlaw.de_extract.statutes_engine import StatutesEngine
+from quantlaw.de_extract.statutes_graph_index import ReferenceGraphIndex
+from quantlaw.de_extract.statutes_mentions import LawNameScanner
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.utils.networkx import (
+    get_leaves,
+    hierarchy_graph,
+    load_graph_from_csv_files,
+    quotient_graph,
+    sequence_graph,
+)
+
+
+def search_all_reference_ranges(text):
+    match = reference_range_pattern.search(text)
+    while match:
+        match = reference_range_pattern.search(text, match.end())
+
+
+def bench_de_extract(args):
+    """
+    Yields: Tuples of component name, result and unit name
+    """
+    law_names = generate_law_names(args.laws, seed=args.seed)
+    laws_lookup = generate_laws_lookup(law_names)
+    texts = generate_statute_texts(
+        n_documents=args.documents,
+        n_sentences=args.sentences,
+        law_names=law_names,
+        seed=args.seed,
+    )
+    extractor = StatutesExtractor(laws_lookup)
+    parser = StatutesParser(laws_lookup)
+
+    def text_len(text):
+        return len(text)
+
+    yield "reference_range_pattern.search", measure(
+        search_all_reference_ranges, texts, text_len, args.repeat
+    ), "chars"
+
+    yield "StatutesExtractor.find_all", measure(
+        lambda text: list(extractor.find_all(text)), texts, text_len, args.repeat
+    ), "chars"
+
+    scanner = LawNameScanner(laws_lookup)
+    yield "LawNameScanner.find_all", measure(
+        scanner.find_all, texts, text_len, args.repeat
+    ), "chars"
+
+    matches_per_text = [list(extractor.find_all(text)) for text in texts]
+    matches = [m for ms in matches_per_text for m in ms if m.has_main_area()]
+
+    yield "StatutesParser.parse_main", measure(
+        lambda match: parser.parse_main(match.main_text()), matches, None, args.repeat
+    ), "citations"
+
+    yield "StatutesParser.parse_law", measure(
+        lambda match: parser.parse_law(
+            match.law_text(), match.law_match_type, current_lawid="ABC"
+        ),
+        matches,
+        None,
+        args.repeat,
+    ), "citations"
+
+    yield "StatutesParser.parse_matches", measure(
+        lambda ms: parser.parse_matches(ms, current_lawid="ABC"),
+        matches_per_text,
+        len,
+        args.repeat,
+    ), "matches"
+
+    yield "find_all+parse_matches", measure(
+        lambda text: parser.parse_matches(extractor.find_all(text), "ABC"),
+        texts,
+        text_len,
+        args.repeat,
+    ), "chars"
+
+    engine = StatutesEngine(laws_lookup)
+    yield "StatutesEngine.find_all", measure(
+        lambda text: engine.find_all(text, "ABC"), texts, text_len, args.repeat
+    ), "chars"
+
+
+def bench_networkx(args):
+    """
+    Yields: Tuples of component name, result and unit name
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        n_nodes, n_edges = generate_crossreference_csvs(
+            folder,
+            "graph",
+            n_laws=args.graph_laws,
+            n_sections=args.graph_sections,
+            n_references=args.graph_references,
+            seed=args.seed,
+        )
+        yield "load_graph_from_csv_files", measure(
+            lambda filter: load_graph_from_csv_files(folder, "graph", filter),
+            ["exclude_subseqitems", None],
+            lambda filter: n_nodes + n_edges,
+            args.repeat,
+        ), "nodes+edges"
+        G = load_graph_from_csv_files(folder, "graph", filter=None)
+
+    def graph_size(graph):
+        return graph.number_of_nodes() + graph.number_of_edges()
+
+    yield "hierarchy_graph", measure(
+        hierarchy_graph, [G], graph_size, args.repeat
+    ), "nodes+edges"
+    yield "get_leaves", measure(get_leaves, [G], graph_size, args.repeat), "nodes+edges"
+    yield "quotient_graph", measure(
+        lambda graph: quotient_graph(graph, "law_name"), [G], graph_size, args.repeat
+    ), "nodes+edges"
+
+    G_without_subseqitems = G.subgraph(
+        n for n, t in G.nodes(data="type") if t != "subseqitem"
+    )
+    yield "sequence_graph", measure(
+        sequence_graph, [G_without_subseqitems], graph_size, args.repeat
+    ), "nodes+edges"
+
+    yield "ReferenceGraphIndex", measure(
+        ReferenceGraphIndex, [G], graph_size, args.repeat
+    ), "nodes+edges"
+    index = ReferenceGraphIndex(G)
+    references = [
+        (f"Gesetz {i % args.graph_laws}", [["§", str(i % 60 + 1)], ["Abs", "2"]])
+        for i in range(100000)
+    ]
+    yield "ReferenceGraphIndex.resolve_many", measure(
+        index.resolve_many, [references], len, args.repeat
+    ), "references"
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--laws", type=int, default=1000)
+    parser.add_argument("--graph-laws", type=int, default=20)
+    parser.add_argument("--graph-sections", type=int, default=50)
+    parser.add_argument("--graph-references", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--components",
+        nargs="+",
+        choices=["de_extract", "networkx"],
+        default=["de_extract", "networkx"],
+    )
+    parser.add_argument("--json", help="Path to store the results as JSON")
+    return parser.parse_args()
+
+
+def run(args):
+    results = {}
+    suites = dict(de_extract=bench_de_extract, networkx=bench_networkx)
+    for component in args.components:
+        for name, result, unit_name in suites[component](args):
+            print(format_result(name, result, unit_name), flush=True)
+            results[name] = dict(result, unit=unit_name)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf8") as f:
+            json.dump(dict(args=vars(args), results=results), f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    run(get_args())
@@ -0,0 +1,84 @@
+"""
+Helpers to measure and report benchmark results
+"""
+
+import statistics
+import time
+import tracemalloc
+
+
+def percentile(values, q):
+    """
+    Returns: The q-th percentile (0 <= q <= 100) of values using linear
+        interpolation.
+    """
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def measure(func, items, units=None, repeat=1):
+    """
+    Calls func for every item and measures the latency of each call, the
+    throughput and the peak memory.
+
+    Args:
+        func: Function to benchmark. It is called with one item as argument.
+        items: List of items to pass to func.
+        units: Function that returns the number of processed units (e.g. bytes or
+            citations) of an item to report the throughput in units per second.
+            By default each item counts as one unit.
+        repeat: Number of rounds. Latencies are taken from the fastest round.
+
+    Returns: A dict with the benchmark results.
+    """
+    units = units or (lambda item: 1)
+    total_units = sum(units(item) for item in items)
+
+    best_latencies = None
+    for _ in range(repeat):
+        latencies = []
+        for item in items:
+            start = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - start)
+        if best_latencies is None or sum(latencies) < sum(best_latencies):
+            best_latencies = latencies
+
+    # Peak memory is measured in a separate round, as tracing slows down execution.
+    tracemalloc.start()
+    for item in items:
+        func(item)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_seconds = sum(best_latencies)
+    return dict(
+        calls=len(items),
+        seconds=total_seconds,
+        throughput=total_units / total_seconds if total_seconds else float("inf"),
+        latency_mean=statistics.mean(best_latencies),
+        latency_p50=percentile(best_latencies, 50),
+        latency_p90=percentile(best_latencies, 90),
+        latency_p99=percentile(best_latencies, 99),
+        latency_max=max(best_latencies),
+        peak_memory=peak_memory,
+    )
+
+
+def format_result(name, result, unit_name="calls"):
+    """
+    Returns: A single line that summarizes a result of measure.
+    """
+    return (
+        f"{name:36} "
+        f"{result['throughput']:12.1f} {unit_name}/s  "
+        f"p50 {result['latency_p50'] * 1000:9.3f} ms  "
+        f"p90 {result['latency_p90'] * 1000:9.3f} ms  "
+        f"p99 {result['latency_p99'] * 1000:9.3f} ms  "
+        f"peak {result['peak_memory'] / 2 ** 20:8.2f} MiB"
+    )
@@ -28,11 +28,8 @@ matches = list(extractor.find_all(text))
 # Instantiate parser
 parser = StatutesParser(law_names)
 
-# Parse each reference
-for match in matches:
-    if match.has_main_area():
-        main_area_data = parser.parse_main(match.main_text())
-        law_name_area_data = parser.parse_law(
-            match.law_text(), match.law_match_type, current_lawid="GVG"
-        )
-        print(main_area_data, "-", law_name_area_data)
+# Parse all references of the text at once
+records = parser.parse_matches(matches, current_lawid="GVG")
+
+for record in records:
+    print(record["path"], "-", record["lawid"])
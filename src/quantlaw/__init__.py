@@ -4,15 +4,20 @@ dist_name = __name__
 
 
 def get_quantlaw_package_version():
-    from pkg_resources import DistributionNotFound, get_distribution
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # Python < 3.8. pkg_resources is much slower to import.
+        from pkg_resources import DistributionNotFound as PackageNotFoundError
+        from pkg_resources import get_distribution
+
+        def version(distribution_name):
+            return get_distribution(distribution_name).version
 
     try:
         # Change here if project is renamed and does not equal the package name
-        version = get_distribution(dist_name).version
-    except DistributionNotFound:
-        version = "unknown"
-
-        return version
+        return version(dist_name)
+    except PackageNotFoundError:
+        return "unknown"
 
 
 __version__ = get_quantlaw_package_version()
@@ -0,0 +1,336 @@
+"""
+Command line tool to extract and parse the statute references of all files in a
+directory. Run `quantlaw-extract --help` for details.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from lxml import etree
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.de_extract.stemming import stem_law_name
+from quantlaw.utils.diagnostics import Diagnostics
+from quantlaw.utils.files import list_dir
+
+# Warm state of a worker process, created once by init_worker
+worker_state = {}
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Extract and parse references to German statutes in all files "
+        "of a directory. Each reference path is written as one record with the "
+        "fields file, start, end, law_match_type, lawid and path."
+    )
+    parser.add_argument("input", help="Directory containing the texts")
+    parser.add_argument(
+        "--law-names",
+        required=True,
+        help="JSON file of a dict of law names and law ids, e.g. created by "
+        "quantlaw.de_extract.load_statute_names.load_law_names",
+    )
+    parser.add_argument(
+        "--stem-law-names",
+        action="store_true",
+        help="Stem the law names of --law-names and add the law ids as names, as "
+        "they are not stemmed yet.",
+    )
+    parser.add_argument(
+        "--type",
+        default=".txt",
+        help="Extension of the files to process. Text is read from .xml files with "
+        "all tags removed. (default: .txt)",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        help="Path of the output file. Default is stdout for JSONL.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "parquet"],
+        default="jsonl",
+        help="Output format. Parquet requires pyarrow. (default: jsonl)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(multiprocessing.cpu_count() - 2, 1),
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help="Number of records per Parquet row group (default: 10000)",
+    )
+    parser.add_argument(
+        "--search-timeout",
+        type=float,
+        default=None,
+        help="Time budget in seconds per pattern. See StatutesExtractor.",
+    )
+    parser.add_argument(
+        "--diagnostics",
+        help="Path to write the diagnostics of the extraction as JSON",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10,
+        help="Seconds between progress reports on stderr (default: 10)",
+    )
+    return parser.parse_args(args)
+
+
+def load_laws_lookup(path: str, stem: bool = False) -> dict:
+    """
+    Returns: A laws_lookup for StatutesProcessor read from a JSON file. If stem is
+        set, the law names are stemmed and the law ids are added as law names.
+    """
+    with open(path, encoding="utf8") as f:
+        law_names = json.load(f)
+    if not stem:
+        return law_names
+    laws_lookup = {}
+    for law_name, lawid in law_names.items():
+        laws_lookup[stem_law_name(law_name)] = lawid
+        laws_lookup[stem_law_name(lawid)] = lawid
+    return laws_lookup
+
+
+def init_worker(laws_lookup: dict, search_timeout: float = None):
+    """
+    Creates the extractor and the parser of a worker process once.
+    """
+    diagnostics = Diagnostics()
+    worker_state["diagnostics"] = diagnostics
+    worker_state["extractor"] = StatutesExtractor(
+        laws_lookup, diagnostics, search_timeout=search_timeout
+    )
+    worker_state["parser"] = StatutesParser(laws_lookup, diagnostics)
+
+
+def read_text(path: str) -> str:
+    if path.endswith(".xml"):
+        return "".join(etree.parse(path).getroot().itertext())
+    with open(path, encoding="utf8") as f:
+        return f.read()
+
+
+def extract_file(path: str):
+    """
+    Extracts and parses the references of a file. The file name without extension
+    is used as law id of internal references.
+
+    Citations that cannot be parsed are skipped (see StatutesParser.parse_matches).
+    If the file cannot be read or extracted, e.g. malformed XML, it is skipped and
+    reported as "file_error" in the diagnostics.
+
+    Returns: A tuple of the number of citations, the records and the diagnostics
+    """
+    extractor = worker_state["extractor"]
+    parser = worker_state["parser"]
+    diagnostics = worker_state["diagnostics"]
+    diagnostics.clear()
+
+    file_name = os.path.basename(path)
+    try:
+        text = read_text(path)
+        matches = [m for m in extractor.find_all(text) if m.has_main_area()]
+    except Exception as error:
+        diagnostics.report("file_error", f"{file_name}: {error!r}")
+        return 0, [], diagnostics.to_dict()
+
+    records = parser.parse_matches(
+        matches, current_lawid=os.path.splitext(file_name)[0], skip_errors=True
+    )
+    for record in records:
+        record["file"] = file_name
+    return len(matches), records, diagnostics.to_dict()
+
+
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.file = sys.stdout if path == "-" else open(path, "w", encoding="utf8")
+
+    def write(self, records: list):
+        for record in records:
+            self.file.write(json.dumps(record, ensure_ascii=False))
+            self.file.write("\n")
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes records in row groups of batch_size records to limit memory usage.
+    """
+
+    def __init__(self, path: str, batch_size: int):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet files requires pyarrow to be installed")
+        if path == "-":
+            raise ValueError("Parquet output requires --output")
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("file", pa.string()),
+                ("start", pa.int64()),
+                ("end", pa.int64()),
+                ("law_match_type", pa.string()),
+                ("lawid", pa.string()),
+                ("path", pa.list_(pa.list_(pa.string()))),
+            ]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.batch = []
+
+    def write(self, records: list):
+        self.batch.extend(records)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            table = self.pa.Table.from_pylist(self.batch, schema=self.schema)
+            self.writer.write_table(table, row_group_size=self.batch_size)
+            self.batch = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def extract_files(paths, laws_lookup, workers=1, search_timeout=None, max_pending=None):
+    """
+    Extracts and parses the references of the files. With more than one worker,
+    the files are processed in a process pool and the results are yielded as soon
+    as they are completed, so that a large file does not hold back the results of
+    the files after it.
+
+    Args:
+        max_pending: Maximal number of files that are submitted to the process pool
+            but whose results are not yielded yet. Limits the memory of the
+            buffered results if they are consumed slower than produced. By default
+            four per worker.
+
+    Yields: The results of extract_file. Without process pool in the order of
+        paths, otherwise in the order of completion.
+    """
+    if workers > 1:
+        max_pending = max_pending or 4 * workers
+        # Tuples of the result or the exception and whether it succeeded
+        completed = queue.Queue()
+
+        def get_completed():
+            output, succeeded = completed.get()
+            if not succeeded:
+                raise output
+            return output
+
+        ctx = multiprocessing.get_context()
+        with ctx.Pool(workers, init_worker, (laws_lookup, search_timeout)) as pool:
+            n_pending = 0
+            for path in paths:
+                if n_pending >= max_pending:
+                    yield get_completed()
+                    n_pending -= 1
+                pool.apply_async(
+                    extract_file,
+                    (path,),
+                    callback=lambda result: completed.put((result, True)),
+                    error_callback=lambda error: completed.put((error, False)),
+                )
+                n_pending += 1
+            for _ in range(n_pending):
+                yield get_completed()
+    else:
+        init_worker(laws_lookup, search_timeout)
+        for path in paths:
+            yield extract_file(path)
+
+
+def format_progress(n_documents: int, n_citations: int, seconds: float) -> str:
+    seconds = max(seconds, 1e-9)
+    return (
+        f"{n_documents} documents, {n_citations} citations, "
+        f"{n_documents / seconds:.1f} documents/s, "
+        f"{n_citations / seconds:.1f} citations/s"
+    )
+
+
+def main(args):
+    """
+    Runs the extraction with command line arguments.
+
+    Args:
+        args: Command line parameters as list of strings
+
+    Returns: The merged diagnostics of all files
+    """
+    args = parse_args(args)
+    laws_lookup = load_laws_lookup(args.law_names, args.stem_law_names)
+    paths = [os.path.join(args.input, f) for f in list_dir(args.input, args.type)]
+
+    if args.format == "parquet":
+        writer = ParquetWriter(args.output, args.batch_size)
+    else:
+        writer = JsonlWriter(args.output)
+
+    diagnostics = Diagnostics()
+    n_documents = n_citations = 0
+    start_time = last_report = time.perf_counter()
+    try:
+        for file_citations, records, file_diagnostics in extract_files(
+            paths, laws_lookup, args.workers, args.search_timeout
+        ):
+            writer.write(records)
+            diagnostics.merge(Diagnostics.from_dict(file_diagnostics))
+            n_documents += 1
+            n_citations += file_citations
+
+            now = time.perf_counter()
+            if now - last_report >= args.progress_interval:
+                last_report = now
+                print(
+                    format_progress(n_documents, n_citations, now - start_time),
+                    file=sys.stderr,
+                    flush=True,
+                )
+    finally:
+        writer.close()
+
+    print(
+        "Done:",
+        format_progress(n_documents, n_citations, time.perf_counter() - start_time),
+        file=sys.stderr,
+    )
+    if args.diagnostics:
+        diagnostics.to_json(args.diagnostics)
+    return diagnostics
+
+
+def run():
+    """
+    Entry point for console_scripts
+    """
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
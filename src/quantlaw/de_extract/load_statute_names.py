@@ -1,3 +1,4 @@
+import bisect
 import json
 import os
 import re
@@ -5,58 +6,246 @@ import shutil
 import zipfile
 
 import lxml.etree
-import requests
 
 from quantlaw.de_extract.stemming import stem_law_name
 
 
 def load_law_names(date, path):
+    download_law_names_archive(date, path + ".zip")
+
+    law_names = {}
+
+    with zipfile.ZipFile(path + ".zip") as zip_file:
+        for member_info in sorted(zip_file.namelist()):
+            if member_info.endswith(".xml"):
+                with zip_file.open(member_info) as member_file:
+                    law_names.update(parse_law_names_member(member_file))
+
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(law_names, f, ensure_ascii=False, indent=0)
+
+    os.remove(path + ".zip")
+
+
+def download_law_names_archive(date, zip_path):
+    """
+    Downloads the archive of the laws of gesetze-im-internet.de at a date.
+    """
+    import requests
+
     r = requests.get(
         f"https://github.com/QuantLaw/gesetze-im-internet/archive/{date}.zip",
         stream=True,
     )
     assert r.status_code == 200
-    with open(path + ".zip", "wb") as f:
+    with open(zip_path, "wb") as f:
         r.raw.decode_content = True
         shutil.copyfileobj(r.raw, f)
 
+
+def parse_law_names_member(member_file) -> dict:
+    """
+    Args:
+        member_file: XML file of a law of gesetze-im-internet.de
+
+    Returns: A dict of the stemmed names and the abbreviation of the law mapped to
+        the id of the law. Empty if the file contains no norm with an abbreviation.
+    """
     law_names = {}
+    node = lxml.etree.parse(member_file)
+    first_norm_nodes = node.xpath("(//norm)[1]")
+    if not first_norm_nodes:
+        return law_names
+    abk_nodes = first_norm_nodes[0].xpath(".//jurabk | //amtabk")
+    if not abk_nodes:
+        return law_names
+    abk = (
+        lxml.etree.tostring(abk_nodes[0], method="text", encoding="utf8")
+        .decode("utf8")
+        .strip()
+    )
+    abk_stem = re.sub(r"[^a-z0-9\-]", "_", abk.lower())
 
-    with zipfile.ZipFile(path + ".zip") as zip_file:
-        for member_info in sorted(zip_file.namelist()):
-            if member_info.endswith(".xml"):
-                with zip_file.open(member_info) as member_file:
-                    node = lxml.etree.parse(member_file)
-                first_norm_nodes = node.xpath("(//norm)[1]")
-                if not first_norm_nodes:
-                    continue
-                abk_nodes = first_norm_nodes[0].xpath(".//jurabk | //amtabk")
-                if not abk_nodes:
-                    continue
-                abk = (
-                    lxml.etree.tostring(abk_nodes[0], method="text", encoding="utf8")
-                    .decode("utf8")
-                    .strip()
-                )
-                abk_stem = re.sub(r"[^a-z0-9\-]", "_", abk.lower())
-
-                law_names[stem_law_name(abk)] = abk_stem
-
-                heading_nodes = first_norm_nodes[0].xpath(
-                    ".//jurabk | //amtabk | " ".//langue | .//kurzue"
-                )
-                for heading_node in heading_nodes:
-                    text = (
-                        lxml.etree.tostring(
-                            heading_node, method="text", encoding="utf8"
-                        )
-                        .decode("utf8")
-                        .strip()
-                    )
-                    text = stem_law_name(text)
-                    law_names[text] = abk_stem
+    law_names[stem_law_name(abk)] = abk_stem
+
+    heading_nodes = first_norm_nodes[0].xpath(
+        ".//jurabk | //amtabk | " ".//langue | .//kurzue"
+    )
+    for heading_node in heading_nodes:
+        text = (
+            lxml.etree.tostring(heading_node, method="text", encoding="utf8")
+            .decode("utf8")
+            .strip()
+        )
+        text = stem_law_name(text)
+        law_names[text] = abk_stem
+    return law_names
+
+
+def get_member_key(member_name: str) -> str:
+    """
+    Returns: The name of a member without the top level folder, which contains the
+        date in archives of GitHub. E.g. "a/a.xml" for
+        "gesetze-im-internet-2020-10-20/a/a.xml"
+    """
+    return member_name.split("/", 1)[-1]
+
+
+def combine_law_names(members: dict) -> dict:
+    """
+    Returns: The law names of all members of a manifest combined in the order of
+        load_law_names.
+    """
+    law_names = {}
+    for key in sorted(members):
+        law_names.update(members[key]["names"])
+    return law_names
+
+
+def index_law_names(members: dict) -> dict:
+    """
+    Returns: The law names of all members of a manifest mapped to the sorted keys
+        of the members that contain them. The last member determines the law id.
+    """
+    owners = {}
+    for key in sorted(members):
+        for name in members[key]["names"]:
+            owners.setdefault(name, []).append(key)
+    return owners
+
+
+def update_law_names(zip_path: str, manifest_path: str):
+    """
+    Creates the law names of an archive incrementally. Only XML members that were
+    added or changed since the manifest was written are parsed. Members are
+    compared by their CRC and size. The law names and the change log are updated
+    from the names of the added, changed and removed members only, using the
+    members that contain each name, which are stored in the manifest as well. The
+    law names are the same as the result of load_law_names for the archive, but
+    names added later are appended instead of keeping the order of the members.
+
+    The manifest is a single JSON file that is rewritten as a whole afterwards.
+
+    Args:
+        zip_path: Archive of the laws of gesetze-im-internet.de
+        manifest_path: JSON file of the members and their law names of the
+            previous run. It is created if it does not exist.
+
+    Returns: A tuple of the law names and a change log. The change log is a dict
+        with the keys:
+        "members_added", "members_changed", "members_removed": Lists of members
+        "names_added": Dict of the added law names and their law ids
+        "names_changed": Dict of law names mapped to the old and the new law id
+        "names_removed": List of law names
+    """
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf8") as f:
+            manifest = json.load(f)
+        old_members = manifest["members"]
+        if "owners" in manifest:
+            owners = manifest["owners"]
+            law_names = manifest["law_names"]
+        else:
+            # Manifest of a version that stored the members only
+            owners = index_law_names(old_members)
+            law_names = combine_law_names(old_members)
+    else:
+        old_members = {}
+        owners = {}
+        law_names = {}
+
+    changes = dict(members_added=[], members_changed=[], members_removed=[])
+    members = {}
+    with zipfile.ZipFile(zip_path) as zip_file:
+        for info in zip_file.infolist():
+            if not info.filename.endswith(".xml"):
+                continue
+            key = get_member_key(info.filename)
+            old_member = old_members.get(key)
+            if (
+                old_member is not None
+                and old_member["crc"] == info.CRC
+                and old_member["size"] == info.file_size
+            ):
+                members[key] = old_member
+                continue
+
+            with zip_file.open(info) as member_file:
+                names = parse_law_names_member(member_file)
+            members[key] = dict(crc=info.CRC, size=info.file_size, names=names)
+            if old_member is None:
+                changes["members_added"].append(key)
+            else:
+                changes["members_changed"].append(key)
+
+    changes["members_removed"] = [key for key in old_members if key not in members]
+    for change_list in changes.values():
+        change_list.sort()
+
+    affected_names = set()
+    for key in changes["members_changed"] + changes["members_removed"]:
+        for name in old_members[key]["names"]:
+            owners[name].remove(key)
+            affected_names.add(name)
+    for key in changes["members_added"] + changes["members_changed"]:
+        for name in members[key]["names"]:
+            bisect.insort(owners.setdefault(name, []), key)
+            affected_names.add(name)
+
+    changes["names_added"] = {}
+    changes["names_changed"] = {}
+    changes["names_removed"] = []
+    for name in sorted(affected_names):
+        old_lawid = law_names.get(name)
+        if not owners[name]:
+            del owners[name]
+            if old_lawid is not None:
+                del law_names[name]
+                changes["names_removed"].append(name)
+            continue
+        lawid = members[owners[name][-1]]["names"][name]
+        if old_lawid is None:
+            changes["names_added"][name] = lawid
+        elif old_lawid != lawid:
+            changes["names_changed"][name] = [old_lawid, lawid]
+        law_names[name] = lawid
+
+    with open(manifest_path, "w", encoding="utf8") as f:
+        json.dump(
+            dict(members=members, owners=owners, law_names=law_names),
+            f,
+            ensure_ascii=False,
+        )
+
+    return law_names, changes
+
+
+def load_law_names_incrementally(
+    date, path: str, manifest_path: str, changelog_path: str = None
+):
+    """
+    Like load_law_names, but only parses the laws that changed since the manifest
+    was written, e.g. by the run for the previous date. Thus, a daily series of law
+    names can be built in time proportional to the daily changes.
+
+    Args:
+        date: Date of the archive to download
+        path: Path to write the law names to
+        manifest_path: See update_law_names
+        changelog_path: Optional path to write the change log of update_law_names to
+
+    Returns: The change log
+    """
+    download_law_names_archive(date, path + ".zip")
+    try:
+        law_names, changes = update_law_names(path + ".zip", manifest_path)
+    finally:
+        os.remove(path + ".zip")
 
     with open(path, "w", encoding="utf8") as f:
         json.dump(law_names, f, ensure_ascii=False, indent=0)
 
-    os.remove(path + ".zip")
+    if changelog_path:
+        with open(changelog_path, "w", encoding="utf8") as f:
+            json.dump(changes, f, ensure_ascii=False, indent=2)
+    return changes
@@ -1,9 +1,16 @@
+from quantlaw.de_extract.stemming import stem_law_name
+from quantlaw.utils.diagnostics import Diagnostics
+from quantlaw.utils.instrumentation import Instrumentation
+
+
 class StatusMatch:
     """
     Base class to report the areas of citations to German statutes and regulations
     (also if a trigger e.g. '§' is found but it is not followed by a citation).
     """
 
+    __slots__ = ("text", "start", "end")
+
     def __init__(
         self,
         text: str,
@@ -37,6 +44,8 @@ class StatutesMatchWithMainArea(StatusMatch):
     main area is found after the trigger "§ 123" where "123" is the main area.
     """
 
+    __slots__ = ("suffix_len", "law_len", "law_match_type")
+
     def __init__(
         self,
         suffix_len: int,
@@ -102,14 +111,28 @@ class StatutesProcessor:
     The abstract class provides the names of laws they are cited with.
     """
 
-    def __init__(self, laws_lookup: dict):
+    # Names of the methods that are timed if instrumentation is enabled
+    instrumented_methods = ()
+
+    # Stemmer of law names. Exposed as attribute to be timed by the instrumentation.
+    stem_law_name = staticmethod(stem_law_name)
+
+    def __init__(self, laws_lookup: dict, diagnostics: Diagnostics = None):
         """
         Args:
             laws_lookup: See laws_lookup property for details.
+            diagnostics: Collects irregularities found in the processed texts. By
+                default a new Diagnostics object is created. Pass
+                `Diagnostics(echo=True)` to print them.
         """
         self._laws_lookup = None
         self.laws_lookup_keys = None
+        self.laws_lookup_values = None
+        self.lawid_by_stem = None
+        self.lawid_by_law_text = None
         self.laws_lookup = laws_lookup
+        self.instrumentation = None
+        self.diagnostics = Diagnostics() if diagnostics is None else diagnostics
 
     @property
     def laws_lookup(self) -> dict:
@@ -123,6 +146,10 @@ class StatutesProcessor:
         is not recognized. The names of the laws should be provided in a
         stemmed format using the stemmer provided in
         `quantlaw.de_extract.stemming.stem_law_name`.
+
+        A LawsLookupView of a
+        `quantlaw.de_extract.statutes_lookup.VersionedLawsLookup` can be assigned
+        to switch between the lookups of several dates at low cost.
         """
         return self._laws_lookup
 
@@ -132,7 +159,20 @@ class StatutesProcessor:
         self._laws_lookup = val
 
         # Sort be decreasing string length to favor matches of long law names.
-        self.laws_lookup_keys = sorted(val.keys(), reverse=True)
+        # Views of a VersionedLawsLookup provide the sorted keys and the law ids.
+        keys = getattr(val, "laws_lookup_keys", None)
+        self.laws_lookup_keys = (
+            sorted(val.keys(), reverse=True) if keys is None else keys
+        )
+
+        # Set of all law ids to test in constant time if a law id is known
+        values = getattr(val, "laws_lookup_values", None)
+        self.laws_lookup_values = frozenset(val.values()) if values is None else values
+
+        # Caches of stemmed law names resp. law names as found in the text
+        # (combined with the match type) and the ids of the laws they refer to
+        self.lawid_by_stem = {}
+        self.lawid_by_law_text = {}
 
     def match_law_name(self, text: str):
         """
@@ -145,3 +185,43 @@ class StatutesProcessor:
             if text[: len(law)] == law:
                 return law
         return None
+
+    def get_lawid_by_stem(self, lawname_stem: str):
+        """
+        Returns: The id of the law whose name the stemmed text begins with. Results
+            are cached until laws_lookup is changed.
+        """
+        lawid = self.lawid_by_stem.get(lawname_stem)
+        if lawid is None:
+            lawid = self.laws_lookup[self.match_law_name(lawname_stem)]
+            self.lawid_by_stem[lawname_stem] = lawid
+        return lawid
+
+    def enable_instrumentation(self, instrumentation: Instrumentation = None):
+        """
+        Records the calls and cumulative time of the methods in instrumented_methods
+        and counts the match types. Without instrumentation, the methods are not
+        wrapped at all.
+
+        Args:
+            instrumentation: Object to record the results in. Can be shared between
+                processors. By default a new one is created.
+
+        Returns: The Instrumentation object. To combine the results of several
+            worker processes, return it from the workers and merge them.
+        """
+        self.disable_instrumentation()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self.instrumentation = instrumentation
+        for name in self.instrumented_methods:
+            setattr(self, name, instrumentation.timed(name, getattr(self, name)))
+        return instrumentation
+
+    def disable_instrumentation(self):
+        """
+        Removes the wrappers added by enable_instrumentation.
+        """
+        for name in self.instrumented_methods:
+            self.__dict__.pop(name, None)
+        self.instrumentation = None
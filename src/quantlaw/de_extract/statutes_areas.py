@@ -1,4 +1,7 @@
-from regex import regex
+import bisect
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from quantlaw.de_extract.statutes_abstract import (
     StatusMatch,
@@ -8,49 +11,147 @@ from quantlaw.de_extract.statutes_abstract import (
 from quantlaw.de_extract.statutes_areas_patterns import (
     eu_law_name_pattern,
     ignore_law_name_pattern,
+    law_name_suffix_pattern,
+    law_name_token_pattern,
+    law_name_whitespace_pattern,
     reference_range_pattern,
+    reference_trigger_pattern,
     sgb_law_name_pattern,
     suffix_ignore_pattern,
 )
-from quantlaw.de_extract.stemming import stem_law_name
+from quantlaw.utils.diagnostics import Diagnostics
+
+
+class SearchTimeout(TimeoutError):
+    """
+    Exception is raised if reference_range_pattern exceeds the time budget at a
+    trigger. The span of the trigger is given by start and end.
+    """
+
+    def __init__(self, start: int, end: int):
+        super().__init__(f"Search timed out at trigger in position {start}")
+        self.start = start
+        self.end = end
+
+
+SegmentsMatch = namedtuple("SegmentsMatch", "match start end law_start law_end")
+SegmentsMatch.__doc__ = """
+Match found by StatutesExtractor.find_all_in_segments. The positions are given as
+tuples of the index of the segment and the offset in the segment. start and end
+refer to the main area of the match, law_start and law_end to the law name.
+"""
 
 
 class StatutesExtractor(StatutesProcessor):
     """
     Class to find areas of citations to German statutes and regulations
+
+    The methods to find matches do not modify the extractor. Hence, a single
+    extractor can be shared by several threads as long as laws_lookup is not
+    changed meanwhile. Create it with `concurrent=True` to release the GIL while
+    the patterns are matched and use find_all_in_texts to extract several texts in
+    a thread pool.
     """
 
-    def search(self, text: str, pos: int = 0) -> StatusMatch:
+    def __init__(
+        self,
+        laws_lookup: dict,
+        diagnostics: Diagnostics = None,
+        search_timeout: float = None,
+        concurrent: bool = False,
+    ):
+        """
+        Args:
+            laws_lookup: See laws_lookup property for details.
+            diagnostics: See StatutesProcessor
+            search_timeout: Time budget in seconds per application of a pattern.
+                Some inputs, e.g. long runs of whitespace after a number, cause
+                catastrophic backtracking. If the main area cannot be matched in
+                time, a StatusMatch of the trigger is returned
+                ("search_timeout" in diagnostics). If the law name cannot be
+                matched in time, the law is treated as unknown
+                ("law_name_timeout" in diagnostics). By default no timeout is set.
+            concurrent: Release the GIL while patterns are matched, so that other
+                threads can run meanwhile.
+        """
+        super().__init__(laws_lookup, diagnostics)
+        self.search_timeout = search_timeout
+        self.concurrent = concurrent
+
+    instrumented_methods = (
+        "search",
+        "search_with_main_area_match",
+        "search_main_area",
+        "get_suffix_and_law_name",
+        "get_dict_law_name_len",
+        "stem_law_name",
+    )
+
+    def search(self, text: str, pos: int = 0, endpos: int = None) -> StatusMatch:
         """
         Finds the next occurrence of a statute reference in a given text
 
         Args:
             text: The text to search in.
             pos: Position to start searching.
+            endpos: Only references that start before this position are found. They
+                may extend beyond it.
 
         Returns: The match or None if no references are found.
         """
+        return self.search_with_main_area_match(text, pos, endpos)[0]
+
+    def search_with_main_area_match(self, text: str, pos: int = 0, endpos: int = None):
+        """
+        Like search, but also returns the match of reference_range_pattern. Its
+        captures can be parsed by StatutesParser.parse_main_match without parsing
+        the main area again.
+
+        Returns: A tuple of the match of search and the regex match. The regex match
+            is None if the match has no main area. (None, None) if no references
+            are found.
+        """
 
         # Find the main area of the reference
-        match = reference_range_pattern.search(text, pos)
+        try:
+            match = self.search_main_area(
+                text, pos, self.search_timeout, self.concurrent, endpos
+            )
+        except SearchTimeout as timeout:
+            # Report the trigger only and continue after it
+            self.diagnostics.report(
+                "search_timeout", text[timeout.start : timeout.start + 100]
+            )
+            return (
+                StatusMatch(text=text, start=timeout.start, end=timeout.end),
+                None,
+            )
 
         if not match:
-            return None
+            return None, None
 
         # Found a trigger e.g "§" not no citation follows
         if not match.groupdict()["main"]:
-            return StatusMatch(
-                text=text,
-                start=match.start(),
-                end=match.end(),
+            if self.instrumentation is not None:
+                self.instrumentation.count("search.trigger")
+            return (
+                StatusMatch(
+                    text=text,
+                    start=match.start(),
+                    end=match.end(),
+                ),
+                None,
             )
 
         # Get length of optional suffix and law name that may follow the main area.
         # and categorize the reference type.
         suffix_len, law_len, law_match_type = self.get_suffix_and_law_name(
-            text[match.end() :]
+            text, match.end()
         )
 
+        if self.instrumentation is not None:
+            self.instrumentation.count(f"search.{law_match_type}")
+
         # Create a return object
         statutes_match = StatutesMatchWithMainArea(
             text=text,
@@ -61,23 +162,291 @@ class StatutesExtractor(StatutesProcessor):
             law_match_type=law_match_type,
         )
 
-        return statutes_match
+        return statutes_match, match
 
-    def find_all(self, text: str, pos: int = 0):
+    @staticmethod
+    def search_main_area(
+        text: str,
+        pos: int = 0,
+        timeout: float = None,
+        concurrent: bool = None,
+        endpos: int = None,
+    ):
+        """
+        Finds the next match of reference_range_pattern in a given text.
+
+        The result equals `reference_range_pattern.search(text, pos)`, but the
+        pattern is only applied at the positions of triggers found by the much
+        cheaper reference_trigger_pattern.
+
+        Args:
+            text: The text to search in.
+            pos: Position to start searching.
+            timeout: Time budget in seconds to match the pattern at a trigger.
+                SearchTimeout is raised if it is exceeded.
+            concurrent: Release the GIL while matching.
+            endpos: Only triggers that start before this position are considered.
+                The match can extend beyond it.
+
+        Returns: The regex match or None if no references are found.
+        """
+        trigger = reference_trigger_pattern.search(text, pos, concurrent=concurrent)
+        while trigger:
+            if endpos is not None and trigger.start() >= endpos:
+                return None
+            try:
+                match = reference_range_pattern.match(
+                    text, trigger.start(), timeout=timeout, concurrent=concurrent
+                )
+            except TimeoutError:
+                raise SearchTimeout(trigger.start(), trigger.end())
+            if match:
+                return match
+            trigger = reference_trigger_pattern.search(
+                text, trigger.start() + 1, concurrent=concurrent
+            )
+        return None
+
+    def find_all(self, text: str, pos: int = 0, as_table: bool = False):
         """
         Like search but returns a generator of all matches found in text
+
+        Args:
+            text: The text to search in.
+            pos: Position to start searching.
+            as_table: If True, the matches are returned as a MatchTable instead of
+                a generator of match objects.
+        """
+        matches = self._find_all(text, pos)
+        if as_table:
+            # Imported on demand, as MatchTable requires NumPy
+            from quantlaw.de_extract.statutes_match_table import MatchTable
+
+            return MatchTable.from_matches(text, matches)
+        return matches
+
+    def find_all_in_texts(self, texts, max_workers: int = None, as_table=False):
+        """
+        Extracts the matches of several texts in a thread pool that shares this
+        extractor. Create the extractor with `concurrent=True`, otherwise the threads
+        block each other.
+
+        Args:
+            texts: Iterable of texts
+            max_workers: Number of threads. See concurrent.futures.ThreadPoolExecutor
+            as_table: Return a MatchTable per text instead of a list of matches.
+
+        Returns: A list that contains the matches of each text in the order of texts.
+        """
+
+        def find_all(text):
+            matches = self.find_all(text, as_table=as_table)
+            return matches if as_table else list(matches)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(find_all, texts))
+
+    def find_all_in_windows(
+        self,
+        text: str,
+        window_size: int = 1000000,
+        processes: int = None,
+        max_citation_len: int = 10000,
+    ) -> list:
+        """
+        Like find_all, but splits a large text into windows that are searched in a
+        process pool.
+
+        Each process receives a slice of the text that extends max_citation_len plus
+        the 1000 chars searched for a law name beyond the end of its window. It
+        returns the matches that start in its window, but stops at the first match
+        whose law name lookahead is cut by the end of the slice. A window does not
+        know whether its first trigger is part of a citation that started in the
+        previous window. Therefore, the matches of the windows are merged by
+        continuing the search sequentially at the end of the previous window until
+        a match is found that is also found in the window. From there on, the
+        results are identical. The diagnostics are reported once per match as by
+        find_all.
+
+        Args:
+            text: The text to search in.
+            window_size: Number of chars per window
+            processes: Number of processes. By default the number of CPUs.
+            max_citation_len: Maximal number of chars of the main area and the
+                suffix before the law name of a citation. Longer citations that
+                start at most max_citation_len chars before the end of a window may
+                be found incompletely.
+
+        Returns: A list of the matches. It equals `list(find_all(text))` if no
+            citation that starts less than max_citation_len chars before the end of
+            a window is longer than max_citation_len.
+        """
+        if len(text) <= window_size:
+            return list(self.find_all(text))
+
+        overlap = max_citation_len + 1000
+        tasks = []
+        for start in range(0, len(text), window_size):
+            end = min(start + window_size, len(text))
+            # Some chars before the window for lookbehinds like "\b"
+            offset = max(start - 10, 0)
+            tasks.append((text[offset : end + overlap], offset, start, end, len(text)))
+
+        # The processes get an extractor without instrumentation and diagnostics
+        # of their own, as both cannot be shared between processes
+        extractor = StatutesExtractor(self.laws_lookup, None, self.search_timeout)
+        ctx = multiprocessing.get_context()
+        with ctx.Pool(
+            processes, initializer=init_window_extractor, initargs=(extractor,)
+        ) as pool:
+            windows_matches = []
+            windows_reports = []
+            for window_matches, reports in pool.imap(find_all_in_window, tasks, 1):
+                windows_reports.append(reports)
+                windows_matches.append(
+                    [
+                        (
+                            StatutesMatchWithMainArea(
+                                suffix_len, law_len, law_match_type, text, start, end
+                            )
+                            if law_match_type is not None
+                            else StatusMatch(text, start, end)
+                        )
+                        for start, end, suffix_len, law_len, law_match_type in (
+                            window_matches
+                        )
+                    ]
+                )
+
+        results = []
+        match = self.search(text, 0)
+        for (_, _, _, end, _), window_matches, reports in zip(
+            tasks, windows_matches, windows_reports
+        ):
+            index_by_start = {m.start: idx for idx, m in enumerate(window_matches)}
+            while match and match.start < end:
+                idx = index_by_start.get(match.start)
+                if idx is not None:
+                    # Synchronized with the matches of the window. The sequential
+                    # search already reported the diagnostics of the first one.
+                    results.extend(window_matches[idx:])
+                    for report in reports[idx + 1 :]:
+                        if report is not None:
+                            self.diagnostics.merge(Diagnostics.from_dict(report))
+                    match = self.search(text, self.get_next_pos(results[-1]))
+                    break
+                results.append(match)
+                match = self.search(text, self.get_next_pos(match))
+        return results
+
+    def find_all_in_segments(self, segments, lookahead: int = 2000):
+        """
+        Finds the matches in a sequence of text segments, e.g. the text nodes of an
+        XML document, as if the segments were joined. A citation can span several
+        segments, e.g. if the law name is in the next node.
+
+        The segments are not joined. Instead, the search continues in a buffer of
+        the following 2 * lookahead chars after the current position. The buffer is
+        extended until at least lookahead chars follow the beginning of the law name
+        of a match.
+
+        Args:
+            segments: Sequence of strings
+            lookahead: Number of chars that must follow the beginning of a law name.
+                Must exceed the 1000 chars searched for a law name. Citations must
+                not contain runs of whitespace that are longer than
+                `lookahead - 1000` chars.
+
+        Returns: A generator of SegmentsMatch objects. The text of each match is a
+            part of the joined segments that contains the match.
+        """
+        segment_starts = [0]
+        for segment in segments:
+            segment_starts.append(segment_starts[-1] + len(segment))
+        total_len = segment_starts[-1]
+
+        def locate(position, is_end=False):
+            if is_end or position == total_len:
+                idx = bisect.bisect_left(segment_starts, position) - 1
+            else:
+                idx = bisect.bisect_right(segment_starts, position) - 1
+            return idx, position - segment_starts[idx]
+
+        def join(start, end):
+            idx = bisect.bisect_right(segment_starts, start) - 1
+            parts = []
+            while idx < len(segments) and segment_starts[idx] < end:
+                parts.append(
+                    segments[idx][
+                        max(start - segment_starts[idx], 0) : end - segment_starts[idx]
+                    ]
+                )
+                idx += 1
+            return "".join(parts)
+
+        pos = 0
+        buffer_len = 2 * lookahead
+        while pos < total_len:
+            # Some chars before the position for lookbehinds like "\b"
+            buffer_start = max(pos - 10, 0)
+            buffer_end = min(pos + buffer_len, total_len)
+            buffer = join(buffer_start, buffer_end)
+
+            match = self.search(buffer, pos - buffer_start)
+            if not match:
+                if buffer_end == total_len:
+                    break
+                # Continue before the end of the buffer, as a trigger may be cut
+                pos = max(buffer_end - 10, pos + 1)
+                continue
+
+            law_start = match.end
+            if match.has_main_area():
+                law_start += match.suffix_len
+            if buffer_end < total_len and law_start + lookahead > len(buffer):
+                # The match may be cut by the end of the buffer. Search again with a
+                # buffer that begins at the match or, if it does already, that is
+                # longer.
+                if buffer_start + match.start == pos:
+                    buffer_len *= 2
+                pos = buffer_start + match.start
+                continue
+
+            next_pos = buffer_start + self.get_next_pos(match)
+            yield SegmentsMatch(
+                match,
+                locate(buffer_start + match.start),
+                locate(buffer_start + match.end, is_end=True),
+                locate(buffer_start + law_start),
+                locate(next_pos, is_end=True),
+            )
+            pos = next_pos
+            buffer_len = 2 * lookahead
+
+    @staticmethod
+    def get_next_pos(match: StatusMatch) -> int:
+        """
+        Returns: The position to continue searching after a match.
         """
+        if match.has_main_area():
+            return match.end + match.suffix_len + match.law_len
+        return match.end
+
+    def _find_all(self, text: str, pos: int, endpos: int = None):
         curr_pos = pos
-        match = self.search(text, curr_pos)
+        match = self.search(text, curr_pos, endpos)
         while match:
             yield match
-            curr_pos = match.end
-            if match.has_main_area():
-                curr_pos += match.suffix_len + match.law_len
-            match = self.search(text, curr_pos)
+            curr_pos = self.get_next_pos(match)
+            match = self.search(text, curr_pos, endpos)
 
-    def get_suffix_and_law_name(self, string: str):
+    def get_suffix_and_law_name(self, string: str, pos: int = 0):
         """
+        Args:
+            string: The text to search in.
+            pos: Position in string where the main area ends. The string is not
+                copied beyond the 1000 chars that may contain the law name.
+
         Returns: A tuple containing length of
 
             1. the article between numbers and law name (eg. " der ")
@@ -86,46 +455,64 @@ class StatutesExtractor(StatutesProcessor):
 
             If not found lengths are 0.
         """
-        suffix_match = regex.match(r"^,?\s+?de[sr]\s+", string)
+        try:
+            return self._get_suffix_and_law_name(string, pos)
+        except TimeoutError:
+            self.diagnostics.report("law_name_timeout", string[pos : pos + 100])
+            suffix_match = law_name_suffix_pattern.match(
+                string, pos
+            ) or law_name_whitespace_pattern.match(string, pos, pos + 1000)
+            return len(suffix_match[0]) if suffix_match else 0, 0, "unknown"
+
+    def _get_suffix_and_law_name(self, string: str, pos: int):
+        timeout, concurrent = self.search_timeout, self.concurrent
+        suffix_match = law_name_suffix_pattern.match(string, pos)
 
         if suffix_match:
 
-            suffix_len = suffix_match.end()
-            law_test = string[suffix_len : suffix_len + 1000]
+            suffix_len = suffix_match.end() - pos
+            law_start = suffix_match.end()
+            law_test = string[law_start : law_start + 1000]
 
             dict_suffix_len = self.get_dict_law_name_len(law_test)
             if dict_suffix_len:
                 return suffix_len, dict_suffix_len, "dict"
 
-            sgb_suffix_len = self.get_sgb_law_name_len(law_test)
+            sgb_suffix_len = self.get_sgb_law_name_len(law_test, timeout, concurrent)
             if sgb_suffix_len:
                 return suffix_len, sgb_suffix_len, "sgb"
 
-            eu_suffix_len = self.get_eu_law_name_len(law_test)
+            eu_suffix_len = self.get_eu_law_name_len(law_test, timeout, concurrent)
             if eu_suffix_len:
                 return suffix_len, eu_suffix_len, "eu"
 
-            ignore_suffix_len = self.get_ignore_law_name_len(law_test)
+            ignore_suffix_len = self.get_ignore_law_name_len(
+                law_test, timeout, concurrent
+            )
             if ignore_suffix_len:
                 return suffix_len, ignore_suffix_len, "ignore"
 
             return suffix_len, 0, "unknown"
 
         else:  # no der/des suffix
-            suffix_match = regex.match(r"^[\s\n]+", string[:1000])
+            suffix_match = law_name_whitespace_pattern.match(string, pos, pos + 1000)
             if suffix_match:
                 suffix_len = len(suffix_match[0])
-                law_test = string[suffix_len:1000]
+                law_test = string[suffix_match.end() : pos + 1000]
 
                 dict_suffix_len = self.get_dict_law_name_len(law_test)
                 if dict_suffix_len:
                     return suffix_len, dict_suffix_len, "dict"
 
-                sgb_suffix_len = self.get_sgb_law_name_len(law_test)
+                sgb_suffix_len = self.get_sgb_law_name_len(
+                    law_test, timeout, concurrent
+                )
                 if sgb_suffix_len:
                     return suffix_len, sgb_suffix_len, "sgb"
 
-                ignore_no_suffix_len = self.get_no_suffix_ignore_law_name_len(law_test)
+                ignore_no_suffix_len = self.get_no_suffix_ignore_law_name_len(
+                    law_test, timeout, concurrent
+                )
                 if ignore_no_suffix_len:
                     return suffix_len, ignore_no_suffix_len, "ignore"
 
@@ -139,7 +526,7 @@ class StatutesExtractor(StatutesProcessor):
         """
 
         # Stem the test_str as the law names are already stemmed
-        test_str_stem = stem_law_name(test_str)
+        test_str_stem = self.stem_law_name(test_str)
 
         # Look for matching law names
         match = self.match_law_name(test_str_stem)
@@ -150,15 +537,15 @@ class StatutesExtractor(StatutesProcessor):
         # original text by splitting the original and the raw text into words (tokens)
         # and define the area of the original string that it contains of the same number
         # of tokens as the matched area in the stemmed string.
-        test_str_splitted = regex.findall(r"[\w']+|[\W']+", test_str)
-        match_splitted = regex.findall(r"[\w']+|[\W']+", match)
+        test_str_splitted = law_name_token_pattern.findall(test_str)
+        match_splitted = law_name_token_pattern.findall(match)
         match_raw = "".join(test_str_splitted[: len(match_splitted)])
         assert len(test_str_splitted[0].strip()) > 0, (match, test_str, test_str_stem)
 
         # If last matched word of law name does continue after match with
         # a string that would not be stemmed, return no match
         # TODO look for other matches before returning no match
-        last_word_test_stemmed = stem_law_name(
+        last_word_test_stemmed = self.stem_law_name(
             test_str_splitted[len(match_splitted) - 1]
         )
         last_word_match = match_splitted[-1]
@@ -168,47 +555,106 @@ class StatutesExtractor(StatutesProcessor):
         return len(match_raw)
 
     @staticmethod
-    def get_no_suffix_ignore_law_name_len(test_str) -> int:
+    def get_no_suffix_ignore_law_name_len(
+        test_str, timeout: float = None, concurrent: bool = None
+    ) -> int:
         """
         Returns: Length of the law name in chars, if no suffix is present that connects
             the main area with the law name or 0 if no law name of this type was found
         """
 
         match = ignore_law_name_pattern.match(
-            test_str,
+            test_str, timeout=timeout, concurrent=concurrent
         )
 
         return len(match[0]) if match else 0
 
     @staticmethod
-    def get_sgb_law_name_len(test_str) -> int:
+    def get_sgb_law_name_len(
+        test_str, timeout: float = None, concurrent: bool = None
+    ) -> int:
         """
         Returns: The length of the SGB law name in chars or 0 if no law name of this
             type was found
         """
 
         match = sgb_law_name_pattern.match(
-            test_str,
+            test_str, timeout=timeout, concurrent=concurrent
         )
 
         return len(match[0]) if match else 0
 
     @staticmethod
-    def get_eu_law_name_len(test_str) -> int:
+    def get_eu_law_name_len(
+        test_str, timeout: float = None, concurrent: bool = None
+    ) -> int:
         """
         Returns: The length of the law name of european legislation in chars or
             0 if no law name of this type was found
         """
         match = eu_law_name_pattern.match(
-            test_str,
+            test_str, timeout=timeout, concurrent=concurrent
         )
         return len(match[0]) if match else 0
 
     @staticmethod
-    def get_ignore_law_name_len(test_str):
+    def get_ignore_law_name_len(
+        test_str, timeout: float = None, concurrent: bool = None
+    ):
         """
         Returns: Th length of a law name to ignore in chars or 0 if no law name of
             this type was found
         """
-        match = suffix_ignore_pattern.match(test_str)
+        match = suffix_ignore_pattern.match(
+            test_str, timeout=timeout, concurrent=concurrent
+        )
         return len(match[0]) if match else 0
+
+
+# Extractor of the worker processes of StatutesExtractor.find_all_in_windows
+window_extractor = None
+
+
+def init_window_extractor(extractor: StatutesExtractor):
+    global window_extractor
+    window_extractor = extractor
+
+
+def find_all_in_window(task):
+    """
+    Finds the matches that start in a window of a text with the extractor set by
+    init_window_extractor.
+
+    Args:
+        task: Tuple of the slice of the text, the position of the slice in the text,
+            the start and end of the window and the length of the text
+
+    Returns: A tuple of the matches and the diagnostics reported while searching
+        each match, as dict (see Diagnostics.to_dict) or None. The matches are
+        tuples of start, end, suffix_len, law_len and law_match_type relative to
+        the text. The last three are None for matches without main area.
+    """
+    text, offset, start, end, text_len = task
+    extractor = window_extractor
+    extractor.diagnostics = Diagnostics()
+    is_cut = offset + len(text) < text_len
+    matches = []
+    reports = []
+    for match in extractor._find_all(text, start - offset, end - offset):
+        if match.has_main_area():
+            law_start = match.end + match.suffix_len
+            values = (match.suffix_len, match.law_len, match.law_match_type)
+        else:
+            law_start = match.end
+            values = (None, None, None)
+        if is_cut and law_start + 1000 > len(text):
+            # The match may differ in the whole text
+            break
+        matches.append((match.start + offset, match.end + offset, *values))
+        # The diagnostics of the next search are collected separately
+        if extractor.diagnostics.counts:
+            reports.append(extractor.diagnostics.to_dict())
+            extractor.diagnostics = Diagnostics()
+        else:
+            reports.append(None)
+    return matches, reports
@@ -2,6 +2,8 @@
 
 from regex import regex
 
+from quantlaw.utils.patterns import LazyPattern
+
 ###########
 # Main area
 ###########
@@ -93,15 +95,29 @@ reference_range_pattern_str = (
     r')?'
 )
 # fmt: on
-reference_range_pattern = regex.compile(
+# The large patterns of this module are compiled on first use
+reference_range_pattern = LazyPattern(
     reference_range_pattern_str, flags=regex.IGNORECASE
 )
 
+# Matches of reference_range_pattern can only start with a trigger ("§", "Art" or
+# "Artikel"). This cheap pattern finds candidate positions, so that the expensive
+# pattern above must only be applied where a reference can actually start.
+reference_trigger_pattern = regex.compile(r"§|art", flags=regex.IGNORECASE)
+
 
 ##########
 # Law name
 ##########
 
+# Patterns of the suffix that may connect the main area with the law name. They are
+# applied at the end of the main area.
+law_name_suffix_pattern = regex.compile(r",?\s+?de[sr]\s+")
+law_name_whitespace_pattern = regex.compile(r"[\s\n]+")
+
+# Splits law names into words and the characters between them
+law_name_token_pattern = regex.compile(r"[\w']+|[\W']+")
+
 # The pattern to identify if a law name follows after the suffix.
 
 # fmt: off
@@ -159,7 +175,7 @@ suffix_ignore_pattern_str = (
     r')'
 )
 # fmt: on
-suffix_ignore_pattern = regex.compile(suffix_ignore_pattern_str, flags=regex.IGNORECASE)
+suffix_ignore_pattern = LazyPattern(suffix_ignore_pattern_str, flags=regex.IGNORECASE)
 
 # SGB law name pattern
 
@@ -182,7 +198,7 @@ sgb_law_name_pattern_str = (
     r")"
 )
 # fmt: on
-sgb_law_name_pattern = regex.compile(sgb_law_name_pattern_str, flags=regex.IGNORECASE)
+sgb_law_name_pattern = LazyPattern(sgb_law_name_pattern_str, flags=regex.IGNORECASE)
 
 # Patterns of names of european legislation
 
@@ -199,7 +215,7 @@ eu_law_name_pattern_str = (
     r")"
 )
 # fmt: on
-eu_law_name_pattern = regex.compile(eu_law_name_pattern_str, flags=regex.IGNORECASE)
+eu_law_name_pattern = LazyPattern(eu_law_name_pattern_str, flags=regex.IGNORECASE)
 
 # Pattern of law names to ignore
 
@@ -211,6 +227,6 @@ ignore_law_name_pattern_str = (
     r")"
 )
 # fmt: on
-ignore_law_name_pattern = regex.compile(
+ignore_law_name_pattern = LazyPattern(
     ignore_law_name_pattern_str, flags=regex.IGNORECASE
 )
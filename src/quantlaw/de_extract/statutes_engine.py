@@ -0,0 +1,111 @@
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.utils.diagnostics import Diagnostics
+
+
+class StatutesEngine:
+    """
+    Extracts and parses the citations to German statutes and regulations of a text
+    in a single pass.
+
+    Usually, the matches of StatutesExtractor are parsed afterwards by
+    StatutesParser, which normalizes and tokenizes the main area of each match
+    again. The engine instead builds the reference paths from the units, numbers
+    and connectors that reference_range_pattern captured while recognizing the
+    main area. The results equal those of StatutesParser.parse_matches. Main areas
+    with rare forms, e.g. numbers in words, are parsed by StatutesParser.parse_main.
+    """
+
+    def __init__(
+        self,
+        laws_lookup: dict,
+        diagnostics: Diagnostics = None,
+        search_timeout: float = None,
+        concurrent: bool = False,
+    ):
+        """
+        Args:
+            laws_lookup: See StatutesProcessor.laws_lookup
+            diagnostics: Shared by the extractor and the parser. See
+                StatutesProcessor
+            search_timeout: See StatutesExtractor
+            concurrent: See StatutesExtractor
+        """
+        self.extractor = StatutesExtractor(
+            laws_lookup, diagnostics, search_timeout, concurrent
+        )
+        self.parser = StatutesParser(laws_lookup, self.extractor.diagnostics)
+
+    @property
+    def laws_lookup(self) -> dict:
+        """
+        See StatutesProcessor.laws_lookup. Setting it updates the extractor and the
+        parser.
+        """
+        return self.extractor.laws_lookup
+
+    @laws_lookup.setter
+    def laws_lookup(self, val: dict):
+        self.extractor.laws_lookup = val
+        self.parser.laws_lookup = val
+
+    @property
+    def diagnostics(self) -> Diagnostics:
+        return self.extractor.diagnostics
+
+    def find_all(
+        self, text: str, current_lawid: str = None, compact: bool = False
+    ) -> list:
+        """
+        Finds and parses all citations of a text.
+
+        Args:
+            text: The text to search in.
+            current_lawid: Id of the law that contains the text. Required if the text
+                contains citations of the type "internal".
+            compact: Return the paths as ReferencePath objects. See
+                StatutesParser.parse_main
+
+        Returns: A flat list of records, one per reference path, like
+            StatutesParser.parse_matches returns them.
+        """
+        extractor = self.extractor
+        parser = self.parser
+        parsed_mains = {}
+        parsed_laws = {}
+        records = []
+        pos = 0
+        while True:
+            match, main_match = extractor.search_with_main_area_match(text, pos)
+            if match is None:
+                break
+            pos = extractor.get_next_pos(match)
+            if main_match is None:
+                continue
+
+            main_text = main_match[0]
+            reference_paths = parsed_mains.get(main_text)
+            if reference_paths is None:
+                reference_paths = parsed_mains[main_text] = parser.parse_main_match(
+                    main_match, compact
+                )
+
+            law_key = (match.law_text(), match.law_match_type)
+            if law_key in parsed_laws:
+                lawid = parsed_laws[law_key]
+            else:
+                lawid = parsed_laws[law_key] = parser.parse_law(
+                    *law_key, current_lawid=current_lawid
+                )
+
+            for reference_path in reference_paths:
+                records.append(
+                    dict(
+                        start=match.start,
+                        end=match.end,
+                        law_match_type=match.law_match_type,
+                        lawid=lawid,
+                        path=reference_path,
+                    )
+                )
+        return records
@@ -0,0 +1,260 @@
+import bisect
+from collections import namedtuple
+
+from regex import regex
+
+# Patterns of headings of nodes in a crossreference graph and the units of the
+# paths returned by StatutesParser they correspond to. E.g. "§ 12a Anwendungsbereich"
+# is ("§", "12a") and "(4)" is ("Abs", "4"). The patterns of subunits must match the
+# whole heading, as headings of chapters like "1. Abschnitt" start alike.
+heading_patterns = [
+    (regex.compile(r"§§?\s*(\d+[a-z]?)\b", flags=regex.IGNORECASE), "§"),
+    (regex.compile(r"Art(?:ikel|\.)?\s*(\d+[a-z]?)\b", flags=regex.IGNORECASE), "Art"),
+    (regex.compile(r"\((\d+[a-z]?)\)$"), "Abs"),
+    (regex.compile(r"(\d+[a-z]?)\.$"), "Nr"),
+    (regex.compile(r"([a-z]{1,2})\)$"), "Buchstabe"),
+]
+
+
+value_sort_key_pattern = regex.compile(r"(\d+)(.*)")
+
+
+def value_sort_key(value: str) -> tuple:
+    """
+    Returns: A key to sort values of units in the order of the law. E.g. "9" < "9a"
+        < "10". Numeric values are sorted before other values.
+    """
+    match = value_sort_key_pattern.fullmatch(value)
+    if match:
+        return 0, int(match[1]), match[2]
+    return 1, 0, value
+
+
+class RangeSpan(namedtuple("RangeSpan", "keys start end")):
+    """
+    Compact result of ReferenceGraphIndex.expand_range. keys is a list of node keys
+    that is shared by all spans of the same units. The range contains the nodes
+    keys[start:end].
+    """
+
+    __slots__ = ()
+
+    def to_list(self) -> list:
+        return self.keys[self.start : self.end]
+
+    def __len__(self):
+        return self.end - self.start
+
+
+def parse_heading(attrs: dict):
+    """
+    Default parser of the citable component of a node in a crossreference graph.
+
+    Args:
+        attrs: Attributes of the node
+
+    Returns: A tuple of the unit and the value, e.g. ("§", "12a") for the heading
+        "§ 12a Anwendungsbereich", or None if the heading does not start with a
+        citable unit.
+    """
+    heading = attrs.get("heading")
+    if type(heading) is not str:
+        return None
+    heading = heading.strip()
+    for pattern, unit in heading_patterns:
+        match = pattern.match(heading)
+        if match:
+            return unit, match[1].lower()
+    return None
+
+
+class ReferenceGraphIndex:
+    """
+    Index to resolve references parsed by StatutesParser to the nodes of a
+    crossreference graph, e.g. loaded by
+    quantlaw.utils.networkx.load_graph_from_csv_files.
+
+    The index is built once per graph. It contains a tree for each law that follows
+    the containment hierarchy of the graph: law id → section → subunit → node key.
+    Nodes without a citable heading, e.g. chapters, are skipped, so that their
+    children are indexed under the next citable ancestor.
+
+    Ranges like "§§ 1 bis 10" are expanded with the children of a node ordered by
+    their values. The ordered sections of each law are computed when the index is
+    built, the ordered children of other nodes on first use.
+    """
+
+    def __init__(
+        self,
+        G,
+        lawid_attribute: str = "law_name",
+        component_parser=parse_heading,
+    ):
+        """
+        Args:
+            G: Crossreference graph with edges of the edge_type "containment"
+            lawid_attribute: Node attribute that contains the law id. A law starts
+                at the topmost node that has a law id that differs from its parent.
+            component_parser: Function that returns the unit and the value of a node
+                given its attributes or None. See parse_heading.
+        """
+        children = {}
+        has_parent = set()
+        for u, v, edge_type in G.edges(data="edge_type"):
+            if edge_type == "containment":
+                children.setdefault(u, []).append(v)
+                has_parent.add(v)
+
+        # Law ids mapped to tuples of the node key and the index of its children.
+        # The children indices map (unit, value) tuples to tuples of the same form.
+        self.laws = {}
+        self.ambiguous_components = 0
+
+        nodes = G.nodes
+        stack = [(n, None, None) for n in reversed(list(nodes)) if n not in has_parent]
+        while stack:
+            node, lawid, index = stack.pop()
+            attrs = nodes[node]
+            node_lawid = attrs.get(lawid_attribute)
+            if node_lawid and node_lawid != lawid:
+                lawid = node_lawid
+                if lawid in self.laws:
+                    self.ambiguous_components += 1
+                    index = self.laws[lawid][1]
+                else:
+                    index = {}
+                    self.laws[lawid] = (node, index)
+            elif index is not None:
+                component = component_parser(attrs)
+                if component is not None:
+                    if component in index:
+                        # Keep the first node, but index the children of both
+                        self.ambiguous_components += 1
+                        index = index[component][1]
+                    else:
+                        child_index = {}
+                        index[component] = (node, child_index)
+                        index = child_index
+
+            for child in reversed(children.get(node, ())):
+                stack.append((child, lawid, index))
+
+        for _, index in self.laws.values():
+            self.get_ordered_children(index)
+
+    @staticmethod
+    def get_ordered_children(index: dict) -> dict:
+        """
+        Args:
+            index: Index of the children of a node
+
+        Returns: A dict that maps each unit to a tuple of the sort keys of the values
+            and the node keys of the children of this unit ordered by value. The
+            result is cached in the index with the key None.
+        """
+        ordered = index.get(None)
+        if ordered is None:
+            by_unit = {}
+            for component, (key, _) in index.items():
+                if component is not None:
+                    unit, value = component
+                    by_unit.setdefault(unit, []).append((value_sort_key(value), key))
+            ordered = {}
+            for unit, items in by_unit.items():
+                items.sort()
+                ordered[unit] = ([k for k, _ in items], [n for _, n in items])
+            index[None] = ordered
+        return ordered
+
+    def resolve(self, lawid: str, path):
+        """
+        Resolves a reference in O(length of path).
+
+        Args:
+            lawid: Law id, e.g. returned by StatutesParser.parse_law
+            path: A reference path returned by StatutesParser.parse_main, e.g.
+                `[['§', '123'], ['Abs', '4']]`, or a ReferencePath
+
+        Returns: The key of the deepest node that exists for the path, e.g. the node
+            of § 123 if it has no subsection 4. The node of the law if its first
+            component does not exist. None if the law is not in the graph.
+        """
+        entry = self.laws.get(lawid)
+        if entry is None:
+            return None
+        key, index = entry
+        for unit, value in path:
+            if value is None:
+                break
+            entry = index.get((unit, value.lower()))
+            if entry is None:
+                break
+            key, index = entry
+        return key
+
+    def expand_range(self, lawid: str, start_path, end_path):
+        """
+        Expands a range to the nodes it contains, e.g. "§§ 1 bis 10" or
+        "§ 5 Abs. 1 bis 3". The nodes are searched by binary search, hence endpoints
+        that do not exist in the graph are possible.
+
+        The range is expanded on the level of the first component in which start_path
+        and end_path differ. Deeper components are ignored. E.g. "§ 1 Abs. 2 bis § 3"
+        contains the sections 1 to 3.
+
+        Args:
+            lawid: Law id, e.g. returned by StatutesParser.parse_law
+            start_path: First path of the range, e.g. `[['§', '1']]`
+            end_path: Last path of the range, e.g. `[['§', '10']]`. See
+                StatutesParser.parse_main_with_ranges to get the paths of ranges.
+
+        Returns: A RangeSpan or None if the law, the common prefix of the paths or
+            the unit of the range does not exist, the units of the endpoints differ
+            or one path is a prefix of the other.
+        """
+        entry = self.laws.get(lawid)
+        if entry is None:
+            return None
+        index = entry[1]
+        for (start_unit, start_value), (end_unit, end_value) in zip(
+            start_path, end_path
+        ):
+            if start_unit != end_unit or start_value is None or end_value is None:
+                return None
+            start_value = start_value.lower()
+            end_value = end_value.lower()
+            if start_value != end_value:
+                break
+            entry = index.get((start_unit, start_value))
+            if entry is None:
+                return None
+            index = entry[1]
+        else:
+            if len(start_path) != len(end_path):
+                # One path is a prefix of the other, e.g. "§ 5 Abs. 2 bis § 5"
+                return None
+            # Identical paths
+            key = self.resolve(lawid, start_path)
+            return RangeSpan([key], 0, 1)
+
+        ordered = self.get_ordered_children(index).get(start_unit)
+        if ordered is None:
+            return None
+        sort_keys, keys = ordered
+        start = bisect.bisect_left(sort_keys, value_sort_key(start_value))
+        end = bisect.bisect_right(sort_keys, value_sort_key(end_value))
+        return RangeSpan(keys, start, max(start, end))
+
+    def resolve_many(self, references) -> list:
+        """
+        Resolves many references at once.
+
+        Args:
+            references: Iterable of tuples of law ids and paths. Records of
+                StatutesParser.parse_matches can be passed as
+                `((r["lawid"], r["path"]) for r in records)`.
+
+        Returns: A list of the node keys. See resolve.
+        """
+        resolve = self.resolve
+        return [resolve(lawid, path) for lawid, path in references]
@@ -0,0 +1,255 @@
+import bisect
+from collections import OrderedDict
+from collections.abc import Mapping
+from itertools import compress
+
+
+class VersionedLawsLookup:
+    """
+    Stores the laws_lookup dicts of many snapshot dates at once. Each law name is
+    stored once with the intervals of snapshots in which it is valid, and the law
+    ids are looked up in these intervals. As the lookups of consecutive dates
+    overlap largely, this needs much less memory than separate dicts.
+
+    Use view to get the laws_lookup of a date. Views of dates between which the
+    lookup did not change (an epoch) share the sorted list of law names that
+    StatutesProcessor would create otherwise. The intervals of all names are sorted
+    once into a single array. The lookup of an epoch is a selector of the valid
+    intervals in this array, which is derived from a checkpoint by applying the
+    changes of at most checkpoint_interval epochs. The sorted law names of an epoch
+    are then selected without sorting. Thus, switching a processor between dates
+    is cheap:
+
+        versioned = VersionedLawsLookup()
+        versioned.add("2020-01-01", laws_lookup_2020)
+        versioned.add("2021-01-01", laws_lookup_2021)
+        extractor.laws_lookup = versioned.view("2020-06-30")
+    """
+
+    def __init__(self, max_cached_epochs: int = 8, checkpoint_interval: int = 16):
+        """
+        Args:
+            max_cached_epochs: Number of epochs, i.e. intervals of dates with the
+                same lookup, whose sorted law names and law ids are kept.
+            checkpoint_interval: Number of epochs between the kept selectors of
+                the valid intervals. Each selector takes one byte per interval.
+        """
+        self.dates = []
+        # Law names mapped to lists of intervals [first, end, lawid, position] of
+        # indices of dates. end is excluded and None for the names of the latest
+        # date. position is the index of the interval in self.entries.
+        self.intervals = {}
+        # Indices of the dates at which the lookup changed and tuples of the
+        # removed and the added names at these dates
+        self.epochs = []
+        self.epoch_changes = []
+        self.current = {}
+        self.max_cached_epochs = max_cached_epochs
+        self.cached_epochs = OrderedDict()
+        self.checkpoint_interval = checkpoint_interval
+        # Selectors of the valid intervals of every checkpoint_interval-th epoch
+        self.checkpoints = {}
+        # Tuple of the names and the law ids of all intervals sorted by name like
+        # StatutesProcessor.laws_lookup_keys. Created on first use.
+        self.entries = None
+
+    def add(self, date, laws_lookup: dict):
+        """
+        Adds the laws_lookup of a snapshot date. Dates must be added in increasing
+        order.
+        """
+        if self.dates and date <= self.dates[-1]:
+            raise ValueError(f"Dates must be added in increasing order: {date}")
+        idx = len(self.dates)
+        self.dates.append(date)
+        intervals = self.intervals
+        current = self.current
+        removed = []
+        added = []
+
+        for name, lawid in laws_lookup.items():
+            current_lawid = current.get(name)
+            if current_lawid is not None:
+                if current_lawid == lawid:
+                    continue
+                intervals[name][-1][1] = idx
+                removed.append(name)
+            elif name not in intervals:
+                intervals[name] = []
+            intervals[name].append([idx, None, lawid])
+            added.append(name)
+
+        if len(current) - len(removed) > len(laws_lookup) - len(added):
+            # Close the intervals of removed names
+            for name in current.keys() - laws_lookup.keys():
+                intervals[name][-1][1] = idx
+                removed.append(name)
+
+        self.current = dict(laws_lookup)
+        if removed or added or not self.epochs:
+            self.epochs.append(idx)
+            self.epoch_changes.append((removed, added))
+            # The positions of the intervals change
+            self.entries = None
+            self.checkpoints = {}
+            self.cached_epochs.clear()
+
+    def get_date_index(self, date) -> int:
+        """
+        Returns: The index of the latest date that is not after date
+        """
+        idx = bisect.bisect_right(self.dates, date) - 1
+        if idx < 0:
+            raise KeyError(f"No laws_lookup before {date}")
+        return idx
+
+    def view(self, date):
+        """
+        Returns: A LawsLookupView of the laws_lookup of the latest snapshot that is
+            not after date.
+        """
+        idx = self.get_date_index(date)
+        return LawsLookupView(self, idx, bisect.bisect_right(self.epochs, idx) - 1)
+
+    def get_entries(self) -> tuple:
+        """
+        Returns: self.entries. Sorts the intervals and sets their positions if
+            needed.
+        """
+        if self.entries is None:
+            items = [
+                (name, interval)
+                for name, intervals in self.intervals.items()
+                for interval in intervals
+            ]
+            items.sort(key=lambda item: item[0], reverse=True)
+            names = []
+            lawids = []
+            for position, (name, interval) in enumerate(items):
+                interval[3:] = [position]
+                names.append(name)
+                lawids.append(interval[2])
+            self.entries = names, lawids
+        return self.entries
+
+    def get_selector(self, epoch: int) -> bytearray:
+        """
+        Args:
+            epoch: Position of the epoch in self.epochs
+
+        Returns: A bytearray that is 1 at the positions of the intervals in
+            self.entries that are valid in the epoch and 0 otherwise. It is derived
+            from the latest checkpoint. Missing checkpoints are created.
+        """
+        names, _ = self.get_entries()
+        checkpoint = max((e for e in self.checkpoints if e <= epoch), default=None)
+        if checkpoint is None:
+            selector = bytearray(len(names))
+            start = 0
+        else:
+            selector = bytearray(self.checkpoints[checkpoint])
+            start = checkpoint + 1
+        for e in range(start, epoch + 1):
+            idx = self.epochs[e]
+            removed, added = self.epoch_changes[e]
+            for name in removed:
+                selector[self.get_interval(name, idx - 1)[3]] = 0
+            for name in added:
+                selector[self.get_interval(name, idx)[3]] = 1
+            if e % self.checkpoint_interval == 0:
+                self.checkpoints[e] = bytes(selector)
+        return selector
+
+    def get_epoch_data(self, epoch: int) -> tuple:
+        """
+        Args:
+            epoch: Position of the epoch in self.epochs
+
+        Returns: A tuple of the law names sorted like
+            StatutesProcessor.laws_lookup_keys and the set of the law ids of the
+            epoch.
+        """
+        data = self.cached_epochs.get(epoch)
+        if data is not None:
+            self.cached_epochs.move_to_end(epoch)
+            return data
+
+        selector = self.get_selector(epoch)
+        names, lawids = self.entries
+        data = list(compress(names, selector)), frozenset(compress(lawids, selector))
+
+        self.cached_epochs[epoch] = data
+        if len(self.cached_epochs) > self.max_cached_epochs:
+            self.cached_epochs.popitem(last=False)
+        return data
+
+    def get_interval(self, name: str, idx: int):
+        """
+        Returns: The interval of a law name that contains the date with the index
+            idx or None.
+        """
+        for interval in reversed(self.intervals.get(name, ())):
+            first, end = interval[:2]
+            if first <= idx:
+                return interval if end is None or idx < end else None
+        return None
+
+    def get_lawid(self, name: str, idx: int):
+        """
+        Returns: The law id of a law name at the date with the index idx or None.
+        """
+        interval = self.get_interval(name, idx)
+        return None if interval is None else interval[2]
+
+
+class LawsLookupView(Mapping):
+    """
+    Read-only laws_lookup of a date of a VersionedLawsLookup. It can be assigned to
+    StatutesProcessor.laws_lookup.
+    """
+
+    def __init__(self, versioned: VersionedLawsLookup, idx: int, epoch: int):
+        self.versioned = versioned
+        self.idx = idx
+        self.date = versioned.dates[idx]
+        self.epoch = epoch
+        self._data = None
+
+    def _get_data(self):
+        if self._data is None:
+            self._data = self.versioned.get_epoch_data(self.epoch)
+        return self._data
+
+    @property
+    def laws_lookup_keys(self) -> list:
+        """
+        The law names sorted like StatutesProcessor.laws_lookup_keys. Shared by the
+        views of the same epoch.
+        """
+        return self._get_data()[0]
+
+    @property
+    def laws_lookup_values(self) -> frozenset:
+        return self._get_data()[1]
+
+    def __getitem__(self, name: str):
+        lawid = self.versioned.get_lawid(name, self.idx)
+        if lawid is None:
+            raise KeyError(name)
+        return lawid
+
+    def __contains__(self, name):
+        return self.versioned.get_lawid(name, self.idx) is not None
+
+    def __iter__(self):
+        return iter(self.laws_lookup_keys)
+
+    def __len__(self):
+        return len(self.laws_lookup_keys)
+
+    def __repr__(self):
+        return f"LawsLookupView({self.date!r}, {len(self)} law names)"
+
+    def __getstate__(self):
+        # Do not pickle the data of the epoch, it is shared with the versioned lookup
+        return dict(self.__dict__, _data=None)
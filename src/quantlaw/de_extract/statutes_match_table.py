@@ -0,0 +1,120 @@
+import numpy as np
+
+from quantlaw.de_extract.statutes_abstract import (
+    StatusMatch,
+    StatutesMatchWithMainArea,
+)
+
+# Categories of matches. The position in this tuple is the type code of a match in
+# a MatchTable. Code 0 is used for matches that consist of a trigger only.
+match_types = (None, "dict", "internal", "sgb", "eu", "ignore", "unknown")
+match_type_codes = {match_type: code for code, match_type in enumerate(match_types)}
+
+
+class MatchTable:
+    """
+    Columnar representation of the matches found in one text. Instead of one object
+    per match, the positions are stored in NumPy arrays and the text is referenced
+    only once. Use it to collect a large number of matches with little memory.
+    """
+
+    __slots__ = ("text", "start", "end", "suffix_len", "law_len", "type_code")
+
+    def __init__(
+        self,
+        text: str,
+        start: np.ndarray,
+        end: np.ndarray,
+        suffix_len: np.ndarray,
+        law_len: np.ndarray,
+        type_code: np.ndarray,
+    ):
+        """
+        Args:
+            text: The text the matches were found in.
+            start: Start positions of the trigger/main areas
+            end: End positions of the trigger/main areas
+            suffix_len: Lengths of the suffixes. 0 for matches without main area.
+            law_len: Lengths of the law names. 0 for matches without main area.
+            type_code: Positions of the law match types in `match_types`.
+                0 for matches without main area.
+        """
+        self.text = text
+        self.start = start
+        self.end = end
+        self.suffix_len = suffix_len
+        self.law_len = law_len
+        self.type_code = type_code
+
+    @classmethod
+    def from_matches(cls, text: str, matches):
+        """
+        Creates a MatchTable from an iterable of StatusMatch objects found in text.
+        The matches are consumed one by one and not kept in memory.
+        """
+        start, end, suffix_len, law_len, type_code = [], [], [], [], []
+        for match in matches:
+            start.append(match.start)
+            end.append(match.end)
+            if match.has_main_area():
+                suffix_len.append(match.suffix_len)
+                law_len.append(match.law_len)
+                type_code.append(match_type_codes[match.law_match_type])
+            else:
+                suffix_len.append(0)
+                law_len.append(0)
+                type_code.append(0)
+        return cls(
+            text=text,
+            start=np.array(start, dtype=np.int64),
+            end=np.array(end, dtype=np.int64),
+            suffix_len=np.array(suffix_len, dtype=np.int32),
+            law_len=np.array(law_len, dtype=np.int32),
+            type_code=np.array(type_code, dtype=np.int8),
+        )
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, idx: int) -> StatusMatch:
+        """
+        Returns: The match at position idx converted to a StatusMatch or
+            StatutesMatchWithMainArea object.
+        """
+        type_code = int(self.type_code[idx])
+        if not type_code:
+            return StatusMatch(
+                text=self.text,
+                start=int(self.start[idx]),
+                end=int(self.end[idx]),
+            )
+        return StatutesMatchWithMainArea(
+            text=self.text,
+            start=int(self.start[idx]),
+            end=int(self.end[idx]),
+            suffix_len=int(self.suffix_len[idx]),
+            law_len=int(self.law_len[idx]),
+            law_match_type=match_types[type_code],
+        )
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def to_matches(self) -> list:
+        """
+        Returns: The matches converted back to a list of StatusMatch objects.
+        """
+        return list(self)
+
+    def has_main_area(self) -> np.ndarray:
+        """
+        Returns: Boolean array that is True for matches with a main area
+        """
+        return self.type_code != 0
+
+    def law_match_types(self) -> np.ndarray:
+        """
+        Returns: Array of the law match types. None for matches without main area.
+        """
+        return np.array(match_types, dtype=object)[self.type_code]
@@ -0,0 +1,158 @@
+import itertools
+from collections import Counter, deque, namedtuple
+
+from quantlaw.de_extract.statutes_areas_patterns import law_name_token_pattern
+from quantlaw.de_extract.stemming import clean_name, stem_law_name
+
+LawNameMention = namedtuple("LawNameMention", "start end law_name lawid")
+LawNameMention.__doc__ = """
+Mention of a law name in a text. start and end are the positions in the raw text,
+law_name is the stemmed law name of the laws_lookup and lawid its law id.
+"""
+
+
+class LawNameScanner:
+    """
+    Finds all mentions of the law names of a laws_lookup in a text, e.g. "BGB" in
+    "nach dem BGB", independent of citations.
+
+    The law names are split into tokens (words and the characters between them)
+    and compiled into an Aho-Corasick automaton over tokens. A text is tokenized
+    and stemmed token by token and scanned in a single pass. The tokens map the
+    mentions back to the positions in the raw text.
+
+    Mentions do not overlap. Of overlapping law names the leftmost and then the
+    longest one is returned, e.g. "Bürgerliches Gesetzbuch" instead of
+    "Gesetzbuch".
+    """
+
+    def __init__(self, laws_lookup: dict, max_cached_tokens: int = 100000):
+        """
+        Args:
+            laws_lookup: Stemmed law names mapped to law ids. See
+                StatutesProcessor.laws_lookup.
+            max_cached_tokens: Maximal number of stemmed tokens to cache
+        """
+        self.laws_lookup = laws_lookup
+        self.max_cached_tokens = max_cached_tokens
+        self.stemmed_tokens = {}
+
+        # The automaton: Transitions, failure links and outputs per state. The
+        # outputs are tuples of the number of tokens and the law name of all law
+        # names that end in a state.
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+
+        for law_name in laws_lookup:
+            tokens = self.split_law_name(law_name)
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                next_state = self.goto[state].get(token)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][token] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                state = next_state
+            self.outputs[state] = ((len(tokens), law_name),)
+
+        # Tokens that occur in any law name. Other tokens reset the automaton.
+        self.vocabulary = frozenset(
+            token for transitions in self.goto for token in transitions
+        )
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and token not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(token, 0)
+                self.fail[next_state] = fail
+                self.outputs[next_state] += self.outputs[fail]
+
+    @staticmethod
+    def split_law_name(law_name: str) -> list:
+        """
+        Returns: The tokens of a stemmed law name. Whitespace is normalized like by
+            clean_name.
+        """
+        return [clean_name(token) for token in law_name_token_pattern.findall(law_name)]
+
+    def stem_token(self, token: str) -> str:
+        """
+        Returns: The token stemmed like the law names of the laws_lookup. As
+            stem_law_name only changes the ends of words, stemming the tokens of a
+            text gives the same result as stemming the text.
+        """
+        stemmed = self.stemmed_tokens.get(token)
+        if stemmed is None:
+            if token.strip() == token:
+                stemmed = stem_law_name(token)
+            else:
+                # Whitespace between words that stem_law_name would strip
+                stemmed = clean_name(token)
+            if len(self.stemmed_tokens) >= self.max_cached_tokens:
+                self.stemmed_tokens.clear()
+            self.stemmed_tokens[token] = stemmed
+        return stemmed
+
+    def find_all(self, text: str) -> list:
+        """
+        Returns: A list of LawNameMention objects of all law names in the text in
+            the order of the text.
+        """
+        tokens = law_name_token_pattern.findall(text)
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        vocabulary = self.vocabulary
+        stemmed_tokens = self.stemmed_tokens
+        stem_token = self.stem_token
+
+        # Tuples of the indices of the first and the last token and the law name
+        candidates = []
+        state = 0
+        for idx, token in enumerate(tokens):
+            stemmed = stemmed_tokens.get(token) or stem_token(token)
+            if stemmed not in vocabulary:
+                state = 0
+                continue
+            while state and stemmed not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(stemmed, 0)
+            for n_tokens, law_name in outputs[state]:
+                candidates.append((idx - n_tokens + 1, idx, law_name))
+
+        if not candidates:
+            return []
+
+        # Select the leftmost longest mentions that do not overlap
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        offsets = [0, *itertools.accumulate(map(len, tokens))]
+        mentions = []
+        next_idx = 0
+        for first, last, law_name in candidates:
+            if first >= next_idx:
+                mentions.append(
+                    LawNameMention(
+                        offsets[first],
+                        offsets[last + 1],
+                        law_name,
+                        self.laws_lookup[law_name],
+                    )
+                )
+                next_idx = last + 1
+        return mentions
+
+    def count(self, text: str) -> Counter:
+        """
+        Returns: The number of mentions per law id in the text.
+        """
+        return Counter(mention.lawid for mention in self.find_all(text))
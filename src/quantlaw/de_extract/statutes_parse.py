@@ -5,15 +5,21 @@ from regex import regex
 
 from quantlaw.de_extract.statutes_abstract import StatutesProcessor
 from quantlaw.de_extract.statutes_parse_patterns import (
+    citation_error_pattern,
+    numb_ff_pattern,
     numb_pattern,
+    numb_suffix_pattern,
     pre_numb_pattern,
+    range_connector_pattern,
     sgb_dict,
     split_citation_into_parts_pattern,
     split_citation_into_range_parts_pattern,
     split_unit_number_pattern,
+    unit_codes,
     unit_patterns,
 )
-from quantlaw.de_extract.stemming import stem_law_name
+from quantlaw.de_extract.statutes_reference_path import ReferencePath
+from quantlaw.utils.diagnostics import Diagnostics
 
 
 class StringCaseException(Exception):
@@ -38,7 +44,27 @@ class StatutesParser(StatutesProcessor):
     Class to parse the content of a reference area identified by StatutesExtractor
     """
 
-    def parse_main(self, main_text: str) -> list:
+    instrumented_methods = (
+        "parse_main",
+        "parse_main_match",
+        "parse_law",
+        "get_sgb_lawid",
+        "stem_law_name",
+    )
+
+    # Maximal number of citation parts cached by split_citation_part_cached
+    max_cached_citation_parts = 100000
+
+    def __init__(self, laws_lookup: dict, diagnostics: Diagnostics = None):
+        super().__init__(laws_lookup, diagnostics)
+        # Caches of parse_main_match: Captured units and numbers mapped to the
+        # stemmed units resp. values
+        self.captured_units = {}
+        self.captured_values = {}
+        # Cache of split_citation_part_cached
+        self.citation_parts = {}
+
+    def parse_main(self, main_text: str, compact: bool = False) -> list:
         """
         Parses a string containing a reference to a specific section within a given law.
         E.g. "§ 123 Abs. 4 Satz 5 und 6".
@@ -55,33 +81,212 @@ class StatutesParser(StatutesProcessor):
         `[[['§', '123'], ['Abs', '4'], ['Satz', '5']],
         [['§', '123'], ['Abs', '4'], ['Satz', '6']]]`.
 
+        With `compact=True` a tuple of interned ReferencePath objects is returned
+        instead. They share the common prefixes of the paths and encode units as
+        integers, which saves memory if many citations are parsed. As their
+        components are not modified, the tokenized parts of the citations, e.g.
+        "Abs. 1", are cached and reused, which saves time.
+
         Args:
             main_text: string to parse
+            compact: Return ReferencePath objects instead of nested lists.
 
         Returns: The parsed reference.
         """
+        return self.parse_main_with_ranges(main_text, compact)[0]
+
+    def parse_main_with_ranges(self, main_text: str, compact: bool = False) -> tuple:
+        """
+        Parses a reference like parse_main and additionally returns the ranges of the
+        reference. Ranges like "§§ 1 bis 10" are parsed into their first and last
+        path by parse_main. E.g. "§§ 3, 7 bis 9a" is parsed into the paths
+        `[[['§', '3']], [['§', '7']], [['§', '9a']]]` and the ranges `[(1, 2)]`.
+
+        Args:
+            main_text: string to parse
+            compact: Return ReferencePath objects instead of nested lists.
+
+        Returns: A tuple of the result of parse_main and a list of tuples of the
+            indices of the first and the last path of each range.
+        """
         citation = self.fix_errors_in_citation(main_text.strip())
 
         enum_parts = self.split_citation_into_enum_parts(citation)
 
         reference_paths = []
+        ranges = []
         for enum_part in enum_parts:
+            first_idx = len(reference_paths)
             for string in enum_part:
-                splitted_citation_part_list = list(self.split_citation_part(string))
+                if compact:
+                    splitted_citation_part_list = self.split_citation_part_cached(
+                        string
+                    )
+                else:
+                    splitted_citation_part_list = list(
+                        self.split_citation_part(string, self.diagnostics)
+                    )
                 if len(splitted_citation_part_list):
                     reference_paths.append(splitted_citation_part_list)
                 else:
-                    print(f"Empty citation part in {citation} in part {string}")
+                    self.diagnostics.report("empty_citation_part", citation)
+            if len(reference_paths) - first_idx > 1:
+                ranges.append((first_idx, len(reference_paths) - 1))
+
+        return self.complete_reference_paths(reference_paths, ranges, compact)
+
+    def complete_reference_paths(
+        self, reference_paths: list, ranges: list, compact: bool = False
+    ) -> tuple:
+        """
+        Splits accidentally joined paths and infers the units that are not stated.
+
+        Args:
+            reference_paths: Paths of the parts of a citation as lists of unit and
+                value pairs. The unit is None if it is not stated.
+            ranges: Tuples of the indices of the first and the last path of ranges
+            compact: Return ReferencePath objects instead of nested lists.
 
+        Returns: See parse_main_with_ranges
+        """
+        if ranges:
+            ranges = self.shift_ranges_of_joined_parts(reference_paths, ranges)
         reference_paths = self.split_parts_accidently_joined(reference_paths)
 
-        for reference_path in reference_paths[1:]:
-            prev_reference_path = reference_paths[
-                reference_paths.index(reference_path) - 1
-            ]
-            self.infer_units(reference_path, prev_reference_path)
+        if compact:
+            return self.build_reference_paths(reference_paths), ranges
+
+        prev_unit_ranks = None
+        for prev_reference_path, reference_path in zip(
+            reference_paths, reference_paths[1:]
+        ):
+            self.infer_units(reference_path, prev_reference_path, prev_unit_ranks)
+            prev_unit_ranks = self.get_unit_ranks(part[0] for part in reference_path)
+
+        return reference_paths, ranges
 
-        return reference_paths
+    def parse_main_match(self, match, compact: bool = False) -> list:
+        """
+        Parses the main area of a match of reference_range_pattern, e.g. returned
+        by StatutesExtractor.search_main_area. The result equals
+        `parse_main(match[0], compact)`.
+
+        Instead of splitting and tokenizing the text again, the paths are built
+        from the numbers, units and connectors the pattern has already captured.
+        Rare forms, e.g. numbers written as words, are parsed by parse_main.
+        """
+        parsed = self.parse_captures(match)
+        if parsed is None:
+            if self.instrumentation is not None:
+                self.instrumentation.count("parse_main_match.fallback")
+            return self.parse_main(match[0], compact)
+        return self.complete_reference_paths(*parsed, compact)[0]
+
+    def parse_captures(self, match):
+        """
+        Builds the paths of a match of reference_range_pattern from its captures.
+        See parse_main_match.
+
+        Returns: A tuple of the paths and the ranges, whose units are not inferred
+            yet, or None if the match must be parsed by parse_main.
+        """
+        if match.starts("wordnumb"):
+            return None
+        string = match.string
+
+        trigger = match["trigger"]
+        unit = self.get_captured_unit(trigger.rstrip())
+        if unit is None or (not trigger[-1].isspace() and unit != "§"):
+            return None
+
+        # Tuples of start, end and kind of the captures in the order of the text
+        tokens = [(start, end, "numb") for start, end in match.spans("numb")]
+        tokens.extend((start, end, "unit") for start, end in match.spans("unit"))
+        tokens.extend((start, end, "conn") for start, end in match.spans("conn"))
+        tokens.sort()
+
+        reference_paths = []
+        ranges = []
+        reference_path = []
+        enum_part_start = 0
+        prev_end = None
+        prev_kind = "trigger"
+        for start, end, kind in tokens:
+            if kind == "conn":
+                if unit is not None or not reference_path:
+                    return None
+                reference_paths.append(reference_path)
+                reference_path = []
+                conn = string[start:end]
+                if range_connector_pattern.fullmatch(conn):
+                    pass
+                elif split_citation_into_parts_pattern.fullmatch(conn):
+                    if len(reference_paths) - enum_part_start > 1:
+                        ranges.append((enum_part_start, len(reference_paths) - 1))
+                    enum_part_start = len(reference_paths)
+                else:
+                    return None
+            else:
+                if start == prev_end and prev_kind != "conn":
+                    # parse_main splits units and numbers at whitespace only
+                    return None
+                if kind == "unit":
+                    if unit is not None:
+                        return None
+                    unit = self.get_captured_unit(string[start:end])
+                    if unit is None:
+                        return None
+                else:
+                    value = self.get_captured_value(string[start:end])
+                    if value is None:
+                        return None
+                    reference_path.append([unit, value])
+                    unit = None
+            prev_end = end
+            prev_kind = kind
+
+        if unit is not None or not reference_path:
+            return None
+        reference_paths.append(reference_path)
+        if len(reference_paths) - enum_part_start > 1:
+            ranges.append((enum_part_start, len(reference_paths) - 1))
+        return reference_paths, ranges
+
+    def get_captured_unit(self, token: str):
+        """
+        Returns: The stemmed unit of a captured unit or None if parse_main would
+            not treat the token as unit. Results are cached.
+        """
+        try:
+            return self.captured_units[token]
+        except KeyError:
+            unit = self.stem_unit(token) if self.is_unit(token) else None
+            self.captured_units[token] = unit
+            return unit
+
+    def get_captured_value(self, token: str):
+        """
+        Returns: The value of a captured number like split_citation_part returns
+            it or None if parse_main would not treat the token as number.
+            E.g. "5" for "5 ff.". Results are cached.
+        """
+        try:
+            return self.captured_values[token]
+        except KeyError:
+            pass
+        value = None
+        if not self.is_unit(token):
+            parts = token.split()
+            if len(parts) == 2:
+                # "5 ff." is normalized to "5ff." and the suffix is removed
+                value = parts[0] if self.is_numb(parts[0] + "ff.") else None
+            elif len(parts) == 1 and self.is_numb(token):
+                value = numb_suffix_pattern.sub("", token)
+        if not value:
+            # A lone "ff." is joined to the previous token by parse_main
+            value = None
+        self.captured_values[token] = value
+        return value
 
     def parse_law(self, law_text: str, match_type: str, current_lawid: str = None):
         """
@@ -95,24 +300,19 @@ class StatutesParser(StatutesProcessor):
         Returns: The key of a parse law.
 
         """
-
-        if match_type == "dict":
-            lawname_stem = stem_law_name(law_text)
-            match = self.match_law_name(lawname_stem)
-            return self.laws_lookup[match]
-
-        elif match_type == "sgb":
-            lawid = sgb_dict[stem_law_name(law_text)]
-            if type(lawid) is tuple:
-                assert len(lawid) == 2
-                if lawid[0] in self.laws_lookup.values():
-                    return lawid[0]
-                elif lawid[1] in self.laws_lookup.values():
-                    return lawid[1]
+        if self.instrumentation is not None:
+            self.instrumentation.count(f"parse_law.{match_type}")
+
+        if match_type in {"dict", "sgb"}:
+            cache_key = (law_text, match_type)
+            lawid = self.lawid_by_law_text.get(cache_key)
+            if lawid is None:
+                if match_type == "dict":
+                    lawid = self.get_lawid_by_stem(self.stem_law_name(law_text))
                 else:
-                    return lawid[1]
-            else:
-                return lawid
+                    lawid = self.get_sgb_lawid(law_text)
+                self.lawid_by_law_text[cache_key] = lawid
+            return lawid
 
         elif match_type == "internal":
             if current_lawid is None:
@@ -122,6 +322,86 @@ class StatutesParser(StatutesProcessor):
         else:
             return None  # match_type: ignore or unknown
 
+    def get_sgb_lawid(self, law_text: str) -> str:
+        """
+        Returns: The law id of a book of the SGB. E.g. "SGB-3" for
+            "Drittes Buch Sozialgesetzbuch"
+        """
+        lawid = sgb_dict[self.stem_law_name(law_text)]
+        if type(lawid) is tuple:
+            assert len(lawid) == 2
+            if lawid[0] in self.laws_lookup_values:
+                return lawid[0]
+            else:
+                return lawid[1]
+        else:
+            return lawid
+
+    def parse_matches(
+        self, matches, current_lawid: str = None, skip_errors: bool = False
+    ) -> list:
+        """
+        Parses all matches of a document found by StatutesExtractor at once.
+        Identical main areas and law names are parsed only once per batch.
+
+        Args:
+            matches: Iterable of StatusMatch objects. Matches without main area are
+                skipped.
+            current_lawid: Id of the law that contains the matches. Required if
+                matches of the type "internal" are present.
+            skip_errors: Skip matches whose main area or law name cannot be parsed
+                instead of raising the exception. They are reported to the
+                diagnostics as "parse_main_error" resp. "parse_law_error".
+
+        Returns: A flat list of records, one per reference path, that can be passed
+            to pandas.DataFrame. Each record is a dict with the keys "start" and
+            "end" of the main area, "law_match_type", "lawid" and "path". Records
+            of identical citations share their path lists.
+        """
+        parsed_mains = {}
+        parsed_laws = {}
+        records = []
+        for match in matches:
+            if not match.has_main_area():
+                continue
+
+            main_text = match.main_text()
+            reference_paths = parsed_mains.get(main_text)
+            if reference_paths is None:
+                try:
+                    reference_paths = self.parse_main(main_text)
+                except Exception:
+                    if not skip_errors:
+                        raise
+                    self.diagnostics.report("parse_main_error", main_text)
+                    continue
+                parsed_mains[main_text] = reference_paths
+
+            law_key = (match.law_text(), match.law_match_type)
+            if law_key in parsed_laws:
+                lawid = parsed_laws[law_key]
+            else:
+                try:
+                    lawid = self.parse_law(*law_key, current_lawid=current_lawid)
+                except Exception:
+                    if not skip_errors:
+                        raise
+                    self.diagnostics.report("parse_law_error", law_key[0])
+                    continue
+                parsed_laws[law_key] = lawid
+
+            for reference_path in reference_paths:
+                records.append(
+                    dict(
+                        start=match.start,
+                        end=match.end,
+                        law_match_type=match.law_match_type,
+                        lawid=lawid,
+                        path=reference_path,
+                    )
+                )
+        return records
+
     @staticmethod
     def stem_unit(unit: str):
         """
@@ -171,10 +451,21 @@ class StatutesParser(StatutesProcessor):
         """
         Fix some common inconsistencies in the references such as double spaces.
         """
-        result = regex.sub(r"\s+", " ", citation)
-        result = regex.sub(r"§(?=\d)", "§ ", result)
-        result = regex.sub(r",\sbis\s", " bis ", result)
-        return result
+        return citation_error_pattern.sub(
+            StatutesParser.fix_citation_error_match, citation
+        )
+
+    @staticmethod
+    def fix_citation_error_match(match) -> str:
+        """
+        Returns: The replacement of a match of citation_error_pattern
+        """
+        first_char = match[0][0]
+        if first_char == ",":
+            return " bis "
+        if first_char == "§":
+            return "§ "
+        return " "
 
     @staticmethod
     def split_citation_into_enum_parts(citation):
@@ -208,13 +499,7 @@ class StatutesParser(StatutesProcessor):
         the same reference path and split the path into several elements.
         """
         new_reference_paths = []
-        main_unit = (
-            "Art"
-            if Counter([part[0] for part in itertools.chain(*reference_paths)]).get(
-                "Art"
-            )
-            else "§"
-        )
+        main_unit = StatutesParser.get_main_unit(reference_paths)
         for reference_path in reference_paths:
             temp_path = []
             for part in reference_path:
@@ -227,36 +512,160 @@ class StatutesParser(StatutesProcessor):
         return new_reference_paths
 
     @staticmethod
-    def infer_units(reference_path, prev_reference_path):
+    def get_main_unit(reference_paths) -> str:
+        """
+        Returns: "Art" if the unit "Art" occurs in the reference paths, otherwise "§"
+        """
+        return (
+            "Art"
+            if Counter([part[0] for part in itertools.chain(*reference_paths)]).get(
+                "Art"
+            )
+            else "§"
+        )
+
+    @staticmethod
+    def shift_ranges_of_joined_parts(reference_paths, ranges) -> list:
+        """
+        Adjusts the indices of ranges to the paths after split_parts_accidently_joined
+        is applied to reference_paths. A range starts at the last and ends at the
+        first path that is split from a joined path.
+        """
+        main_unit = StatutesParser.get_main_unit(reference_paths)
+        offsets = []
+        offset = 0
+        for reference_path in reference_paths:
+            offsets.append(offset)
+            offset += 1 + sum(1 for part in reference_path[1:] if part[0] == main_unit)
+        offsets.append(offset)
+        return [(offsets[start + 1] - 1, offsets[end]) for start, end in ranges]
+
+    @staticmethod
+    def get_unit_ranks(units) -> dict:
+        """
+        Args:
+            units: The units of a reference path in their order
+
+        Returns: A dict that maps the units to the position of their first
+            occurrence in the path.
+        """
+        unit_ranks = {}
+        for idx, unit in enumerate(units):
+            unit_ranks.setdefault(unit, idx)
+        return unit_ranks
+
+    @staticmethod
+    def infer_units(reference_path, prev_reference_path, prev_unit_ranks=None):
         """
         In some cases of an enumeration a numeric value is not directed prefixed by
         the corresponding unit. E.g. "§ 123 Abs. 1 S. 2, 3 S. 4". In this case "3"
         is not prefixed with its unit. Instead it can be inferred by looking at the
         whole citation that it is next higher unit of "S.", hence "Abs.". These
         inferred units are added to parsed data.
+
+        Args:
+            reference_path: The path to complete.
+            prev_reference_path: The preceding path in the citation.
+            prev_unit_ranks: Result of get_unit_ranks for prev_reference_path. It is
+                computed if not given.
         """
-        prev_path_units = [o[0] for o in prev_reference_path]
-        if reference_path[0][0]:
-            pass
-        elif len(reference_path) > 1:
-            try:
-                prev_unit_index = prev_path_units.index(reference_path[1][0])
-                # if not prev_unit_index > 0:
-                #     print(f'Infer unit error: {citation}')
-                reference_path[0][0] = prev_path_units[prev_unit_index - 1]
-            except ValueError:
-                reference_path[0][0] = prev_path_units[-1]
+        if prev_unit_ranks is None:
+            prev_unit_ranks = StatutesParser.get_unit_ranks(
+                part[0] for part in prev_reference_path
+            )
+
+        if not reference_path[0][0]:
+            prev_unit_index = (
+                prev_unit_ranks.get(reference_path[1][0])
+                if len(reference_path) > 1
+                else None
+            )
+            if prev_unit_index is None:
+                reference_path[0][0] = prev_reference_path[-1][0]
+            else:
+                reference_path[0][0] = prev_reference_path[prev_unit_index - 1][0]
+
+        prev_unit_index = prev_unit_ranks.get(reference_path[0][0])
+        if prev_unit_index is None:
+            reference_path[0:0] = prev_reference_path
         else:
-            reference_path[0][0] = prev_path_units[-1]
+            reference_path[0:0] = prev_reference_path[:prev_unit_index]
 
+    @staticmethod
+    def build_reference_paths(reference_paths: list) -> tuple:
+        """
+        Converts reference paths of a citation into ReferencePath objects. Units that
+        are not stated in the citation are inferred from the previous path like
+        infer_units does. Instead of copying the components of the previous path,
+        the common prefix is shared.
+
+        Args:
+            reference_paths: Paths of a citation whose units are not inferred yet.
+
+        Returns: A tuple of ReferencePath objects.
+        """
+        result = []
+        prev_path = None
+        prev_path_units = []
+        prev_unit_ranks = {}
+        for reference_path in reference_paths:
+            path_units = [unit_codes.get(unit) for unit, _ in reference_path]
+            if prev_path is None:
+                path = None
+            else:
+                if path_units[0] is None:
+                    prev_unit_index = (
+                        prev_unit_ranks.get(path_units[1])
+                        if len(path_units) > 1
+                        else None
+                    )
+                    if prev_unit_index is None:
+                        path_units[0] = prev_path_units[-1]
+                    else:
+                        path_units[0] = prev_path_units[prev_unit_index - 1]
+
+                prev_unit_index = prev_unit_ranks.get(path_units[0])
+                if prev_unit_index is None:
+                    path = prev_path
+                    path_units[0:0] = prev_path_units
+                else:
+                    path = prev_path.ancestor(prev_unit_index)
+                    path_units[0:0] = prev_path_units[:prev_unit_index]
+
+            offset = len(path_units) - len(reference_path)
+            for unit_code, (_, value) in zip(path_units[offset:], reference_path):
+                path = ReferencePath.create(path, unit_code, value)
+            result.append(path)
+            prev_path = path
+            prev_path_units = path_units
+            prev_unit_ranks = StatutesParser.get_unit_ranks(path_units)
+        return tuple(result)
+
+    def split_citation_part_cached(self, string: str) -> tuple:
+        """
+        Like split_citation_part, but returns a tuple of unit and value tuples,
+        which must not be modified. The results are cached per string. The
+        conditions found in the string are reported to the diagnostics on each call.
+        """
         try:
-            prev_unit_index = prev_path_units.index(reference_path[0][0])
-            reference_path[0:0] = prev_reference_path[:prev_unit_index]
-        except Exception:
-            reference_path[0:0] = prev_reference_path
+            components, diagnostics = self.citation_parts[string]
+        except KeyError:
+            diagnostics = Diagnostics()
+            components = tuple(
+                tuple(component)
+                for component in self.split_citation_part(string, diagnostics)
+            )
+            if not diagnostics.counts:
+                diagnostics = None
+            if len(self.citation_parts) >= self.max_cached_citation_parts:
+                self.citation_parts.clear()
+            self.citation_parts[string] = components, diagnostics
+        if diagnostics is not None:
+            self.diagnostics.merge(diagnostics)
+        return components
 
     @staticmethod
-    def split_citation_part(string: str):
+    def split_citation_part(string: str, diagnostics: Diagnostics = None):
         """
         A string a tokenizes. Tokens are identified as units or values. Pairs are
         built to connect the units with their respective values. If the unit cannot
@@ -264,6 +673,9 @@ class StatutesParser(StatutesProcessor):
 
         Args:
             string: A string that is part of a reference and cites *one* part a statute.
+            diagnostics: Collects the parts that are ignored, i.e. a unit at the end
+                of the string ("trailing_unit") or a number followed by a token that
+                is not a unit ("not_a_unit").
 
         Retruns: As a generator tuples are returned, each containing the unit (or None)
             and the respecive value.
@@ -271,19 +683,7 @@ class StatutesParser(StatutesProcessor):
 
         # Tokenization
 
-        # fmt: off
-        string = regex.sub(
-            r"("
-            r"\d+(?>\.\d+)?[a-z]?|"
-            r"\b[ivx]+|"
-            r"\b[a-z]\)?"
-            r")"
-            r"(\sff?\.|\sff\b)",
-            r"\1ff.",
-            string,
-            flags=regex.IGNORECASE,
-        )
-        # fmt: on
+        string = numb_ff_pattern.sub(r"\1ff.", string)
         tokens = split_unit_number_pattern.split(
             string,
         )
@@ -298,17 +698,17 @@ class StatutesParser(StatutesProcessor):
                     token = tokens.pop(0)
                     numb = token
                     assert StatutesParser.is_numb(numb), numb
-                else:  # when citation ends with unit
-                    print(
-                        f"Citation {string} ends with unit {token}. Ignoring last unit."
-                    )
+                else:  # when citation ends with unit. Ignoring last unit.
+                    if diagnostics is not None:
+                        diagnostics.report("trailing_unit", string)
                     break
 
             elif StatutesParser.is_pre_numb(token):
                 numb = token
                 token = tokens.pop(0)
                 if not StatutesParser.is_unit(token):
-                    print(token, "is not a unit in", string)
+                    if diagnostics is not None:
+                        diagnostics.report("not_a_unit", string)
                     continue
                     # to fix citation "§ 30 DRITTER ABSCHNITT"
                     # Last part in now ignored,
@@ -320,5 +720,5 @@ class StatutesParser(StatutesProcessor):
                 numb = token
             else:
                 raise StringCaseException(token, "in", string)
-            numb = regex.sub(r"(ff?\.|ff|\))$", "", numb)
+            numb = numb_suffix_pattern.sub("", numb)
             yield [unit, numb]
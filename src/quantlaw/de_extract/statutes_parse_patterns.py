@@ -84,6 +84,11 @@ unit_patterns = {
     r"Anhang|Anhänge": "Anhang",
 }
 
+# Standard units in the order of unit_patterns. The position of a unit is used as
+# its code in compact representations of reference paths.
+unit_names = tuple(dict.fromkeys(unit_patterns.values()))
+unit_codes = {unit: code for code, unit in enumerate(unit_names)}
+
 # fmt: off
 pre_numb_pattern = regex.compile(
     r"("
@@ -130,6 +135,30 @@ split_citation_into_parts_pattern = regex.compile(
 
 split_citation_into_range_parts_pattern = regex.compile(r"\s*,?\s+bis\s+")
 
+# A connector captured by reference_range_pattern that separates the ends of a range
+range_connector_pattern = regex.compile(r",?\s+bis\s+")
+
+# Inconsistencies fixed by StatutesParser.fix_errors_in_citation in one pass:
+# A comma before "bis", runs of whitespace other than a single space and a missing
+# space after "§".
+citation_error_pattern = regex.compile(r",\s+bis\s+|[^\S ]\s*| \s+|§(?=\d)")
+
+# fmt: off
+# A number followed by "ff." or "f.", which split_citation_part joins to e.g. "5ff."
+numb_ff_pattern = regex.compile(
+    r"("
+    r"\d+(?>\.\d+)?[a-z]?|"
+    r"\b[ivx]+|"
+    r"\b[a-z]\)?"
+    r")"
+    r"(\sff?\.|\sff\b)",
+    flags=regex.IGNORECASE,
+)
+# fmt: on
+
+# Suffix of a number that is not part of the value
+numb_suffix_pattern = regex.compile(r"(ff?\.|ff|\))$")
+
 split_unit_number_pattern_str = (
     r"\s|(?<=Art\.|Art\b|Artikeln|Artikel)(?=\d)|(?<=§)(?=[A-Z0-9])"
 )
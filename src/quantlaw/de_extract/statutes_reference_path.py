@@ -0,0 +1,141 @@
+import sys
+import weakref
+
+from quantlaw.de_extract.statutes_parse_patterns import unit_codes, unit_names
+
+
+class ReferencePath:
+    """
+    Compact and immutable representation of a path that is parsed from a reference.
+    E.g. "§ 123 Abs. 4".
+
+    A ReferencePath stores only the last path component and refers to the
+    ReferencePath of its parent. E.g. the path above contains the unit "Abs", the
+    value "4" and the parent path "§ 123". Thus, paths of a citation share their
+    common prefixes. Units are encoded as positions in `unit_names`.
+
+    Instances are interned. Create them with ReferencePath.create to reuse an
+    existing equal instance. The intern table holds weak references, so paths are
+    freed as soon as they are not used anymore.
+    """
+
+    __slots__ = ("parent", "unit", "value", "depth", "_hash", "__weakref__")
+
+    _interned = weakref.WeakValueDictionary()
+
+    def __init__(self, parent, unit: int, value: str):
+        """
+        Args:
+            parent: ReferencePath of the parent or None if the path has only one
+                component.
+            unit: Code of the unit of the last path component. None if the unit is
+                unknown.
+            value: Value of the last path component. E.g. "123".
+        """
+        self.parent = parent
+        self.unit = unit
+        self.value = value
+        if parent is None:
+            self.depth = 1
+            self._hash = hash((unit, value))
+        else:
+            self.depth = parent.depth + 1
+            self._hash = hash((parent._hash, unit, value))
+
+    @classmethod
+    def create(cls, parent, unit: int, value: str):
+        """
+        Returns: An interned ReferencePath. See __init__ for the arguments.
+        """
+        # The parent is interned and kept alive by its children. As long as a path
+        # is in the intern table, the id of its parent is not reused. Hence, the id
+        # is a unique and cheap key.
+        key = (id(parent), unit, value)
+        path = cls._interned.get(key)
+        if path is None:
+            # setdefault ensures uniqueness also if the path is created concurrently
+            path = cls._interned.setdefault(key, cls(parent, unit, sys.intern(value)))
+        return path
+
+    @classmethod
+    def clear_interned(cls):
+        """
+        Removes all interned paths. Existing paths remain valid, but are not reused
+        by ReferencePath.create anymore.
+        """
+        cls._interned.clear()
+
+    @classmethod
+    def from_list(cls, reference_path: list):
+        """
+        Converts a path in the format of StatutesParser.parse_main into a
+        ReferencePath. E.g. `[['§', '123'], ['Abs', '4']]`
+        """
+        path = None
+        for unit, value in reference_path:
+            path = cls.create(path, unit_codes.get(unit), value)
+        return path
+
+    @property
+    def unit_name(self) -> str:
+        """
+        Returns: The name of the unit of the last component. E.g. "Abs"
+        """
+        return unit_names[self.unit] if self.unit is not None else None
+
+    def ancestor(self, depth: int):
+        """
+        Returns: The prefix of the path with the given depth or None if depth is 0.
+        """
+        path = self
+        while path is not None and path.depth > depth:
+            path = path.parent
+        return path
+
+    def components(self) -> list:
+        """
+        Returns: The ReferencePath objects of all prefixes of the path (including the
+            path itself) ordered from the root to the last component.
+        """
+        result = []
+        path = self
+        while path is not None:
+            result.append(path)
+            path = path.parent
+        result.reverse()
+        return result
+
+    def to_list(self) -> list:
+        """
+        Returns: The path in the format of StatutesParser.parse_main.
+            E.g. `[['§', '123'], ['Abs', '4']]`
+        """
+        return [[path.unit_name, path.value] for path in self.components()]
+
+    def __len__(self):
+        return self.depth
+
+    def __iter__(self):
+        for path in self.components():
+            yield path.unit_name, path.value
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, ReferencePath):
+            return NotImplemented
+        return (
+            self._hash == other._hash
+            and self.unit == other.unit
+            and self.value == other.value
+            and self.parent == other.parent
+        )
+
+    def __reduce__(self):
+        return ReferencePath.create, (self.parent, self.unit, self.value)
+
+    def __repr__(self):
+        return f"ReferencePath({self.to_list()})"
@@ -0,0 +1,259 @@
+import json
+
+from lxml import etree
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_parse import StatutesParser
+
+
+def annotate_statutes_xml(
+    source,
+    target,
+    extractor: StatutesExtractor,
+    parser: StatutesParser = None,
+    norm_tags=("seqitem",),
+    reference_tag: str = "reference",
+    current_lawid: str = None,
+):
+    """
+    Reads a statute XML file, wraps the references found by the extractor in
+    reference elements and writes the result. The file is processed as stream:
+    Only one norm, i.e. an element with a tag in norm_tags, is held in memory at a
+    time. Elements that contain norms are written as they are read.
+
+    The text nodes of a norm are searched together, so that law names in a text
+    node after the main area are found. A reference element is inserted if the
+    main area is within a single text node. It contains the elements "main",
+    "suffix" and "lawname" if the whole citation is within the text node, otherwise
+    only the main area is wrapped. E.g.
+
+        <reference law_match_type="dict" lawid="GG" parsed='[[["§", "5"]]]'>
+        <main>§ 5</main><suffix> des </suffix><lawname>Grundgesetzes</lawname>
+        </reference>
+
+    Text outside of norms, comments and processing instructions outside of norms
+    and existing reference elements are not annotated.
+
+    Args:
+        source: Path or file object of the XML file to read
+        target: Path or file object to write the annotated XML to
+        extractor: Extractor to find the references
+        parser: If given, the references get the attributes "parsed" with the
+            result of parse_main as JSON and "lawid" with the result of parse_law.
+            Parse errors are reported to the diagnostics of the parser.
+        norm_tags: Tags of the elements that are annotated at once
+        reference_tag: Tag of the inserted elements
+        current_lawid: Law id of internal references
+    """
+    norm_tags = frozenset(norm_tags)
+    containers = []  # Tuples of opened elements and their context managers
+    pending_tail = None  # Node whose tail must be written
+    norm_depth = 0  # Depth within the current norm
+    root_closed = False
+    trailing_nodes = []  # Comments and processing instructions after the root
+
+    with etree.xmlfile(target, encoding="utf-8") as xf:
+        xf.write_declaration()
+        for event, node in etree.iterparse(
+            source, events=("start", "end", "comment", "pi")
+        ):
+            if norm_depth:
+                # Comments and processing instructions are written with the norm
+                if event == "start":
+                    norm_depth += 1
+                elif event == "end":
+                    norm_depth -= 1
+                    if not norm_depth:
+                        annotate_element(
+                            node,
+                            extractor,
+                            parser,
+                            reference_tag,
+                            current_lawid,
+                        )
+                        xf.write(node, with_tail=False)
+                        node.clear(keep_tail=True)
+                        pending_tail = node
+                        root_closed = not containers
+                continue
+
+            if event != "end":
+                # A child node begins. Write the text before it.
+                if containers:
+                    parent, _, has_children = containers[-1]
+                    if not has_children:
+                        containers[-1][2] = True
+                        if parent.text:
+                            xf.write(parent.text)
+                    if pending_tail is not None:
+                        if pending_tail.tail:
+                            xf.write(pending_tail.tail)
+                        pending_tail = None
+                        _remove_previous_siblings(node)
+
+            if event == "start":
+                if node.tag in norm_tags:
+                    norm_depth = 1
+                else:
+                    context = xf.element(
+                        node.tag, node.attrib, _get_declared_namespaces(node)
+                    )
+                    context.__enter__()
+                    containers.append([node, context, False])
+            elif event == "end":
+                _, context, has_children = containers.pop()
+                root_closed = not containers
+                if not has_children and node.text:
+                    xf.write(node.text)
+                if pending_tail is not None and pending_tail.tail:
+                    xf.write(pending_tail.tail)
+                context.__exit__(None, None, None)
+                node.clear(keep_tail=True)
+                _remove_previous_siblings(node)
+                pending_tail = node
+            elif containers or not root_closed:
+                # Comment or processing instruction outside of norms
+                xf.write(node, with_tail=False)
+                # The tails of nodes outside of the root element are not kept
+                pending_tail = node if containers else None
+            else:
+                # xmlfile does not accept nodes after the root element
+                trailing_nodes.append(node)
+
+    if trailing_nodes:
+        trailing = b"".join(
+            etree.tostring(node, encoding="utf-8", with_tail=False)
+            for node in trailing_nodes
+        )
+        if hasattr(target, "write"):
+            target.write(trailing)
+        else:
+            with open(target, "ab") as f:
+                f.write(trailing)
+
+
+def _get_declared_namespaces(elem) -> dict:
+    """
+    Returns: The namespaces that are declared by elem and not by its ancestors.
+    """
+    parent = elem.getparent()
+    if parent is None:
+        return elem.nsmap
+    parent_nsmap = parent.nsmap
+    return {
+        prefix: uri
+        for prefix, uri in elem.nsmap.items()
+        if parent_nsmap.get(prefix) != uri
+    }
+
+
+def _remove_previous_siblings(elem):
+    """
+    Removes the already written siblings before elem to free memory.
+    """
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def annotate_element(
+    elem,
+    extractor: StatutesExtractor,
+    parser: StatutesParser = None,
+    reference_tag: str = "reference",
+    current_lawid: str = None,
+):
+    """
+    Wraps the references in the text nodes of an element in reference elements.
+    See annotate_statutes_xml for details.
+    """
+    # Text nodes as tuples of the element and whether the text node is its tail
+    text_nodes = []
+    for node in elem.iter():
+        if node is not elem and any(
+            ancestor.tag == reference_tag for ancestor in node.iterancestors()
+        ):
+            continue  # Already annotated
+        if node.text and node.tag not in {reference_tag, etree.Comment, etree.PI}:
+            text_nodes.append((node, False))
+        if node is not elem and node.tail:
+            text_nodes.append((node, True))
+
+    segments = [node.tail if is_tail else node.text for node, is_tail in text_nodes]
+    spans_by_node = [[] for _ in text_nodes]
+    for result in extractor.find_all_in_segments(segments):
+        match = result.match
+        if not match.has_main_area() or result.start[0] != result.end[0]:
+            continue
+        reference = etree.Element(reference_tag)
+        reference.set("law_match_type", match.law_match_type)
+        if parser:
+            set_parsed_attributes(reference, match, parser, current_lawid)
+
+        node_idx, start = result.start
+        if result.law_end[0] == node_idx and match.law_len:
+            parts = [
+                ("main", match.main_text()),
+                ("suffix", match.suffix_text()),
+                ("lawname", match.law_text()),
+            ]
+            end = result.law_end[1]
+        else:
+            parts = [("main", match.main_text())]
+            end = result.end[1]
+        for tag, text in parts:
+            etree.SubElement(reference, tag).text = text
+        spans_by_node[node_idx].append((start, end, reference))
+
+    for (node, is_tail), segment, spans in zip(text_nodes, segments, spans_by_node):
+        if spans:
+            _insert_references(node, is_tail, segment, spans)
+
+
+def set_parsed_attributes(reference, match, parser: StatutesParser, current_lawid):
+    """
+    Sets the attributes "parsed" and "lawid" of a reference element.
+    """
+    try:
+        reference.set(
+            "parsed",
+            json.dumps(parser.parse_main(match.main_text()), ensure_ascii=False),
+        )
+    except Exception:
+        parser.diagnostics.report("parse_main_error", match.main_text())
+
+    if match.law_match_type == "internal" and current_lawid is None:
+        return
+    try:
+        lawid = parser.parse_law(match.law_text(), match.law_match_type, current_lawid)
+    except Exception:
+        parser.diagnostics.report("parse_law_error", match.law_text())
+        return
+    if lawid is not None:
+        reference.set("lawid", lawid)
+
+
+def _insert_references(node, is_tail, text, spans):
+    """
+    Splits a text node and inserts the reference elements of the spans.
+    """
+    prev_end = 0
+    pieces = []
+    for start, end, reference in spans:
+        pieces.append(text[prev_end:start])
+        prev_end = end
+    pieces.append(text[prev_end:])
+
+    if is_tail:
+        node.tail = pieces[0]
+        parent = node.getparent()
+        position = parent.index(node) + 1
+    else:
+        node.text = pieces[0]
+        parent = node
+        position = 0
+
+    for idx, (_, _, reference) in enumerate(spans):
+        reference.tail = pieces[idx + 1]
+        parent.insert(position + idx, reference)
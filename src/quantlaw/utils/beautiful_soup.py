@@ -1,17 +1,21 @@
 import os
+from typing import TYPE_CHECKING
 
-from bs4 import BeautifulSoup
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 def create_soup(path):
     """
     Reads a file and returns a lxml-xml BeautifulSoup object.
     """
+    from bs4 import BeautifulSoup
+
     with open(path, encoding="utf8") as f:
         return BeautifulSoup(f.read(), "lxml-xml")
 
 
-def save_soup(soup: BeautifulSoup, path: str):
+def save_soup(soup: "BeautifulSoup", path: str):
     """
     Writes an BeautifulSoup object to a file at a given path.
     """
@@ -0,0 +1,89 @@
+import json
+import threading
+from collections import Counter
+
+
+class Diagnostics:
+    """
+    Collects conditions, e.g. malformed input, that occur during processing instead
+    of printing them. For each condition the number of occurrences and a bounded
+    sample of the offending strings is kept. Results of several instances, e.g. from
+    different worker processes, can be merged and dumped as JSON. Reports of several
+    threads can be collected by the same object.
+    """
+
+    def __init__(
+        self,
+        max_samples: int = 10,
+        echo: bool = False,
+        counts: dict = None,
+        samples: dict = None,
+    ):
+        """
+        Args:
+            max_samples: Maximal number of samples to keep per condition.
+            echo: Print each reported condition to stdout.
+            counts: Initial counts per condition
+            samples: Initial samples per condition
+        """
+        self.max_samples = max_samples
+        self.echo = echo
+        self.counts = Counter(counts or {})
+        self.samples = {name: list(values) for name, values in (samples or {}).items()}
+        self._lock = threading.Lock()
+
+    def report(self, name: str, sample: str):
+        """
+        Records an occurrence of the condition name caused by sample.
+        """
+        with self._lock:
+            self.counts[name] += 1
+            samples = self.samples.setdefault(name, [])
+            if len(samples) < self.max_samples:
+                samples.append(sample)
+        if self.echo:
+            print(f"{name}: {sample}")
+
+    def merge(self, *others):
+        """
+        Adds the results of other Diagnostics objects to this one.
+
+        Returns: self
+        """
+        for other in others:
+            self.counts.update(other.counts)
+            for name, other_samples in other.samples.items():
+                samples = self.samples.setdefault(name, [])
+                samples.extend(other_samples[: self.max_samples - len(samples)])
+        return self
+
+    def clear(self):
+        self.counts.clear()
+        self.samples.clear()
+
+    def to_dict(self) -> dict:
+        return dict(
+            counts=dict(self.counts),
+            samples={name: list(values) for name, values in self.samples.items()},
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict, **kwargs):
+        return cls(counts=data["counts"], samples=data["samples"], **kwargs)
+
+    def to_json(self, path: str = None):
+        """
+        Returns: The results as JSON string. If a path is given, the JSON is written
+            to the path instead.
+        """
+        data = self.to_dict()
+        if path is None:
+            return json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False)
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+    def __getstate__(self):
+        return dict(self.to_dict(), max_samples=self.max_samples, echo=self.echo)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
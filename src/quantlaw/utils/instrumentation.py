@@ -0,0 +1,87 @@
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+class Instrumentation:
+    """
+    Collects the number of calls and the cumulative time spent in named phases as well
+    as arbitrary counters. Results of several instances, e.g. from different worker
+    processes, can be merged and dumped as JSON. The same object can record the
+    phases of several threads.
+    """
+
+    def __init__(self, calls: dict = None, seconds: dict = None, counts: dict = None):
+        self.calls = Counter(calls or {})
+        self.seconds = defaultdict(float, seconds or {})
+        self.counts = Counter(counts or {})
+        self._lock = threading.Lock()
+
+    def timed(self, name: str, func):
+        """
+        Returns: A wrapper of func that records its calls and duration as phase name.
+            The time of nested phases is included in the time of the outer phase.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                with self._lock:
+                    self.seconds[name] += duration
+                    self.calls[name] += 1
+
+        return wrapper
+
+    def count(self, name: str, value: int = 1):
+        """
+        Increases the counter name by value.
+        """
+        with self._lock:
+            self.counts[name] += value
+
+    def merge(self, *others):
+        """
+        Adds the results of other Instrumentation objects to this one.
+
+        Returns: self
+        """
+        for other in others:
+            self.calls.update(other.calls)
+            self.counts.update(other.counts)
+            for name, seconds in other.seconds.items():
+                self.seconds[name] += seconds
+        return self
+
+    def to_dict(self) -> dict:
+        return dict(
+            calls=dict(self.calls),
+            seconds=dict(self.seconds),
+            counts=dict(self.counts),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+    def to_json(self, path: str = None):
+        """
+        Returns: The results as JSON string. If a path is given, the JSON is written
+            to the path instead.
+        """
+        data = self.to_dict()
+        if path is None:
+            return json.dumps(data, indent=2, sort_keys=True)
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
@@ -1,7 +1,10 @@
 import os
+from typing import TYPE_CHECKING
 
-import networkx as nx
-import pandas as pd
+# networkx and pandas are imported by the functions that use them, so that importing
+# this module is cheap.
+if TYPE_CHECKING:
+    import networkx as nx
 
 
 def induced_subgraph(
@@ -16,6 +19,8 @@ def induced_subgraph(
         filter_values: attribute values to evaluate to `True`
 
     """
+    import networkx as nx
+
     G = nx.MultiDiGraph(G)
     if filter_type == "node":
         nodes = [
@@ -41,7 +46,7 @@ def induced_subgraph(
     return sG
 
 
-def hierarchy_graph(G: nx.DiGraph, ignore_attrs=False):
+def hierarchy_graph(G: "nx.DiGraph", ignore_attrs=False):
     """
     Remove reference edges from G.
     Wrapper around induced_subgraph.
@@ -50,10 +55,12 @@ def hierarchy_graph(G: nx.DiGraph, ignore_attrs=False):
     return hG
 
 
-def multi_to_weighted(G: nx.MultiDiGraph):
+def multi_to_weighted(G: "nx.MultiDiGraph"):
     """
     Converts a multidigraph into a weighted digraph.
     """
+    import networkx as nx
+
     nG = nx.DiGraph(G)
     # nG.add_nodes_from(G.nodes)
     nG.name = G.name + "_weighted_nomulti"
@@ -65,7 +72,7 @@ def multi_to_weighted(G: nx.MultiDiGraph):
     return nG
 
 
-def get_leaves(G: nx.DiGraph):
+def get_leaves(G: "nx.DiGraph"):
     """
     Args:
         G: A tree as directed graph with edges from root to leaves
@@ -84,7 +91,7 @@ def decay_function(key: int):
 
 
 def sequence_graph(
-    G: nx.MultiDiGraph, seq_decay_func=decay_function(1), seq_ref_ratio=1
+    G: "nx.MultiDiGraph", seq_decay_func=decay_function(1), seq_ref_ratio=1
 ):
     """
     Creates sequence graph for G, consisting of seqitems and their cross-references
@@ -98,6 +105,7 @@ def sequence_graph(
             sequence are at minimum distance from each other and a reference edge weight
 
     """
+    import networkx as nx
 
     hG = hierarchy_graph(G, ignore_attrs=True)
     # make sure we get _all_ seqitems as leaves, not only the ones without outgoing
@@ -126,6 +134,8 @@ def get_new_edges(G, ordered_seqitems, seq_decay_func):
     """
     Convenience function to avoid list comprehension over four lines.
     """
+    import networkx as nx
+
     there = []
     back = []
     hG = hierarchy_graph(G).to_undirected()
@@ -165,6 +175,7 @@ def quotient_graph(
     Generate the quotient graph with all nodes sharing the same node_attribute condensed
     into a single node. Simplest use case is aggregation by law_name.
     """
+    import networkx as nx
 
     # node_key:attribute_value map
     attribute_data = dict(G.nodes(data=node_attribute))
@@ -235,6 +246,8 @@ def aggregate_attr_in_quotient_graph(nG, G, new_nodes, aggregation_attrs):
             the original graph that are represented by the node in the quotient graph.
         aggregation_attrs: attributes to aggregate
     """
+    import networkx as nx
+
     for attr in aggregation_attrs:
         attr_data = nx.get_node_attributes(G, attr)
         for community_id, nodes in new_nodes.items():
@@ -271,6 +284,9 @@ def load_graph_from_csv_files(
             E.g. `['containment', 'reference']`.
 
     """
+    import networkx as nx
+    import pandas as pd
+
     nodes_csv_path = os.path.join(
         crossreference_folder, f"{file_basename}.nodes.csv.gz"
     )
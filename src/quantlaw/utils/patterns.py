@@ -0,0 +1,57 @@
+import threading
+
+from regex import regex
+
+
+class LazyPattern:
+    """
+    Proxy of a regex pattern that is compiled on first use. Large patterns take
+    several milliseconds to compile, which slows down the import of modules that
+    define them, e.g. in every worker process or short command line invocation.
+
+    The proxy behaves like the compiled pattern. The attributes of the compiled
+    pattern are cached on the proxy, so that calls of e.g. `search` take no detour
+    after the first use.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        """
+        Args:
+            pattern: The pattern string as passed to `regex.compile`
+            flags: The flags as passed to `regex.compile`
+        """
+        self._pattern = pattern
+        self._flags = flags
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def compile(self):
+        """
+        Returns: The compiled pattern. It is compiled once.
+        """
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    self._compiled = regex.compile(self._pattern, self._flags)
+        return self._compiled
+
+    @property
+    def is_compiled(self) -> bool:
+        return self._compiled is not None
+
+    def __getattr__(self, name: str):
+        # Called for attributes that are not cached on the proxy yet
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = getattr(self.compile(), name)
+        setattr(self, name, value)
+        return value
+
+    def __getstate__(self):
+        return self._pattern, self._flags
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self):
+        return f"LazyPattern({self._pattern[:50]!r}, flags={self._flags})"
@@ -1,10 +1,40 @@
+import math
 import multiprocessing
+import os
+import queue
+import statistics
+import time
 
 
 class PipelineStep:
     max_number_of_processes = max(multiprocessing.cpu_count() - 2, 1)
     chunksize = None
 
+    # Execute the items by decreasing cost (see get_item_cost) in chunks of decreasing
+    # size (see get_chunks), so that a large item does not delay the end of the step
+    # when it happens to be scheduled late.
+    largest_first = False
+
+    # Choose the chunksize from the durations of the first items (the warm-up) and the
+    # time to send them to the processes and their results back. The warm-up items are
+    # dispatched one by one. Small chunks balance the load, but the overhead of the
+    # communication with the processes dominates for items that take little time.
+    # With largest_first, the warm-up items are the largest ones, so their durations
+    # are scaled by cost to the remaining items (see estimate_durations).
+    adaptive_chunksize = False
+    warmup_items_per_process = 2
+    max_ipc_overhead_fraction = 0.01
+
+    # Costs and durations in seconds per item of the last execution in the order of
+    # the items. Only recorded if largest_first or adaptive_chunksize is set.
+    item_costs = None
+    item_durations = None
+
+    # Chunksize chosen by tune_chunksize and the estimated fraction of the time per
+    # chunk that is spent on the communication with the processes
+    chosen_chunksize = None
+    ipc_overhead_fraction = None
+
     def __init__(self, processes=None, execute_args=[]):
         self.processes = processes
         self.execute_args = execute_args
@@ -15,7 +45,21 @@ class PipelineStep:
     def execute_item(self, item):
         raise Exception("This function must be implemented in the subclass")
 
+    def get_item_cost(self, item) -> float:
+        """
+        Estimates the cost of an item to schedule the items if largest_first is set.
+        Override it, e.g. if the items are file names relative to a folder.
+
+        Returns: The size of the file if the item is the path of a file, otherwise 0.
+        """
+        if isinstance(item, (str, os.PathLike)) and os.path.isfile(item):
+            return os.path.getsize(item)
+        return 0
+
     def execute_items(self, items):
+        if self.__class__.largest_first or self.__class__.adaptive_chunksize:
+            return self.finish_execution(self.execute_items_scheduled(items))
+
         ctx = multiprocessing.get_context()
         processes = self.processes or self.__class__.max_number_of_processes
 
@@ -33,6 +77,314 @@ class PipelineStep:
 
         return self.finish_execution(results)
 
+    def execute_items_scheduled(self, items) -> list:
+        """
+        Executes the items by decreasing cost in the chunks of get_chunks if
+        largest_first is set. If adaptive_chunksize is set, the chunks have at least
+        the chunksize chosen by tune_chunksize, otherwise at least chunksize items or
+        one item if chunksize is not set.
+        Records the costs and durations of the items.
+
+        Returns: The results in the order of the items
+        """
+        items = list(items)
+        costs = [self.get_item_cost(item) for item in items]
+        order = range(len(items))
+        if self.__class__.largest_first:
+            order = sorted(order, key=costs.__getitem__, reverse=True)
+        tasks = [(idx, items[idx], *self.execute_args) for idx in order]
+
+        results = [None] * len(items)
+        durations = [None] * len(items)
+        self.chosen_chunksize = None
+        self.ipc_overhead_fraction = None
+        processes = self.processes or self.__class__.max_number_of_processes
+        if processes > 1:
+            n_warmup = 0
+            if self.__class__.adaptive_chunksize:
+                n_warmup = min(
+                    len(tasks), processes * self.__class__.warmup_items_per_process
+                )
+            ctx = multiprocessing.get_context()
+            with ctx.Pool(processes) as p:
+                chunksize = self.__class__.chunksize or 1
+                remaining = tasks[n_warmup:]
+                if n_warmup:
+                    overhead = self.execute_warmup(
+                        p, tasks[:n_warmup], processes, results, durations
+                    )
+                    if remaining:
+                        chunksize = self.tune_chunksize(
+                            overhead,
+                            self.estimate_durations(
+                                tasks[:n_warmup], remaining, costs, durations
+                            ),
+                            processes,
+                            len(remaining),
+                        )
+                if self.__class__.largest_first:
+                    chunks = self.get_chunks(
+                        remaining,
+                        [costs[task[0]] for task in remaining],
+                        processes,
+                        chunksize,
+                    )
+                else:
+                    chunks = [
+                        remaining[i : i + chunksize]
+                        for i in range(0, len(remaining), chunksize)
+                    ]
+                for chunk_results in p.imap_unordered(
+                    self.execute_timed_chunk, chunks, 1
+                ):
+                    for idx, result, seconds in chunk_results:
+                        results[idx] = result
+                        durations[idx] = seconds
+        else:
+            for task in tasks:
+                idx, result, seconds = self.execute_timed_item(task)
+                results[idx] = result
+                durations[idx] = seconds
+
+        self.item_costs = costs
+        self.item_durations = durations
+        return results
+
+    def execute_warmup(self, pool, tasks, processes, results, durations) -> float:
+        """
+        Executes the warm-up tasks one by one, dispatching a task whenever a process
+        is free, and measures the overhead of the communication with the processes.
+
+        The overhead of a task is the time from its dispatch until a process starts
+        executing it plus the time from its end until the result is received. Both
+        are measured with timestamps of the processes, so that the time the
+        processes wait for tasks at the end of the warm-up does not count. The
+        first task of each process is excluded from the time to start, as it may
+        include the start of the process.
+
+        Args:
+            pool: The process pool
+            tasks: The warm-up tasks
+            processes: Number of processes of the pool
+            results: List to store the results in by the index of the item
+            durations: List to store the durations in by the index of the item
+
+        Returns: The estimated overhead in seconds per dispatched chunk
+        """
+        received = queue.Queue()
+        dispatch_times = {}
+        stamps = []
+
+        def dispatch(task):
+            dispatch_times[task[0]] = time.time()
+            pool.apply_async(
+                self.execute_stamped_item,
+                (task,),
+                callback=lambda output: received.put((output, time.time())),
+                error_callback=lambda error: received.put((error, None)),
+            )
+
+        pending = iter(tasks)
+        for _ in range(min(processes, len(tasks))):
+            dispatch(next(pending))
+
+        for _ in tasks:
+            output, received_time = received.get()
+            if received_time is None:
+                raise output
+            task = next(pending, None)
+            if task is not None:
+                dispatch(task)
+
+            idx, result, seconds, pid, start_time, end_time = output
+            results[idx] = result
+            durations[idx] = seconds
+            stamps.append(
+                (pid, dispatch_times[idx], start_time, end_time, received_time)
+            )
+
+        return self.estimate_overhead(stamps)
+
+    def estimate_overhead(self, stamps: list) -> float:
+        """
+        Estimates the overhead of the communication with the processes from the
+        timestamps of the warm-up. See execute_warmup.
+
+        Args:
+            stamps: Tuples of the id of the process and the timestamps of the
+                dispatch, the start, the end and the receipt of each task in the
+                order of receipt
+
+        Returns: The median time to start a task plus the median time to receive a
+            result in seconds. Twice the latter if every process executed one task.
+        """
+        send_seconds = []
+        return_seconds = []
+        started_pids = set()
+        for pid, dispatch_time, start_time, end_time, received_time in stamps:
+            return_seconds.append(max(received_time - end_time, 0))
+            if pid in started_pids:
+                send_seconds.append(max(start_time - dispatch_time, 0))
+            started_pids.add(pid)
+
+        return_overhead = statistics.median(return_seconds)
+        if send_seconds:
+            return statistics.median(send_seconds) + return_overhead
+        return 2 * return_overhead
+
+    def get_chunks(
+        self, tasks: list, costs: list, processes: int, min_chunksize: int = 1
+    ) -> list:
+        """
+        Splits tasks ordered by decreasing cost into chunks of decreasing size
+        (guided self-scheduling). Each chunk gets at most 1 / (2 * processes) of the
+        remaining tasks and of their remaining cost, but at least min_chunksize
+        tasks. Thus, many of the large tasks at the beginning are sent at once,
+        while the last tasks are dispatched one by one to balance the load.
+
+        Args:
+            tasks: Tasks ordered by decreasing cost
+            costs: Cost of each task. If all costs are 0, only the number of tasks
+                is considered.
+            processes: Number of processes
+            min_chunksize: Minimal number of tasks per chunk
+
+        Returns: A list of lists of tasks
+        """
+        chunks = []
+        remaining_cost = sum(costs)
+        start = 0
+        while start < len(tasks):
+            max_tasks = max(
+                math.ceil((len(tasks) - start) / (2 * processes)), min_chunksize
+            )
+            max_cost = remaining_cost / (2 * processes)
+            end = start + 1
+            chunk_cost = costs[start]
+            while (
+                end < len(tasks)
+                and end - start < max_tasks
+                and (end - start < min_chunksize or chunk_cost + costs[end] <= max_cost)
+            ):
+                chunk_cost += costs[end]
+                end += 1
+            chunks.append(tasks[start:end])
+            remaining_cost -= chunk_cost
+            start = end
+        return chunks
+
+    def estimate_durations(
+        self, warmup_tasks: list, tasks: list, costs: list, durations: list
+    ) -> list:
+        """
+        Estimates the durations of the tasks after the warm-up. With largest_first,
+        the warm-up tasks are the most costly ones. Thus, the durations are
+        estimated from the seconds per unit of cost of the warm-up tasks if they
+        have a cost.
+
+        Args:
+            warmup_tasks: The warm-up tasks
+            tasks: The tasks after the warm-up
+            costs: Costs by the index of the item
+            durations: Durations by the index of the item
+
+        Returns: The estimated duration of each task, or the durations of the warm-up
+            tasks if their costs are 0 or largest_first is not set.
+        """
+        warmup_durations = [durations[task[0]] for task in warmup_tasks]
+        warmup_cost = sum(costs[task[0]] for task in warmup_tasks)
+        if not self.__class__.largest_first or not warmup_cost:
+            return warmup_durations
+        seconds_per_cost = sum(warmup_durations) / warmup_cost
+        return [seconds_per_cost * costs[task[0]] for task in tasks]
+
+    def tune_chunksize(
+        self, overhead: float, durations: list, processes: int, n_remaining: int
+    ) -> int:
+        """
+        Chooses the chunksize for the items after the warm-up. The chunksize is the
+        smallest one whose overhead does not exceed max_ipc_overhead_fraction of the
+        time per chunk, but at most so large that each process gets four chunks of
+        the remaining items. Sets chosen_chunksize and ipc_overhead_fraction.
+
+        Args:
+            overhead: Seconds per dispatched chunk to communicate with the
+                processes. See execute_warmup.
+            durations: Seconds spent executing each of the warm-up items or the
+                estimated seconds of the remaining items
+            processes: Number of processes
+            n_remaining: Number of items after the warm-up
+
+        Returns: The chunksize
+        """
+        mean_duration = sum(durations) / len(durations)
+
+        target = self.__class__.max_ipc_overhead_fraction
+        max_chunksize = max(math.ceil(n_remaining / (processes * 4)), 1)
+        if mean_duration > 0:
+            chunksize = math.ceil(overhead * (1 - target) / (target * mean_duration))
+            chunksize = min(max(chunksize, 1), max_chunksize)
+        else:
+            chunksize = max_chunksize
+
+        chunk_seconds = overhead + chunksize * mean_duration
+        self.chosen_chunksize = chunksize
+        self.ipc_overhead_fraction = overhead / chunk_seconds if chunk_seconds else 0.0
+        return chunksize
+
+    def execute_timed_item(self, task):
+        """
+        Args:
+            task: Tuple of the index of the item, the item and the execute_args
+
+        Returns: Tuple of the index of the item, the result and the duration in
+            seconds
+        """
+        idx, item, *args = task
+        start = time.perf_counter()
+        result = self.execute_item(item, *args)
+        return idx, result, time.perf_counter() - start
+
+    def execute_stamped_item(self, task):
+        """
+        Returns: The result of execute_timed_item extended by the id of the process
+            and the timestamps (see time.time) of the start and the end of the
+            execution
+        """
+        start_time = time.time()
+        output = self.execute_timed_item(task)
+        return (*output, os.getpid(), start_time, time.time())
+
+    def execute_timed_chunk(self, chunk):
+        """
+        Returns: The results of execute_timed_item for each task of the chunk
+        """
+        return [self.execute_timed_item(task) for task in chunk]
+
+    def get_duration_stats(self) -> dict:
+        """
+        Summarizes the durations of the items of the last execution with
+        largest_first or adaptive_chunksize, e.g. to refine get_item_cost.
+
+        Returns: A dict with the number of items, the total, mean and maximal
+            duration in seconds, the seconds per unit of cost, and the chunksize
+            and the overhead fraction chosen by tune_chunksize (None without
+            adaptive_chunksize). Empty if no durations are recorded.
+        """
+        if not self.item_durations:
+            return {}
+        total = sum(self.item_durations)
+        total_cost = sum(self.item_costs)
+        return dict(
+            count=len(self.item_durations),
+            total=total,
+            mean=total / len(self.item_durations),
+            max=max(self.item_durations),
+            seconds_per_cost=total / total_cost if total_cost else None,
+            chunksize=self.chosen_chunksize,
+            ipc_overhead_fraction=self.ipc_overhead_fraction,
+        )
+
     def execute_filtered_items(self, items, filters=None, *args, **kwargs):
         if filters:
             filtered_items = []
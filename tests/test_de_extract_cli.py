@@ -0,0 +1,180 @@
+import json
+import os
+import tempfile
+import unittest
+
+from quantlaw.de_extract.cli import extract_files, main
+
+try:
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+
+class DeExtractCliTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = self.tempdir.name
+        self.input = os.path.join(self.folder, "input")
+        os.makedirs(self.input)
+        texts = {
+            "ABC.txt": (
+                "Nach § 5 Abs. 1 und 2 des Grundgesetzes und § 6 gilt § 7 BGB."
+            ),
+            "DEF.txt": "Kein Verweis.",
+            "GHI.xml": (
+                "<doc><p>Art. 3 <b>Grundgesetz</b></p>"
+                "<p> § 30 DRITTER ABSCHNITT</p></doc>"
+            ),
+        }
+        for file_name, text in texts.items():
+            with open(os.path.join(self.input, file_name), "w", encoding="utf8") as f:
+                f.write(text)
+        self.law_names = os.path.join(self.folder, "law_names.json")
+        with open(self.law_names, "w", encoding="utf8") as f:
+            json.dump({"Grundgesetz": "GG", "Bürgerliches Gesetzbuch": "BGB"}, f)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def run_main(self, *args):
+        return main(
+            [
+                self.input,
+                "--law-names",
+                self.law_names,
+                "--stem-law-names",
+                "--workers",
+                "1",
+                *args,
+            ]
+        )
+
+    def read_jsonl(self, path):
+        with open(path, encoding="utf8") as f:
+            return [json.loads(line) for line in f]
+
+    def read_sorted_jsonl(self, path):
+        # The process pool writes the files in the order of completion
+        return sorted(
+            self.read_jsonl(path), key=lambda r: (r["file"], r["start"], r["path"])
+        )
+
+    def test_jsonl(self):
+        output = os.path.join(self.folder, "out.jsonl")
+        self.run_main("--output", output)
+        self.assertEqual(
+            [
+                ("ABC.txt", 5, "dict", "GG", [["§", "5"], ["Abs", "1"]]),
+                ("ABC.txt", 5, "dict", "GG", [["§", "5"], ["Abs", "2"]]),
+                ("ABC.txt", 44, "internal", "ABC", [["§", "6"]]),
+                ("ABC.txt", 53, "dict", "BGB", [["§", "7"]]),
+            ],
+            [
+                (r["file"], r["start"], r["law_match_type"], r["lawid"], r["path"])
+                for r in self.read_jsonl(output)
+            ],
+        )
+
+    def test_xml(self):
+        output = os.path.join(self.folder, "out.jsonl")
+        diagnostics_path = os.path.join(self.folder, "diagnostics.json")
+        diagnostics = self.run_main(
+            "--type", ".xml", "--output", output, "--diagnostics", diagnostics_path
+        )
+        self.assertEqual(
+            [("dict", "GG", [["Art", "3"]]), ("internal", "GHI", [["§", "30"]])],
+            [
+                (r["law_match_type"], r["lawid"], r["path"])
+                for r in self.read_jsonl(output)
+            ],
+        )
+        self.assertEqual(1, diagnostics.counts["not_a_unit"])
+        with open(diagnostics_path, encoding="utf8") as f:
+            self.assertEqual(diagnostics.to_dict(), json.load(f))
+
+    def test_errors(self):
+        texts = {
+            "JKL.txt": "Nach § 5 SGB 14 und § 6 Grundgesetz.",
+            "MNO.xml": "<doc><p>§ 7 Grundgesetz</doc>",
+        }
+        for file_name, text in texts.items():
+            with open(os.path.join(self.input, file_name), "w", encoding="utf8") as f:
+                f.write(text)
+        for extension in [".txt", ".xml"]:
+            sequential_output = os.path.join(self.folder, "sequential.jsonl")
+            parallel_output = os.path.join(self.folder, "parallel.jsonl")
+            diagnostics = self.run_main(
+                "--type", extension, "--output", sequential_output
+            )
+            parallel_diagnostics = self.run_main(
+                "--type", extension, "--output", parallel_output, "--workers", "2"
+            )
+            self.assertEqual(
+                self.read_jsonl(sequential_output),
+                self.read_sorted_jsonl(parallel_output),
+            )
+            self.assertEqual(diagnostics.counts, parallel_diagnostics.counts)
+            for name, samples in diagnostics.samples.items():
+                self.assertEqual(
+                    sorted(samples), sorted(parallel_diagnostics.samples[name])
+                )
+            records = self.read_jsonl(sequential_output)
+            if extension == ".txt":
+                self.assertEqual(
+                    ("JKL.txt", [["§", "6"]]),
+                    (records[-1]["file"], records[-1]["path"]),
+                )
+                self.assertEqual(["SGB 14"], diagnostics.samples["parse_law_error"])
+            else:
+                self.assertEqual({"GHI.xml"}, {r["file"] for r in records})
+                self.assertEqual(1, diagnostics.counts["file_error"])
+                self.assertTrue(
+                    diagnostics.samples["file_error"][0].startswith("MNO.xml: ")
+                )
+
+    def test_extract_files_max_pending(self):
+        paths = [
+            os.path.join(self.input, file_name)
+            for file_name in ["ABC.txt", "DEF.txt", "ABC.txt", "GHI.xml"] * 3
+        ]
+        laws_lookup = {"grundgesetz": "GG"}
+
+        def sort(results):
+            return sorted(results, key=lambda r: json.dumps(r, sort_keys=True))
+
+        expected = list(extract_files(paths, laws_lookup))
+        self.assertEqual(
+            expected, list(extract_files(paths, laws_lookup, 2, max_pending=1))
+        )
+        self.assertEqual(sort(expected), sort(extract_files(paths, laws_lookup, 2)))
+
+    def test_extract_files_large_first_file(self):
+        # The results of the small files are not held back by the large one
+        large_path = os.path.join(self.input, "large.txt")
+        with open(large_path, "w", encoding="utf8") as f:
+            f.write("Nach § 5 Abs. 1 und 2 des Grundgesetzes. " * 1000)
+        paths = [large_path] + [os.path.join(self.input, "DEF.txt")] * 4
+        results = list(extract_files(paths, {"grundgesetz": "GG"}, 2))
+        self.assertEqual([0, 0, 0, 0, 1000], [r[0] for r in results])
+
+    def test_process_pool(self):
+        sequential_output = os.path.join(self.folder, "sequential.jsonl")
+        parallel_output = os.path.join(self.folder, "parallel.jsonl")
+        self.run_main("--output", sequential_output)
+        self.run_main("--output", parallel_output, "--workers", "2")
+        self.assertEqual(
+            self.read_jsonl(sequential_output), self.read_sorted_jsonl(parallel_output)
+        )
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        jsonl_output = os.path.join(self.folder, "out.jsonl")
+        parquet_output = os.path.join(self.folder, "out.parquet")
+        self.run_main("--output", jsonl_output)
+        self.run_main(
+            "--output", parquet_output, "--format", "parquet", "--batch-size", "2"
+        )
+        table = pyarrow.parquet.read_table(parquet_output)
+        self.assertEqual(2, pyarrow.parquet.ParquetFile(parquet_output).num_row_groups)
+        self.assertEqual(self.read_jsonl(jsonl_output), table.to_pylist())
@@ -1,9 +1,21 @@
+import random
+import time
 import unittest
+from unittest.mock import patch
 
 from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_areas_patterns import reference_range_pattern
 
 sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
 
+# Texts that cause catastrophic backtracking in reference_range_pattern. Without a
+# timeout, each takes seconds to search.
+pathological_texts = [
+    "§ 1" + " " * 4000 + "x",
+    "§ 1" + " " * 4000 + "in Verbindung x",
+    "§ 1" + "\n \t" * 1000 + "x",
+]
+
 
 class DeExtractAreasTestCase(unittest.TestCase):
     def setUp(self) -> None:
@@ -117,3 +129,230 @@ class DeExtractAreasTestCase(unittest.TestCase):
             ],
             [str(m) for m in matches],
         )
+
+    def test_search_main_area_equals_pattern_search(self):
+        text = (
+            "Start der Artenschutzverordnung, Art 3 Sonderartikel 5 und "
+            "Artikeln 4, 5 sowie §§ 1 bis 3 des Bürgerliches Gesetzbuches. Partei §"
+        )
+        pos = 0
+        while True:
+            expected = reference_range_pattern.search(text, pos)
+            match = self.extractor.search_main_area(text, pos)
+            if not expected:
+                self.assertIsNone(match)
+                break
+            self.assertEqual(expected.span(), match.span())
+            self.assertEqual(expected["main"], match["main"])
+            pos = expected.end()
+
+    def test_find_all_skips_false_triggers(self):
+        matches = self.extractor.find_all("Der Artenschutz gilt. Start Art. 5 GG")
+        self.assertEqual(
+            ["Main:Art. 5;Suffix:;Law:;Type:internal"],
+            [str(m) for m in matches],
+        )
+
+    def test_instrumentation(self):
+        text = "§ 5 Grundgesetz, § 6 des asdasd, § und § 7. Dann § 8 SGB IX"
+        instrumentation = self.extractor.enable_instrumentation()
+        matches = list(self.extractor.find_all(text))
+        self.assertEqual(
+            {
+                "search.dict": 1,
+                "search.unknown": 1,
+                "search.trigger": 1,
+                "search.internal": 1,
+                "search.sgb": 1,
+            },
+            instrumentation.counts,
+        )
+        self.assertEqual(len(matches) + 1, instrumentation.calls["search"])
+        self.assertGreater(instrumentation.calls["stem_law_name"], 0)
+        self.assertGreaterEqual(
+            instrumentation.seconds["search"],
+            instrumentation.seconds["search_main_area"],
+        )
+
+        self.extractor.disable_instrumentation()
+        self.assertEqual(
+            [str(m) for m in matches], [str(m) for m in self.extractor.find_all(text)]
+        )
+        self.assertEqual(len(matches) + 1, instrumentation.calls["search"])
+        self.assertNotIn("search", self.extractor.__dict__)
+
+    def test_search_timeout(self):
+        extractor = StatutesExtractor(sample_laws_lookup, search_timeout=0.01)
+        for text in pathological_texts:
+            start = time.perf_counter()
+            matches = list(
+                extractor.find_all("Lorem ipsum " + text + " und § 5 Grundgesetz")
+            )
+            self.assertLess(time.perf_counter() - start, 1)
+            self.assertEqual(
+                ["Text:§;", "Main:§ 5;Suffix: ;Law:Grundgesetz;Type:dict"],
+                [str(m) for m in matches],
+            )
+            self.assertEqual(12, matches[0].start)
+        self.assertEqual(3, extractor.diagnostics.counts["search_timeout"])
+        self.assertEqual(
+            pathological_texts[0][:100],
+            extractor.diagnostics.samples["search_timeout"][0],
+        )
+
+    def test_search_timeout_not_exceeded(self):
+        extractor = StatutesExtractor(sample_laws_lookup, search_timeout=1)
+        text = "§ 5 Abs. 1 des Grundgesetzes und Art. 3 EGBGB"
+        self.assertEqual(
+            [str(m) for m in self.extractor.find_all(text)],
+            [str(m) for m in extractor.find_all(text)],
+        )
+        self.assertEqual({}, extractor.diagnostics.counts)
+
+    def test_law_name_timeout(self):
+        extractor = StatutesExtractor(sample_laws_lookup, search_timeout=0.01)
+        with patch.object(
+            extractor, "get_ignore_law_name_len", side_effect=TimeoutError
+        ):
+            match = extractor.search("§ 5 der Satzung vom 1. Mai 2000")
+        self.assertEqual("Main:§ 5;Suffix: der ;Law:;Type:unknown", str(match))
+        self.assertEqual(1, extractor.diagnostics.counts["law_name_timeout"])
+
+    def test_find_all_in_texts(self):
+        texts = [
+            "§ 5 Grundgesetz, § 6 des asdasd, § und § 7.",
+            "Art. 20a Abs. 1 Grundgesetz",
+            "",
+            "Lorem ipsum § 123 Abs. 3 des Bürgerliches Gesetzbuches",
+        ] * 5
+        expected = [[str(m) for m in self.extractor.find_all(t)] for t in texts]
+        extractor = StatutesExtractor(sample_laws_lookup, concurrent=True)
+        results = extractor.find_all_in_texts(texts, max_workers=4)
+        self.assertEqual(expected, [[str(m) for m in ms] for ms in results])
+
+        tables = extractor.find_all_in_texts(texts, max_workers=4, as_table=True)
+        self.assertEqual(expected, [[str(m) for m in table] for table in tables])
+
+    def test_find_all_in_windows(self):
+        text = (
+            "Lorem § 5 Grundgesetz, § 6 des asdasd, § und § 7. Art. 20a Abs. 1, 2 "
+            "und 3 Grundgesetz sowie §§ 1, 2, 3, 4, 5, 6, 7 des Bürgerlichen "
+            "Gesetzbuches. Artenschutz Start § 123 Abs. 3 des Bürgerliches "
+            "Gesetzbuches und § 3 Satz 1 SGB IX."
+        ) * 3
+        expected = [(m.start, str(m)) for m in self.extractor.find_all(text)]
+        for window_size in [1, 7, 30, 64, 100, 1000]:
+            matches = self.extractor.find_all_in_windows(
+                text, window_size=window_size, processes=2, max_citation_len=20
+            )
+            self.assertEqual(expected, [(m.start, str(m)) for m in matches])
+            self.assertTrue(all(m.text is text for m in matches))
+
+    def test_find_all_in_windows_diagnostics(self):
+        # Each window starts with a trigger whose search times out
+        segment = pathological_texts[0] + " und § 5 Grundgesetz. "
+        text = segment * 4
+        extractor = StatutesExtractor(sample_laws_lookup, search_timeout=0.01)
+        expected = [str(m) for m in extractor.find_all(text)]
+        self.assertEqual(4, extractor.diagnostics.counts["search_timeout"])
+        for window_size in [len(segment), 3000]:
+            windows_extractor = StatutesExtractor(
+                sample_laws_lookup, search_timeout=0.01
+            )
+            matches = windows_extractor.find_all_in_windows(
+                text, window_size=window_size, processes=2, max_citation_len=20
+            )
+            self.assertEqual(expected, [str(m) for m in matches])
+            self.assertEqual(
+                extractor.diagnostics.to_dict(),
+                windows_extractor.diagnostics.to_dict(),
+            )
+
+    def test_find_all_in_windows_long_citation(self):
+        # The law name is beyond the slice of the first window
+        text = "Lorem " * 10 + "§ 5 des" + " " * 1500 + "Grundgesetzes § 6 " * 20
+        expected = [str(m) for m in self.extractor.find_all(text)]
+        matches = self.extractor.find_all_in_windows(
+            text, window_size=100, processes=2, max_citation_len=20
+        )
+        self.assertEqual(expected, [str(m) for m in matches])
+        self.assertEqual("Grundgesetzes", matches[0].law_text())
+
+    def test_search_endpos(self):
+        text = "Lorem § 5 des Grundgesetzes"
+        self.assertIsNone(self.extractor.search(text, 0, 6))
+        match = self.extractor.search(text, 0, 7)
+        self.assertEqual("Grundgesetzes", match.law_text())
+        self.assertEqual([], list(self.extractor._find_all(text, 0, 6)))
+        with patch.object(
+            self.extractor, "get_suffix_and_law_name"
+        ) as get_suffix_and_law_name:
+            self.extractor.search(text, 0, 6)
+        get_suffix_and_law_name.assert_not_called()
+
+    def test_find_all_in_segments(self):
+        text = (
+            "Lorem § 5 Grundgesetz, § 6 des asdasd, § und § 7. Art. 20a Abs. 1, 2 "
+            "und 3 Grundgesetz sowie §§ 1, 2, 3 des Bürgerlichen Gesetzbuches. "
+            "Artenschutz Start § 123 Abs. 3 des Bürgerliches Gesetzbuches und § 3 "
+            "Satz 1 SGB IX. Dann § 8"
+        )
+        expected = [
+            (m.start, m.end, self.extractor.get_next_pos(m), str(m))
+            for m in self.extractor.find_all(text)
+        ]
+        rnd = random.Random(0)
+        for _ in range(50):
+            cuts = sorted(rnd.randint(0, len(text)) for _ in range(rnd.randint(0, 20)))
+            segments = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+            offsets = [
+                sum(len(s) for s in segments[:idx]) for idx in range(len(segments))
+            ]
+
+            def position(location):
+                return offsets[location[0]] + location[1]
+
+            results = list(
+                self.extractor.find_all_in_segments(segments, lookahead=1001)
+            )
+            self.assertEqual(
+                expected,
+                [
+                    (
+                        position(r.start),
+                        position(r.end),
+                        position(r.law_end),
+                        str(r.match),
+                    )
+                    for r in results
+                ],
+            )
+            for r in results:
+                self.assertEqual(
+                    r.match.law_text() if r.match.has_main_area() else "",
+                    text[position(r.law_start) : position(r.law_end)],
+                )
+
+    def test_find_all_in_segments_locations(self):
+        segments = ["Siehe § 5 des", "", " Grundgesetzes.", "§ 6"]
+        results = list(self.extractor.find_all_in_segments(segments))
+        self.assertEqual(
+            [
+                ((0, 6), (0, 9), (2, 1), (2, 14)),
+                ((3, 0), (3, 3), (3, 3), (3, 3)),
+            ],
+            [(r.start, r.end, r.law_start, r.law_end) for r in results],
+        )
+        self.assertEqual("Grundgesetzes", results[0].match.law_text())
+        self.assertEqual([], list(self.extractor.find_all_in_segments([])))
+
+    def test_find_all_in_segments_long_citation(self):
+        segments = ["Lorem " * 500, "§ 5 des", " " * 1500, "Grundgesetzes", " Art"]
+        text = "".join(segments)
+        results = list(self.extractor.find_all_in_segments(segments, lookahead=1001))
+        self.assertEqual(
+            [str(m) for m in self.extractor.find_all(text)],
+            [str(r.match) for r in results],
+        )
+        self.assertEqual((3, 0), results[0].law_start)
+        self.assertEqual((3, 13), results[0].law_end)
@@ -0,0 +1,59 @@
+import unittest
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_engine import StatutesEngine
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.utils.diagnostics import Diagnostics
+
+sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
+
+sample_text = (
+    "Nach § 123 Abs. 1 und 2 des Grundgesetzes, § 5 Grundgesetz, § 6 der asdasd, "
+    "§ und § 5 Grundgesetz sowie §§ 3, 7 bis 9a BGB. Gemäß § 234 dritter "
+    "Halbsatz und Art. 3 Abs. 1 Satz 1, Abs. 3 i.V.m. Art. 20 Abs. 3 GG ist "
+    "§ 30 DRITTER ABSCHNITT zu beachten."
+)
+
+
+class StatutesEngineTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = StatutesEngine(sample_laws_lookup)
+
+    def test_find_all_equals_parse_matches(self):
+        matches = list(StatutesExtractor(sample_laws_lookup).find_all(sample_text))
+        expected = StatutesParser(sample_laws_lookup).parse_matches(matches, "ABC")
+        self.assertEqual(expected, self.engine.find_all(sample_text, "ABC"))
+
+    def test_find_all_compact(self):
+        records = self.engine.find_all(sample_text, "ABC", compact=True)
+        self.assertEqual(
+            self.engine.find_all(sample_text, "ABC"),
+            [dict(record, path=record["path"].to_list()) for record in records],
+        )
+
+    def test_search_with_main_area_match(self):
+        extractor = self.engine.extractor
+        match, main_match = extractor.search_with_main_area_match(sample_text)
+        self.assertEqual("§ 123 Abs. 1 und 2", main_match[0])
+        self.assertEqual(str(extractor.search(sample_text)), str(match))
+
+        pos = sample_text.index("§ und")
+        match, main_match = extractor.search_with_main_area_match(sample_text, pos)
+        self.assertFalse(match.has_main_area())
+        self.assertIsNone(main_match)
+        self.assertEqual(
+            (None, None), extractor.search_with_main_area_match("Kein Zitat")
+        )
+
+    def test_laws_lookup(self):
+        self.engine.laws_lookup = {"grundgesetz": "GG-NEW"}
+        self.assertEqual({"grundgesetz": "GG-NEW"}, self.engine.parser.laws_lookup)
+        records = self.engine.find_all("§ 5 Grundgesetz")
+        self.assertEqual("GG-NEW", records[0]["lawid"])
+
+    def test_shared_diagnostics(self):
+        diagnostics = Diagnostics()
+        engine = StatutesEngine(sample_laws_lookup, diagnostics)
+        self.assertIs(diagnostics, engine.extractor.diagnostics)
+        self.assertIs(diagnostics, engine.parser.diagnostics)
+        self.assertIs(diagnostics, engine.diagnostics)
@@ -0,0 +1,201 @@
+import unittest
+
+import networkx as nx
+
+from quantlaw.de_extract.statutes_graph_index import (
+    ReferenceGraphIndex,
+    parse_heading,
+    value_sort_key,
+)
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.de_extract.statutes_reference_path import ReferencePath
+
+
+def build_graph():
+    G = nx.MultiDiGraph()
+    G.add_node("root", type="root", heading="root", law_name="")
+    nodes = [
+        ("root", "GG", "document", "Grundgesetz", "GG"),
+        ("GG", "GG_1", "item", "I. Die Grundrechte", "GG"),
+        ("GG_1", "GG_2", "seqitem", "Art 1", "GG"),
+        ("GG_2", "GG_3", "subseqitem", "(1)", "GG"),
+        ("GG_2", "GG_4", "subseqitem", "(2)", "GG"),
+        ("root", "BGB", "document", "Bürgerliches Gesetzbuch", "BGB"),
+        ("BGB", "BGB_1", "seqitem", "§ 123 Anfechtbarkeit", "BGB"),
+        ("BGB_1", "BGB_2", "subseqitem", "(4)", "BGB"),
+        ("BGB_2", "BGB_3", "subseqitem", "1.", "BGB"),
+        ("BGB", "BGB_4", "seqitem", "§ 123a", "BGB"),
+    ]
+    for parent, key, node_type, heading, law_name in nodes:
+        G.add_node(key, type=node_type, heading=heading, law_name=law_name)
+        G.add_edge(parent, key, edge_type="containment")
+    G.add_edge("BGB_1", "GG_2", edge_type="reference")
+    return G
+
+
+class ReferenceGraphIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ReferenceGraphIndex(build_graph())
+
+    def test_parse_heading(self):
+        self.assertEqual(("§", "12a"), parse_heading({"heading": "§ 12a Titel"}))
+        self.assertEqual(("Art", "3"), parse_heading({"heading": "Artikel 3"}))
+        self.assertEqual(("Abs", "4"), parse_heading({"heading": "(4)"}))
+        self.assertEqual(("Nr", "2"), parse_heading({"heading": "2."}))
+        self.assertEqual(("Buchstabe", "b"), parse_heading({"heading": "b)"}))
+        self.assertIsNone(parse_heading({"heading": "2. Teil"}))
+        self.assertIsNone(parse_heading({"heading": "(4) Text"}))
+        self.assertIsNone(parse_heading({"heading": "a) Text"}))
+        self.assertIsNone(parse_heading({"heading": "Abschnitt 1"}))
+        self.assertIsNone(parse_heading({}))
+
+    def test_resolve(self):
+        resolve = self.index.resolve
+        self.assertEqual("BGB_2", resolve("BGB", [["§", "123"], ["Abs", "4"]]))
+        self.assertEqual(
+            "BGB_3", resolve("BGB", [["§", "123"], ["Abs", "4"], ["Nr", "1"]])
+        )
+        self.assertEqual("BGB_4", resolve("BGB", [["§", "123A"]]))
+        # Chapters without citable heading are skipped
+        self.assertEqual("GG_4", resolve("GG", [["Art", "1"], ["Abs", "2"]]))
+
+    def test_resolve_numbered_chapters(self):
+        G = build_graph()
+        nodes = [
+            ("GG", "GG_5", "item", "1. Abschnitt Allgemeine Vorschriften"),
+            ("GG_5", "GG_6", "seqitem", "§ 5"),
+            ("GG_6", "GG_7", "subseqitem", "(1)"),
+            ("GG_7", "GG_8", "subseqitem", "2."),
+            ("GG_8", "GG_9", "subseqitem", "c)"),
+            ("GG", "GG_10", "item", "a) Sonstiges"),
+            ("GG_10", "GG_11", "seqitem", "§ 6"),
+        ]
+        for parent, key, node_type, heading in nodes:
+            G.add_node(key, type=node_type, heading=heading, law_name="GG")
+            G.add_edge(parent, key, edge_type="containment")
+        index = ReferenceGraphIndex(G)
+        self.assertEqual("GG_6", index.resolve("GG", [["§", "5"]]))
+        self.assertEqual("GG_11", index.resolve("GG", [["§", "6"]]))
+        self.assertEqual(
+            "GG_9",
+            index.resolve(
+                "GG", [["§", "5"], ["Abs", "1"], ["Nr", "2"], ["Buchstabe", "c"]]
+            ),
+        )
+        parser = StatutesParser({})
+        (path,) = parser.parse_main("§ 5 Abs. 1 Nr. 2 Buchstabe c")
+        self.assertEqual("GG_9", index.resolve("GG", path))
+
+    def test_resolve_deepest_existing_node(self):
+        resolve = self.index.resolve
+        self.assertEqual("BGB_1", resolve("BGB", [["§", "123"], ["Abs", "5"]]))
+        self.assertEqual(
+            "BGB_1", resolve("BGB", [["§", "123"], ["Satz", "1"], ["Abs", "4"]])
+        )
+        self.assertEqual("BGB", resolve("BGB", [["§", "1"]]))
+        self.assertEqual("GG", resolve("GG", [["§", "1"]]))
+        self.assertEqual("BGB_1", resolve("BGB", [["§", "123"], [None, "4"]]))
+        self.assertIsNone(resolve("StGB", [["§", "1"]]))
+
+    def test_resolve_many(self):
+        references = [
+            ("BGB", [["§", "123"], ["Abs", "4"]]),
+            ("GG", ReferencePath.from_list([["Art", "1"], ["Abs", "1"]])),
+            ("XYZ", [["§", "1"]]),
+        ]
+        self.assertEqual(["BGB_2", "GG_3", None], self.index.resolve_many(references))
+
+    def test_ambiguous_components(self):
+        G = build_graph()
+        G.add_node("BGB_5", type="seqitem", heading="§ 123", law_name="BGB")
+        G.add_edge("BGB", "BGB_5", edge_type="containment")
+        G.add_node("BGB_6", type="subseqitem", heading="(9)", law_name="BGB")
+        G.add_edge("BGB_5", "BGB_6", edge_type="containment")
+        index = ReferenceGraphIndex(G)
+        self.assertEqual(1, index.ambiguous_components)
+        self.assertEqual("BGB_1", index.resolve("BGB", [["§", "123"]]))
+        self.assertEqual("BGB_6", index.resolve("BGB", [["§", "123"], ["Abs", "9"]]))
+
+    def test_custom_attributes(self):
+        G = build_graph()
+        for key in G.nodes:
+            G.nodes[key]["abbr"] = G.nodes[key]["law_name"].lower()
+        index = ReferenceGraphIndex(
+            G,
+            lawid_attribute="abbr",
+            component_parser=lambda attrs: (
+                ("Abs", attrs["heading"][1]) if attrs["type"] == "subseqitem" else None
+            ),
+        )
+        self.assertEqual("BGB_2", index.resolve("bgb", [["Abs", "4"]]))
+
+    def test_value_sort_key(self):
+        values = ["10", "a", "9a", "1", "9", "b"]
+        self.assertEqual(
+            ["1", "9", "9a", "10", "a", "b"], sorted(values, key=value_sort_key)
+        )
+
+
+def build_range_graph():
+    G = nx.MultiDiGraph()
+    G.add_node("root", heading="root", law_name="")
+    G.add_node("L", heading="Gesetz", law_name="L")
+    G.add_edge("root", "L", edge_type="containment")
+    # Sections in a different order than their values
+    for value in ["3", "1", "2", "2a", "5", "10"]:
+        G.add_node(f"s{value}", heading=f"§ {value}", law_name="L")
+        G.add_edge("L", f"s{value}", edge_type="containment")
+        for subsection in range(1, 4):
+            key = f"s{value}_{subsection}"
+            G.add_node(key, heading=f"({subsection})", law_name="L")
+            G.add_edge(f"s{value}", key, edge_type="containment")
+    return G
+
+
+class ExpandRangeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ReferenceGraphIndex(build_range_graph())
+        self.parser = StatutesParser({})
+
+    def expand(self, citation):
+        paths, ranges = self.parser.parse_main_with_ranges(citation)
+        self.assertEqual(1, len(ranges))
+        start, end = ranges[0]
+        span = self.index.expand_range("L", paths[start], paths[end])
+        return None if span is None else span.to_list()
+
+    def test_expand_sections(self):
+        self.assertEqual(["s1", "s2", "s2a", "s3"], self.expand("§§ 1 bis 3"))
+        self.assertEqual(["s2a", "s3", "s5"], self.expand("§ 2a bis § 9"))
+        self.assertEqual(["s5", "s10"], self.expand("§§ 4 bis 20"))
+        self.assertEqual([], self.expand("§§ 6 bis 9"))
+        self.assertEqual([], self.expand("§§ 3 bis 1"))
+
+    def test_expand_subsections(self):
+        self.assertEqual(["s2_2", "s2_3"], self.expand("§ 2 Abs. 2 bis 3"))
+        self.assertEqual(["s2", "s2a", "s3"], self.expand("§ 2 Abs. 2 bis § 3"))
+        self.assertEqual(["s2_2"], self.expand("§ 2 Abs. 2 bis § 2 Abs. 2"))
+
+    def test_expand_not_found(self):
+        self.assertIsNone(self.expand("§ 4 Abs. 1 bis 3"))
+        self.assertIsNone(self.expand("§ 1 Satz 1 bis 3"))
+        self.assertIsNone(self.index.expand_range("X", [["§", "1"]], [["§", "2"]]))
+        self.assertIsNone(self.index.expand_range("L", [["§", "1"]], [["Art", "2"]]))
+
+    def test_expand_prefix_paths(self):
+        expand_range = self.index.expand_range
+        self.assertIsNone(expand_range("L", [["§", "5"], ["Abs", "2"]], [["§", "5"]]))
+        self.assertIsNone(expand_range("L", [["§", "5"]], [["§", "5"], ["Abs", "3"]]))
+        self.assertEqual(
+            ["s5_2"],
+            expand_range(
+                "L", [["§", "5"], ["Abs", "2"]], [["§", "5"], ["Abs", "2"]]
+            ).to_list(),
+        )
+
+    def test_span_shares_keys(self):
+        first = self.index.expand_range("L", [["§", "1"]], [["§", "2"]])
+        second = self.index.expand_range("L", [["§", "3"]], [["§", "10"]])
+        self.assertIs(first.keys, second.keys)
+        self.assertEqual((0, 2), (first.start, first.end))
+        self.assertEqual(3, len(second))
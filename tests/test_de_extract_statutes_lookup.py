@@ -0,0 +1,146 @@
+import pickle
+import random
+import unittest
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_lookup import VersionedLawsLookup
+from quantlaw.de_extract.statutes_parse import StatutesParser
+
+lookups = [
+    ("2020-01-01", {"grundgesetz": "GG", "buergerlich gesetzbuch": "BGB"}),
+    ("2020-06-01", {"grundgesetz": "GG", "buergerlich gesetzbuch": "BGB"}),
+    ("2021-01-01", {"grundgesetz": "GG", "abgabenordnung": "AO"}),
+    (
+        "2022-01-01",
+        {"grundgesetz": "GG", "buergerlich gesetzbuch": "BGB2", "abgabenordnung": "AO"},
+    ),
+]
+
+
+class VersionedLawsLookupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.versioned = VersionedLawsLookup()
+        for date, laws_lookup in lookups:
+            self.versioned.add(date, laws_lookup)
+
+    def test_views_equal_lookups(self):
+        for date, laws_lookup in lookups:
+            view = self.versioned.view(date)
+            self.assertEqual(laws_lookup, dict(view))
+            self.assertEqual(sorted(laws_lookup, reverse=True), view.laws_lookup_keys)
+            self.assertEqual(frozenset(laws_lookup.values()), view.laws_lookup_values)
+
+    def test_view_between_dates(self):
+        view = self.versioned.view("2020-12-31")
+        self.assertEqual("2020-06-01", view.date)
+        self.assertEqual("BGB", view["buergerlich gesetzbuch"])
+        self.assertNotIn("abgabenordnung", view)
+        with self.assertRaises(KeyError):
+            view["abgabenordnung"]
+        self.assertEqual(
+            "BGB2", self.versioned.view("2030-01-01")["buergerlich gesetzbuch"]
+        )
+        with self.assertRaises(KeyError):
+            self.versioned.view("2019-01-01")
+
+    def test_shared_epochs(self):
+        self.assertEqual([0, 2, 3], self.versioned.epochs)
+        self.assertEqual(
+            [
+                ([], ["grundgesetz", "buergerlich gesetzbuch"]),
+                (["buergerlich gesetzbuch"], ["abgabenordnung"]),
+                ([], ["buergerlich gesetzbuch"]),
+            ],
+            self.versioned.epoch_changes,
+        )
+        first = self.versioned.view("2020-01-01")
+        second = self.versioned.view("2020-06-01")
+        self.assertIs(first.laws_lookup_keys, second.laws_lookup_keys)
+        self.assertIsNot(
+            first.laws_lookup_keys, self.versioned.view("2021-01-01").laws_lookup_keys
+        )
+
+    def test_changed_lawid(self):
+        versioned = VersionedLawsLookup()
+        versioned.add(1, {"a": "A", "b": "B"})
+        versioned.add(2, {"a": "A2", "b": "B"})
+        versioned.add(3, {"a": "A2"})
+        self.assertEqual([(["a"], ["a"]), (["b"], [])], versioned.epoch_changes[1:])
+        self.assertEqual({"a": "A", "b": "B"}, dict(versioned.view(1)))
+        self.assertEqual({"a": "A2", "b": "B"}, dict(versioned.view(2)))
+        self.assertEqual({"a": "A2"}, dict(versioned.view(3)))
+        self.assertEqual(frozenset({"A2"}), versioned.view(3).laws_lookup_values)
+
+    def test_cache_size(self):
+        versioned = VersionedLawsLookup(max_cached_epochs=1)
+        for date, laws_lookup in lookups:
+            versioned.add(date, laws_lookup)
+        for date, laws_lookup in lookups:
+            self.assertEqual(sorted(laws_lookup), sorted(versioned.view(date)))
+        self.assertEqual(1, len(versioned.cached_epochs))
+
+    def test_random_changes(self):
+        rnd = random.Random(0)
+        names = [f"gesetz {i:03}" for i in range(200)]
+        laws_lookup = {name: f"L{rnd.randint(0, 50)}" for name in names[:100]}
+        snapshots = []
+        versioned = VersionedLawsLookup(max_cached_epochs=2, checkpoint_interval=4)
+        for date in range(30):
+            laws_lookup = dict(laws_lookup)
+            for name in rnd.sample(names, rnd.randint(0, 10)):
+                if name in laws_lookup and rnd.random() < 0.5:
+                    del laws_lookup[name]
+                else:
+                    laws_lookup[name] = f"L{rnd.randint(0, 50)}"
+            snapshots.append(laws_lookup)
+            versioned.add(date, laws_lookup)
+
+        for date in rnd.sample(range(30), 30) + list(range(30)):
+            view = versioned.view(date)
+            self.assertEqual(snapshots[date], dict(view))
+            self.assertEqual(
+                sorted(snapshots[date], reverse=True), view.laws_lookup_keys
+            )
+            self.assertEqual(
+                frozenset(snapshots[date].values()), view.laws_lookup_values
+            )
+        self.assertEqual(2, len(versioned.cached_epochs))
+        self.assertTrue(all(epoch % 4 == 0 for epoch in versioned.checkpoints))
+
+        # Adding a date invalidates the positions of the intervals
+        laws_lookup = dict(laws_lookup)
+        del laws_lookup[next(iter(laws_lookup))]
+        versioned.add(30, laws_lookup)
+        self.assertEqual(
+            sorted(laws_lookup, reverse=True), versioned.view(30).laws_lookup_keys
+        )
+        self.assertEqual(snapshots[29], dict(versioned.view(29)))
+
+    def test_increasing_dates(self):
+        with self.assertRaises(ValueError):
+            self.versioned.add("2021-01-01", {})
+
+    def test_processors(self):
+        text = "Nach § 5 des Bürgerlichen Gesetzbuches und § 6 AO."
+        extractor = StatutesExtractor(self.versioned.view("2020-01-01"))
+        parser = StatutesParser(self.versioned.view("2020-01-01"))
+        for date, laws_lookup in lookups:
+            view = self.versioned.view(date)
+            extractor.laws_lookup = view
+            parser.laws_lookup = view
+            self.assertIs(view.laws_lookup_keys, extractor.laws_lookup_keys)
+            expected_extractor = StatutesExtractor(laws_lookup)
+            expected_parser = StatutesParser(laws_lookup)
+            self.assertEqual(
+                [str(m) for m in expected_extractor.find_all(text)],
+                [str(m) for m in extractor.find_all(text)],
+            )
+            matches = [m for m in extractor.find_all(text) if m.has_main_area()]
+            self.assertEqual(
+                expected_parser.parse_matches(matches, "X"),
+                parser.parse_matches(matches, "X"),
+            )
+
+    def test_pickle(self):
+        view = pickle.loads(pickle.dumps(self.versioned.view("2021-01-01")))
+        self.assertEqual(dict(lookups[2][1]), dict(view))
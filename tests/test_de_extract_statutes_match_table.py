@@ -0,0 +1,46 @@
+import unittest
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_match_table import MatchTable
+
+sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
+
+sample_text = (
+    "Art. 123a der asdasdasd df f sdf  § df dfdf  § 123 Grundgesetz und "
+    "§ 5 Abs. 2 des Gesetzes vom 3. April 2020 (BGBl. I S. 999)"
+)
+
+
+class MatchTableTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.extractor = StatutesExtractor(sample_laws_lookup)
+
+    def test_find_all_as_table(self):
+        table = self.extractor.find_all(sample_text, as_table=True)
+        self.assertIsInstance(table, MatchTable)
+        self.assertEqual(4, len(table))
+        self.assertEqual(
+            [str(m) for m in self.extractor.find_all(sample_text)],
+            [str(m) for m in table.to_matches()],
+        )
+        self.assertEqual([True, False, True, True], list(table.has_main_area()))
+        self.assertEqual(
+            ["unknown", None, "dict", "ignore"], list(table.law_match_types())
+        )
+
+    def test_conversion_round_trip(self):
+        matches = list(self.extractor.find_all(sample_text))
+        table = MatchTable.from_matches(sample_text, matches)
+        for match, converted in zip(matches, table):
+            self.assertIs(sample_text, converted.text)
+            self.assertEqual(type(match), type(converted))
+            self.assertEqual(str(match), str(converted))
+
+    def test_empty(self):
+        table = self.extractor.find_all("Lorem ipsum", as_table=True)
+        self.assertEqual(0, len(table))
+        self.assertEqual([], table.to_matches())
+
+    def test_slots(self):
+        match = self.extractor.search(sample_text)
+        self.assertFalse(hasattr(match, "__dict__"))
@@ -0,0 +1,69 @@
+import unittest
+
+from quantlaw.de_extract.statutes_mentions import LawNameMention, LawNameScanner
+from quantlaw.de_extract.stemming import stem_law_name
+
+law_names = {
+    "Bürgerliches Gesetzbuch": "BGB",
+    "BGB": "BGB",
+    "Gesetzbuch": "GB",
+    "SGB": "SGB",
+    "SGB IX": "SGB-9",
+    "Abc-Gesetz": "ABC",
+}
+laws_lookup = {stem_law_name(name): lawid for name, lawid in law_names.items()}
+
+
+class LawNameScannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.scanner = LawNameScanner(laws_lookup)
+
+    def find(self, text):
+        return [(text[m.start : m.end], m.lawid) for m in self.scanner.find_all(text)]
+
+    def test_find_all(self):
+        text = "Nach dem BGB und dem abc-Gesetzes gilt."
+        self.assertEqual(
+            [
+                LawNameMention(9, 12, "bgb", "BGB"),
+                LawNameMention(21, 33, "abc-gesetz", "ABC"),
+            ],
+            self.scanner.find_all(text),
+        )
+
+    def test_longest_mention(self):
+        self.assertEqual(
+            [("Bürgerlichen\n Gesetzbuches", "BGB"), ("SGB IX", "SGB-9")],
+            self.find("Des Bürgerlichen\n Gesetzbuches und des SGB IX."),
+        )
+        self.assertEqual([("SGB", "SGB")], self.find("Das SGB X."))
+        self.assertEqual([("Gesetzbuch", "GB")], self.find("Ein Gesetzbuch."))
+
+    def test_whole_words(self):
+        self.assertEqual([], self.find("SGBX, BGBl. und Gesetzbuchreform"))
+        self.assertEqual([("BGB", "BGB")], self.find("BGB"))
+        self.assertEqual([], self.find(""))
+
+    def test_partial_prefix(self):
+        # A failed longer candidate must not hide a shorter mention
+        self.assertEqual(
+            [("SGB", "SGB"), ("Gesetzbuch", "GB")],
+            self.find("SGB Bürgerlichen und Gesetzbuch"),
+        )
+        self.assertEqual(
+            [("Bürgerlichen Gesetzbuch", "BGB")],
+            self.find("Bürgerlichen Bürgerlichen Gesetzbuch"),
+        )
+
+    def test_count(self):
+        self.assertEqual(
+            {"BGB": 2, "GB": 1}, self.scanner.count("BGB, BGB und Gesetzbuch")
+        )
+
+    def test_token_cache(self):
+        scanner = LawNameScanner(laws_lookup, max_cached_tokens=2)
+        self.assertEqual(
+            self.scanner.find_all("Nach dem BGB und dem SGB IX"),
+            scanner.find_all("Nach dem BGB und dem SGB IX"),
+        )
+        self.assertLessEqual(len(scanner.stemmed_tokens), 2)
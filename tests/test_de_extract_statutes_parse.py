@@ -1,13 +1,95 @@
+import io
+import random
 import unittest
+from unittest.mock import patch
 
+from regex import regex
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
 from quantlaw.de_extract.statutes_parse import (
     NoUnitMatched,
     StatutesParser,
     StringCaseException,
 )
+from quantlaw.de_extract.statutes_parse_patterns import numb_ff_pattern
+from quantlaw.utils.diagnostics import Diagnostics
 
 sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
 
+sample_citations = [
+    "§ 123 Abs. 3",
+    "§ 123, 135",
+    "§ 123 Chapter 2",
+    "§ 123 § 124",
+    "§§ 3, 7 bis 9a und 12",
+    "§ 5 Abs. 1 bis 3",
+    "§ 3 § 4 bis 6 § 8",
+    "§ 123 Abs. 4 Satz 5 und 6",
+    "§ 111d Absatz 1 Satz 2",
+    "§ 123 Abs. 1, Abs. 2",
+    "§ 123 Abs. 1 S. 2, 3 S. 4",
+    "§ 123 Abs. 1 S. 2, 3 Nr. 4",
+    "§ 123 Abs. 1, S. 3 Nr. 4",
+    "§ 234 dritter Halbsatz",
+    "§ 30 DRITTER ABSCHNITT",
+    "§ 3 § 3 und Nr. 3, Buchst. a",
+    "§§ 1 bis 10, 12 ff. und 15 Abs. 2 Satz 1 Nr. 3 Buchstabe a",
+    "Art. 3 Abs. 1 Satz 1, Abs. 3 Satz 1 i.V.m. Art. 20 Abs. 3",
+    "§5 Abs.\n2 S. 3 f. sowie Art 4 ff",
+    "§ 5 S\nff.",
+]
+
+citation_tokens = (
+    "§ §§ Art. Artikel § Abs. Absatz Nr. Nrn. S. Satz Halbsatz Buchst. Alt. "
+    "Unterabs. 1 5 12a 3.1.2 iv a) b ff. f. und bis , oder sowie i.V.m. erster "
+    "der Chapter DRITTER UND"
+).split() + [", bis", "\n", "  "]
+
+
+def generate_citations(n, seed=0):
+    """
+    Returns: Random sequences of units, numbers and connectors
+    """
+    rnd = random.Random(seed)
+    return [
+        "".join(
+            rnd.choice(citation_tokens) + rnd.choice(["", " ", " ", "\n"])
+            for _ in range(rnd.randint(2, 14))
+        )
+        for _ in range(n)
+    ]
+
+
+def fix_errors_in_citation_by_subs(citation):
+    """
+    Implementation of StatutesParser.fix_errors_in_citation before
+    citation_error_pattern was used
+    """
+    result = regex.sub(r"\s+", " ", citation)
+    result = regex.sub(r"§(?=\d)", "§ ", result)
+    result = regex.sub(r",\sbis\s", " bis ", result)
+    return result
+
+
+def join_ff_by_sub(string):
+    """
+    Normalization of "ff." in StatutesParser.split_citation_part before
+    numb_ff_pattern was used
+    """
+    return regex.sub(
+        r"(\d+(?>\.\d+)?[a-z]?|\b[ivx]+|\b[a-z]\)?)(\sff?\.|\sff\b)",
+        r"\1ff.",
+        string,
+        flags=regex.IGNORECASE,
+    )
+
+
+def parse_result(func, *args):
+    try:
+        return func(*args)
+    except Exception as error:
+        return type(error)
+
 
 class DeParseAreasTestCase(unittest.TestCase):
     def setUp(self) -> None:
@@ -60,6 +142,8 @@ class DeParseAreasTestCase(unittest.TestCase):
             [],
             match,
         )
+        self.assertEqual(1, self.extractor.diagnostics.counts["empty_citation_part"])
+        self.assertEqual(["§"], self.extractor.diagnostics.samples["trailing_unit"])
 
     def test_infer_unit(self):
         match = self.extractor.parse_main("§ 123, 135")
@@ -92,6 +176,29 @@ class DeParseAreasTestCase(unittest.TestCase):
             match,
         )
 
+    def test_parse_main_with_ranges(self):
+        parse = self.extractor.parse_main_with_ranges
+        self.assertEqual(
+            ([[["§", "3"]], [["§", "7"]], [["§", "9a"]], [["§", "12"]]], [(1, 2)]),
+            parse("§§ 3, 7 bis 9a und 12"),
+        )
+        self.assertEqual(
+            ([[["§", "5"], ["Abs", "1"]], [["§", "5"], ["Abs", "3"]]], [(0, 1)]),
+            parse("§ 5 Abs. 1 bis 3"),
+        )
+        self.assertEqual(([[["§", "5"]]], []), parse("§ 5"))
+        self.assertEqual(
+            self.extractor.parse_main("§ 5 Abs. 1 bis 3", compact=True),
+            parse("§ 5 Abs. 1 bis 3", compact=True)[0],
+        )
+
+    def test_parse_main_with_ranges_joined_parts(self):
+        paths, ranges = self.extractor.parse_main_with_ranges("§ 3 § 4 bis 6 § 8")
+        self.assertEqual(
+            [[["§", "3"]], [["§", "4"]], [["§", "6"]], [["§", "8"]]], paths
+        )
+        self.assertEqual([(1, 2)], ranges)
+
     def test_for_docstring(self):
         match = self.extractor.parse_main("§ 123 Abs. 4 Satz 5 und 6")
         # If this test is changes also change the documentation for parse_main function.
@@ -176,3 +283,179 @@ class DeParseAreasTestCase(unittest.TestCase):
             [[["§", "30"]]],
             match,
         )
+        self.assertEqual(
+            {"not_a_unit": ["§ 30 DRITTER ABSCHNITT"]},
+            self.extractor.diagnostics.samples,
+        )
+
+    def test_diagnostics_stdout(self):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            self.extractor.parse_main("§ 5 Abs.")
+        self.assertEqual("", stdout.getvalue())
+        self.assertEqual(1, self.extractor.diagnostics.counts["trailing_unit"])
+
+        parser = StatutesParser({}, diagnostics=Diagnostics(echo=True))
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            parser.parse_main("§ 5 Abs.")
+        self.assertEqual("trailing_unit: § 5 Abs.\n", stdout.getvalue())
+
+    def test_infer_units_repeated_paths(self):
+        match = self.extractor.parse_main("§ 3 § 3 und Nr. 3, Buchst. a")
+        self.assertEqual(
+            [
+                [["§", "3"]],
+                [["§", "3"]],
+                [["§", "3"], ["Nr", "3"]],
+                [["§", "3"], ["Nr", "3"], ["Buchstabe", "a"]],
+            ],
+            match,
+        )
+
+    def test_long_enumeration(self):
+        match = self.extractor.parse_main(
+            "§ 5 Abs. " + ", ".join(str(i) for i in range(1, 501))
+        )
+        self.assertEqual(
+            [[["§", "5"], ["Abs", str(i)]] for i in range(1, 501)],
+            match,
+        )
+
+    def test_parse_matches(self):
+        text = (
+            "§ 123 Abs. 1 und 2 des Grundgesetzes, § 5 Grundgesetz, § 6 der "
+            "asdasd, § und § 5 Grundgesetz sowie § 5 BGB"
+        )
+        matches = list(StatutesExtractor(sample_laws_lookup).find_all(text))
+        records = self.extractor.parse_matches(matches, current_lawid="ABC")
+        self.assertEqual(
+            [
+                (0, "dict", "GG", [["§", "123"], ["Abs", "1"]]),
+                (0, "dict", "GG", [["§", "123"], ["Abs", "2"]]),
+                (38, "dict", "GG", [["§", "5"]]),
+                (55, "unknown", None, [["§", "6"]]),
+                (77, "dict", "GG", [["§", "5"]]),
+                (99, "internal", "ABC", [["§", "5"]]),
+            ],
+            [(r["start"], r["law_match_type"], r["lawid"], r["path"]) for r in records],
+        )
+        self.assertEqual(matches[1].end, records[2]["end"])
+        # Identical main areas are parsed once
+        self.assertIs(records[2]["path"], records[4]["path"])
+
+    def test_parse_matches_skip_errors(self):
+        text = "§ 5 SGB 14, § 6 und § 7 Grundgesetz"
+        matches = list(StatutesExtractor(sample_laws_lookup).find_all(text))
+        with self.assertRaises(KeyError):
+            self.extractor.parse_matches(matches)
+        records = self.extractor.parse_matches(matches, skip_errors=True)
+        self.assertEqual(
+            [("dict", "GG", [["§", "6"]]), ("dict", "GG", [["§", "7"]])],
+            [(r["law_match_type"], r["lawid"], r["path"]) for r in records],
+        )
+        self.assertEqual(1, self.extractor.diagnostics.counts["parse_law_error"])
+        self.assertEqual(
+            ["SGB 14"], self.extractor.diagnostics.samples["parse_law_error"]
+        )
+
+        with patch.object(self.extractor, "parse_main", side_effect=AssertionError):
+            records = self.extractor.parse_matches(matches, skip_errors=True)
+        self.assertEqual([], records)
+        # "§ 6 und § 7" is one match
+        self.assertEqual(2, self.extractor.diagnostics.counts["parse_main_error"])
+
+    def test_parse_main_match(self):
+        instrumentation = self.extractor.enable_instrumentation()
+        texts = sample_citations + generate_citations(2000)
+        n_matches = 0
+        for text in texts:
+            pos = 0
+            match = StatutesExtractor.search_main_area(text)
+            while match:
+                if match["main"]:
+                    n_matches += 1
+                    for compact in [False, True]:
+                        self.assertEqual(
+                            parse_result(self.extractor.parse_main, match[0], compact),
+                            parse_result(
+                                self.extractor.parse_main_match, match, compact
+                            ),
+                            (match[0], compact),
+                        )
+                pos = max(match.end(), match.start() + 1)
+                match = StatutesExtractor.search_main_area(text, pos)
+        # Most matches are parsed from the captures, even of random citations.
+        # parse_main_match is called twice per match.
+        fallbacks = instrumentation.counts["parse_main_match.fallback"]
+        self.assertLess(fallbacks, n_matches)
+
+    def test_parse_main_match_fallback(self):
+        instrumentation = self.extractor.enable_instrumentation()
+        match = StatutesExtractor.search_main_area("§ 123 Abs. 4 Satz 5 und 6")
+        self.assertEqual(
+            [
+                [["§", "123"], ["Abs", "4"], ["Satz", "5"]],
+                [["§", "123"], ["Abs", "4"], ["Satz", "6"]],
+            ],
+            self.extractor.parse_main_match(match),
+        )
+        self.assertEqual(0, instrumentation.counts["parse_main_match.fallback"])
+        self.assertEqual(0, instrumentation.calls["parse_main"])
+
+        # Numbers in words are parsed by parse_main
+        match = StatutesExtractor.search_main_area("§ 234 dritter Halbsatz")
+        self.assertEqual(
+            self.extractor.parse_main("§ 234 dritter Halbsatz"),
+            self.extractor.parse_main_match(match),
+        )
+        self.assertEqual(1, instrumentation.counts["parse_main_match.fallback"])
+
+    def test_fix_errors_in_citation(self):
+        citations = sample_citations + generate_citations(2000, seed=1)
+        citations += [
+            "§5 , bis\t7",
+            "§§5,\n\nbis 7, bis, bis 8 ,  bis  9",
+            "  § \u00a0 5\r\n",
+            "§ 5 F. und 6 FF und 7 ff. und iv f. und a) ff",
+        ]
+        for citation in citations:
+            fixed = self.extractor.fix_errors_in_citation(citation)
+            self.assertEqual(fix_errors_in_citation_by_subs(citation), fixed)
+            parts = [
+                part
+                for enum_part in self.extractor.split_citation_into_enum_parts(fixed)
+                for part in enum_part
+            ]
+            for part in parts:
+                self.assertEqual(
+                    join_ff_by_sub(part), numb_ff_pattern.sub(r"\1ff.", part)
+                )
+
+    def test_lawid_by_stem_cache(self):
+        self.assertEqual("GG", self.extractor.parse_law("Grundgesetzes", "dict"))
+        self.assertEqual({"grundgesetz": "GG"}, self.extractor.lawid_by_stem)
+        self.extractor.laws_lookup = {"grundgesetz": "GG-NEW"}
+        self.assertEqual({}, self.extractor.lawid_by_stem)
+        self.assertEqual("GG-NEW", self.extractor.parse_law("Grundgesetz", "dict"))
+
+    def test_law_text_cache(self):
+        parser = StatutesParser({"nothing": "SGB-IX"})
+        self.assertEqual(frozenset({"SGB-IX"}), parser.laws_lookup_values)
+        self.assertEqual("SGB-IX", parser.parse_law("SGB IX", "sgb"))
+        self.assertEqual({("SGB IX", "sgb"): "SGB-IX"}, parser.lawid_by_law_text)
+        parser.laws_lookup = {"nothing": "SGB-9"}
+        self.assertEqual({}, parser.lawid_by_law_text)
+        self.assertEqual("SGB-9", parser.parse_law("SGB IX", "sgb"))
+
+    def test_instrumentation(self):
+        instrumentation = self.extractor.enable_instrumentation()
+        text = "§ 5 Grundgesetz, § 6 des asdasd und § 7 SGB IX"
+        matches = list(StatutesExtractor(sample_laws_lookup).find_all(text))
+        self.extractor.parse_matches(matches, current_lawid="ABC")
+        self.assertEqual(
+            {"parse_law.dict": 1, "parse_law.unknown": 1, "parse_law.sgb": 1},
+            instrumentation.counts,
+        )
+        self.assertEqual(3, instrumentation.calls["parse_main"])
+        self.assertEqual(1, instrumentation.calls["get_sgb_lawid"])
+        self.extractor.disable_instrumentation()
+        self.assertIsNone(self.extractor.instrumentation)
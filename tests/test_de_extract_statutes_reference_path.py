@@ -0,0 +1,90 @@
+import gc
+import pickle
+import unittest
+
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.de_extract.statutes_reference_path import ReferencePath
+
+sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
+
+sample_citations = [
+    "§ 123 Abs. 3",
+    "§ ",
+    "§ 123, 135",
+    "§ 123 § 124",
+    "§ 123 Abs. 4 Satz 5 und 6",
+    "§ 111d Absatz 1 Satz 2",
+    "§ 123 Abs. 1, 2",
+    "§ 123 Abs. 1, Abs. 2",
+    "§ 123 Abs. 1 S. 2, 3 S. 4",
+    "§ 123 Abs. 1 S. 2, 3 Nr. 4",
+    "§ 123 Abs. 1, S. 3 Nr. 4",
+    "§ 234 dritter Halbsatz",
+    "§ 30 DRITTER ABSCHNITT",
+    "§§ 1 bis 10, 12 ff. und 15 Abs. 2 Satz 1 Nr. 3 Buchstabe a",
+    "Art. 3 Abs. 1 Satz 1, Abs. 3 Satz 1 i.V.m. Art. 20 Abs. 3",
+]
+
+
+class ReferencePathTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.parser = StatutesParser(sample_laws_lookup)
+
+    def test_compact_equals_lists(self):
+        for citation in sample_citations:
+            paths = self.parser.parse_main(citation, compact=True)
+            self.assertIsInstance(paths, tuple)
+            self.assertEqual(
+                self.parser.parse_main(citation),
+                [path.to_list() for path in paths],
+                citation,
+            )
+
+    def test_shared_prefix(self):
+        paths = self.parser.parse_main("§ 123 Abs. 4 Satz 5 und 6", compact=True)
+        self.assertIs(paths[0].parent, paths[1].parent)
+        self.assertEqual("Abs", paths[0].parent.unit_name)
+        self.assertEqual(3, len(paths[0]))
+        self.assertEqual([("§", "123"), ("Abs", "4"), ("Satz", "6")], list(paths[1]))
+
+    def test_interned(self):
+        path = self.parser.parse_main("§ 123 Abs. 4", compact=True)[0]
+        self.assertIs(path, self.parser.parse_main("§ 123 Abs. 4", compact=True)[0])
+        self.assertIs(path, ReferencePath.from_list([["§", "123"], ["Abs", "4"]]))
+        self.assertIs(path, pickle.loads(pickle.dumps(path)))
+        self.assertEqual(path, ReferencePath(path.parent, path.unit, "4"))
+        self.assertNotEqual(path, path.parent)
+        self.assertIsNone(path.ancestor(0))
+
+    def test_interned_paths_are_freed(self):
+        path = ReferencePath.from_list([["§", "98765"], ["Abs", "4"]])
+        key = (id(path.parent), path.unit, "4")
+        self.assertIs(path, ReferencePath._interned[key])
+        n_interned = len(ReferencePath._interned)
+        del path
+        gc.collect()
+        self.assertNotIn(key, ReferencePath._interned)
+        self.assertEqual(n_interned - 2, len(ReferencePath._interned))
+
+    def test_cached_citation_parts(self):
+        parser = StatutesParser(sample_laws_lookup)
+        paths = parser.parse_main("§ 5 Abs. 1 und Abs. 1", compact=True)
+        self.assertIs(paths[0], paths[1])
+        self.assertEqual(
+            {"§ 5 Abs. 1": (("§", "5"), ("Abs", "1")), "Abs. 1": (("Abs", "1"),)},
+            {key: value[0] for key, value in parser.citation_parts.items()},
+        )
+
+        # Conditions are reported on each call as in the list mode
+        for compact in [False, True]:
+            parser = StatutesParser(sample_laws_lookup)
+            for _ in range(3):
+                parser.parse_main("§ 5 Abs.", compact=compact)
+            self.assertEqual(3, parser.diagnostics.counts["trailing_unit"], compact)
+
+    def test_citation_parts_cache_size(self):
+        parser = StatutesParser(sample_laws_lookup)
+        parser.max_cached_citation_parts = 2
+        for idx in range(5):
+            parser.parse_main(f"§ {idx}", compact=True)
+        self.assertLessEqual(len(parser.citation_parts), 2)
@@ -0,0 +1,153 @@
+import io
+import unittest
+
+from lxml import etree
+
+from quantlaw.de_extract.statutes_areas import StatutesExtractor
+from quantlaw.de_extract.statutes_parse import StatutesParser
+from quantlaw.de_extract.statutes_xml import annotate_element, annotate_statutes_xml
+
+sample_laws_lookup = {"buergerlich gesetzbuch": "BGB", "grundgesetz": "GG"}
+
+sample_xml = """<?xml version="1.0" encoding="utf-8"?>
+<document key="ABC"><heading>Gesetz &amp; § 1</heading>
+  <item><seqitem heading="§ 1"><text>Nach § 5 Abs. 2 des <b>Grundgesetzes</b>
+  und § 6 gilt <!-- c --> Art. 3 Grundgesetz.</text></seqitem>tail
+  <seqitem><text>Siehe <reference>§ 9</reference> und § 7 Abs</text></seqitem></item>
+end</document>"""
+
+
+class DeExtractStatutesXmlTestCase(unittest.TestCase):
+    def setUp(self):
+        self.extractor = StatutesExtractor(sample_laws_lookup)
+        self.parser = StatutesParser(sample_laws_lookup)
+
+    def annotate(self, xml, **kwargs):
+        target = io.BytesIO()
+        annotate_statutes_xml(
+            io.BytesIO(xml.encode("utf-8")), target, self.extractor, **kwargs
+        )
+        return etree.fromstring(target.getvalue())
+
+    def test_annotate(self):
+        root = self.annotate(sample_xml, parser=self.parser, current_lawid="ABC")
+        references = root.findall(".//reference")
+        self.assertEqual(
+            [
+                ("dict", "GG", '[[["§", "5"], ["Abs", "2"]]]', ["main"]),
+                ("internal", "ABC", '[[["§", "6"]]]', ["main"]),
+                ("dict", "GG", '[[["Art", "3"]]]', ["main", "suffix", "lawname"]),
+                (None, None, None, []),
+                ("internal", "ABC", '[[["§", "7"]]]', ["main"]),
+            ],
+            [
+                (
+                    r.get("law_match_type"),
+                    r.get("lawid"),
+                    r.get("parsed"),
+                    [c.tag for c in r],
+                )
+                for r in references
+            ],
+        )
+        self.assertEqual("Art. 3", references[2].findtext("main"))
+        self.assertEqual("Grundgesetz", references[2].findtext("lawname"))
+
+        # Texts and elements outside of references are unchanged
+        original = etree.fromstring(sample_xml.encode("utf-8"))
+        self.assertEqual("".join(original.itertext()), "".join(root.itertext()))
+        etree.strip_tags(root, "main", "suffix", "lawname", "reference")
+        etree.strip_tags(original, "reference")
+        self.assertEqual(
+            etree.tostring(original, encoding="unicode"),
+            etree.tostring(root, encoding="unicode"),
+        )
+
+    def test_annotate_equals_annotate_element(self):
+        items = "".join(
+            f"<item><heading>Teil {i}</heading>"
+            + "".join(
+                f"<seqitem><text>§ {j} gilt nach § {i} Abs. {j} des "
+                f"Grundgesetzes.</text></seqitem>\n"
+                for j in range(20)
+            )
+            + "</item>"
+            for i in range(10)
+        )
+        xml = f'<document key="ABC">{items}</document>'
+        root = self.annotate(xml, parser=self.parser)
+
+        expected = etree.fromstring(xml)
+        for seqitem in expected.iter("seqitem"):
+            annotate_element(seqitem, self.extractor, self.parser)
+        self.assertEqual(
+            etree.tostring(expected, encoding="unicode"),
+            etree.tostring(root, encoding="unicode"),
+        )
+        self.assertEqual(400, len(root.findall(".//reference")))
+
+    def test_annotate_without_parser(self):
+        root = self.annotate(sample_xml, norm_tags=["document"])
+        references = root.findall(".//reference")
+        self.assertEqual("§ 1", references[0].findtext("main"))
+        self.assertEqual(6, len(references))
+        self.assertIsNone(references[0].get("parsed"))
+        self.assertIsNone(references[0].get("lawid"))
+
+    def test_annotate_comments_and_processing_instructions(self):
+        xml = (
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            "<!--before--><document><!--first--> Siehe <?pi data?> § 5 GG"
+            "<item>Text<!--inner--> Art. 3</item>tail<!--last--> end</document>"
+            "<?after?>"
+        )
+        target = io.BytesIO()
+        annotate_statutes_xml(
+            io.BytesIO(xml.encode("utf-8")),
+            target,
+            self.extractor,
+            norm_tags=("nothing",),
+        )
+        self.assertEqual(
+            etree.tostring(etree.fromstring(xml.encode("utf-8")).getroottree()),
+            etree.tostring(etree.fromstring(target.getvalue()).getroottree()),
+        )
+
+        root = self.annotate(xml, norm_tags=("item",))
+        self.assertEqual(
+            "Text<!--inner--> <reference",
+            etree.tostring(root.find("item"), encoding="unicode")[6:33],
+        )
+        self.assertEqual("Art. 3", root.findtext("item/reference/main"))
+        self.assertEqual(" Siehe  § 5 GGText Art. 3tail end", "".join(root.itertext()))
+
+        root = self.annotate(xml, norm_tags=("document",))
+        self.assertEqual(2, len(root.findall(".//reference")))
+
+    def test_annotate_round_trip(self):
+        xml = (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<!-- header --><a:document xmlns:a="urn:a" xmlns="urn:default" k="v">'
+            "<?style x?>\n  <heading>§ 1 <!--c--> Text</heading>"
+            '<item xmlns:b="urn:b"><b:text b:attr="1">§ 5 Grundgesetz<!--c2--></b:text>'
+            '<text xmlns="urn:other">Art. 3 GG</text>tail</item>\n'
+            "<empty/><a:x>&amp;&lt;</a:x></a:document>"
+        )
+        target = io.BytesIO()
+        annotate_statutes_xml(
+            io.BytesIO(xml.encode("utf-8")),
+            target,
+            self.extractor,
+            norm_tags=("nothing",),
+        )
+        output = target.getvalue()
+        self.assertEqual(
+            etree.tostring(
+                etree.fromstring(xml.encode("utf-8")).getroottree(), method="c14n"
+            ),
+            etree.tostring(etree.fromstring(output).getroottree(), method="c14n"),
+        )
+        # Namespaces are declared once
+        self.assertEqual(1, output.count(b'xmlns:a="urn:a"'))
+        self.assertEqual(1, output.count(b'xmlns="urn:default"'))
+        self.assertEqual(1, output.count(b'xmlns:b="urn:b"'))
@@ -1,12 +1,15 @@
+import subprocess
+import sys
 import unittest
-from pkg_resources import DistributionNotFound
 from unittest.mock import patch
 
 from quantlaw import get_quantlaw_package_version
 
 
 def version_test_side_effect(args):
-    raise DistributionNotFound()
+    from importlib.metadata import PackageNotFoundError
+
+    raise PackageNotFoundError()
 
 
 class InitTestCase(unittest.TestCase):
@@ -14,7 +17,31 @@ class InitTestCase(unittest.TestCase):
         version = get_quantlaw_package_version()
         self.assertNotEqual("unknown", version)
 
-        with patch("pkg_resources.get_distribution") as mock:
+    @unittest.skipIf(sys.version_info < (3, 8), "importlib.metadata is not available")
+    def test_version_unknown(self):
+        with patch("importlib.metadata.version") as mock:
             mock.side_effect = version_test_side_effect
             version = get_quantlaw_package_version()
             self.assertEqual("unknown", version)
+
+    def test_import_is_lazy(self):
+        # Heavy dependencies and large patterns are loaded on first use only
+        script = (
+            "import sys\n"
+            "import quantlaw.de_extract.statutes_parse\n"
+            "import quantlaw.utils.networkx\n"
+            "import quantlaw.utils.beautiful_soup\n"
+            "from quantlaw.de_extract import statutes_areas_patterns as p\n"
+            "print(sorted(\n"
+            "    {'numpy', 'pandas', 'networkx', 'bs4', 'requests', 'pkg_resources'}\n"
+            "    & set(sys.modules)\n"
+            "))\n"
+            "print(p.reference_range_pattern.is_compiled)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        self.assertEqual("[]\nFalse\n", output)
@@ -1,8 +1,162 @@
+import json
+import os
+import tempfile
+import zipfile
 from unittest import TestCase
+from unittest.mock import patch
 
-from quantlaw.de_extract.load_statute_names import load_law_names
+from quantlaw.de_extract import load_statute_names
+from quantlaw.de_extract.load_statute_names import (
+    combine_law_names,
+    load_law_names,
+    load_law_names_incrementally,
+    update_law_names,
+)
+
+
+def law_xml(abk, name):
+    return (
+        "<dokumente><norm><metadaten>"
+        f"<jurabk>{abk}</jurabk><langue>{name}</langue>"
+        "</metadaten></norm></dokumente>"
+    )
 
 
 class LoadStatueNamesTestCase(TestCase):
     def test_load_statue_names(self):
         load_law_names("2020-10-20", "test_law_names.json")
+
+
+class UpdateLawNamesTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = self.tempdir.name
+        self.manifest = os.path.join(self.folder, "manifest.json")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write_zip(self, date, members):
+        path = os.path.join(self.folder, f"{date}.zip")
+        with zipfile.ZipFile(path, "w") as zip_file:
+            zip_file.writestr(f"gesetze-im-internet-{date}/README.md", "readme")
+            for name, content in members.items():
+                zip_file.writestr(f"gesetze-im-internet-{date}/{name}", content)
+        return path
+
+    def test_update(self):
+        first = self.write_zip(
+            "2020-01-01",
+            {
+                "a/a.xml": law_xml("ABC", "Abc-Gesetz"),
+                "b/b.xml": law_xml("BGB", "Bürgerliches Gesetzbuch"),
+                "c/c.xml": "<dokumente/>",
+            },
+        )
+        law_names, changes = update_law_names(first, self.manifest)
+        self.assertEqual(
+            {
+                "abc": "abc",
+                "abc-gesetz": "abc",
+                "bgb": "bgb",
+                "buergerlich gesetzbuch": "bgb",
+            },
+            law_names,
+        )
+        self.assertEqual(["a/a.xml", "b/b.xml", "c/c.xml"], changes["members_added"])
+        self.assertEqual(law_names, changes["names_added"])
+
+        second = self.write_zip(
+            "2020-01-02",
+            {
+                "a/a.xml": law_xml("ABC", "Abc-Gesetz"),
+                "b/b.xml": law_xml("BGB2", "Bürgerliches Gesetzbuch"),
+                "d/d.xml": law_xml("D", "D-Gesetz"),
+                "c/c.xml": "<dokumente/>",
+            },
+        )
+        with patch(
+            "quantlaw.de_extract.load_statute_names.parse_law_names_member",
+            wraps=load_statute_names.parse_law_names_member,
+        ) as parse_member:
+            law_names, changes = update_law_names(second, self.manifest)
+        self.assertEqual(2, parse_member.call_count)
+        self.assertEqual(["d/d.xml"], changes["members_added"])
+        self.assertEqual(["b/b.xml"], changes["members_changed"])
+        self.assertEqual([], changes["members_removed"])
+        self.assertEqual(
+            {"bgb2": "bgb2", "d": "d", "d-gesetz": "d"}, changes["names_added"]
+        )
+        self.assertEqual(
+            {"buergerlich gesetzbuch": ["bgb", "bgb2"]}, changes["names_changed"]
+        )
+        self.assertEqual(["bgb"], changes["names_removed"])
+
+        third = self.write_zip("2020-01-03", {"d/d.xml": law_xml("D", "D-Gesetz")})
+        law_names, changes = update_law_names(third, self.manifest)
+        self.assertEqual({"d": "d", "d-gesetz": "d"}, law_names)
+        self.assertEqual(["a/a.xml", "b/b.xml", "c/c.xml"], changes["members_removed"])
+        self.assertEqual([], changes["members_added"] + changes["members_changed"])
+
+    def test_shared_names(self):
+        snapshots = [
+            {"a/a.xml": law_xml("ABC", "Gesetz"), "b/b.xml": law_xml("B", "Gesetz")},
+            {"a/a.xml": law_xml("ABC", "Gesetz")},
+            {"a/a.xml": law_xml("A", "Gesetz"), "c/c.xml": law_xml("C", "C-Gesetz")},
+            {"c/c.xml": law_xml("C", "Gesetz")},
+        ]
+        expected_changes = [
+            {"abc": "abc", "b": "b", "gesetz": "b"},
+            {"gesetz": ["b", "abc"]},
+            {"gesetz": ["abc", "a"]},
+            {"gesetz": ["a", "c"]},
+        ]
+        for idx, (members, expected) in enumerate(zip(snapshots, expected_changes)):
+            path = self.write_zip(f"2020-01-0{idx + 1}", members)
+            law_names, changes = update_law_names(path, self.manifest)
+            with open(self.manifest, encoding="utf8") as f:
+                self.assertEqual(combine_law_names(json.load(f)["members"]), law_names)
+            self.assertEqual(
+                expected, changes["names_changed"] if idx else changes["names_added"]
+            )
+        self.assertEqual({"c": "c", "gesetz": "c"}, law_names)
+        self.assertEqual(["a", "c-gesetz"], changes["names_removed"])
+
+    def test_members_only_manifest(self):
+        first = self.write_zip("2020-01-01", {"a/a.xml": law_xml("ABC", "Gesetz")})
+        update_law_names(first, self.manifest)
+        with open(self.manifest, encoding="utf8") as f:
+            members = json.load(f)["members"]
+        with open(self.manifest, "w", encoding="utf8") as f:
+            json.dump(dict(members=members), f)
+
+        second = self.write_zip("2020-01-02", {"b/b.xml": law_xml("B", "Gesetz")})
+        law_names, changes = update_law_names(second, self.manifest)
+        self.assertEqual({"b": "b", "gesetz": "b"}, law_names)
+        self.assertEqual({"b": "b"}, changes["names_added"])
+        self.assertEqual({"gesetz": ["abc", "b"]}, changes["names_changed"])
+        self.assertEqual(["abc"], changes["names_removed"])
+
+    def test_load_law_names_incrementally(self):
+        members = {"a/a.xml": law_xml("ABC", "Abc-Gesetz")}
+        path = os.path.join(self.folder, "law_names.json")
+        changelog_path = os.path.join(self.folder, "changes.json")
+
+        def download(date, zip_path):
+            os.rename(self.write_zip(date, members), zip_path)
+
+        with patch(
+            "quantlaw.de_extract.load_statute_names.download_law_names_archive",
+            download,
+        ):
+            changes = load_law_names_incrementally(
+                "2020-01-01", path, self.manifest, changelog_path
+            )
+            self.assertFalse(os.path.exists(path + ".zip"))
+            with open(changelog_path, encoding="utf8") as f:
+                self.assertEqual(changes, json.load(f))
+            with open(path, encoding="utf8") as f:
+                self.assertEqual({"abc": "abc", "abc-gesetz": "abc"}, json.load(f))
+
+            changes = load_law_names_incrementally("2020-01-02", path, self.manifest)
+            self.assertEqual([], changes["members_added"] + changes["members_changed"])
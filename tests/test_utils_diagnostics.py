@@ -0,0 +1,61 @@
+import io
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+
+from quantlaw.utils.diagnostics import Diagnostics
+
+
+class UtilsDiagnosticsTestCase(TestCase):
+    def test_report(self):
+        diagnostics = Diagnostics(max_samples=2)
+        for sample in ["a", "b", "c"]:
+            diagnostics.report("x", sample)
+        self.assertEqual({"x": 3}, diagnostics.counts)
+        self.assertEqual({"x": ["a", "b"]}, diagnostics.samples)
+
+        data = diagnostics.to_dict()
+        diagnostics.clear()
+        self.assertEqual(dict(counts={}, samples={}), diagnostics.to_dict())
+        # The dict is not changed by the object
+        self.assertEqual(dict(counts={"x": 3}, samples={"x": ["a", "b"]}), data)
+
+    def test_echo(self):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            Diagnostics().report("x", "a")
+            Diagnostics(echo=True).report("y", "b")
+        self.assertEqual("y: b\n", stdout.getvalue())
+
+    def test_merge(self):
+        a = Diagnostics(max_samples=3, counts={"x": 2}, samples={"x": ["a", "b"]})
+        b = Diagnostics(counts={"x": 2, "y": 1}, samples={"x": ["c", "d"], "y": ["e"]})
+        self.assertIs(a, a.merge(b))
+        self.assertEqual(
+            dict(counts={"x": 4, "y": 1}, samples={"x": ["a", "b", "c"], "y": ["e"]}),
+            a.to_dict(),
+        )
+
+    def test_pickle_and_json(self):
+        diagnostics = Diagnostics(max_samples=1)
+        diagnostics.report("x", "§ 5 Abs.")
+        restored = pickle.loads(pickle.dumps(diagnostics))
+        self.assertEqual(diagnostics.to_dict(), restored.to_dict())
+        self.assertEqual(1, restored.max_samples)
+        self.assertEqual(
+            diagnostics.to_dict(),
+            Diagnostics.from_dict(json.loads(diagnostics.to_json())).to_dict(),
+        )
+
+    def test_threads(self):
+        diagnostics = Diagnostics()
+
+        def report(i):
+            for _ in range(1000):
+                diagnostics.report("x", str(i))
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(report, range(8)))
+        self.assertEqual(8000, diagnostics.counts["x"])
+        self.assertEqual(10, len(diagnostics.samples["x"]))
@@ -0,0 +1,57 @@
+import json
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from quantlaw.utils.instrumentation import Instrumentation
+
+
+class UtilsInstrumentationTestCase(TestCase):
+    def test_timed(self):
+        instrumentation = Instrumentation()
+        func = instrumentation.timed("add", lambda a, b: a + b)
+        self.assertEqual(3, func(1, 2))
+        self.assertEqual(5, func(2, 3))
+        self.assertEqual(2, instrumentation.calls["add"])
+        self.assertGreater(instrumentation.seconds["add"], 0)
+
+    def test_timed_exception(self):
+        instrumentation = Instrumentation()
+
+        def fail():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            instrumentation.timed("fail", fail)()
+        self.assertEqual(1, instrumentation.calls["fail"])
+
+    def test_merge(self):
+        a = Instrumentation(calls={"x": 1}, seconds={"x": 0.5}, counts={"dict": 2})
+        b = Instrumentation(calls={"x": 2}, seconds={"x": 1.0}, counts={"sgb": 1})
+        self.assertIs(a, a.merge(b, b))
+        self.assertEqual(
+            dict(
+                calls={"x": 5},
+                seconds={"x": 2.5},
+                counts={"dict": 2, "sgb": 2},
+            ),
+            a.to_dict(),
+        )
+
+    def test_pickle_and_json(self):
+        instrumentation = Instrumentation()
+        instrumentation.count("dict", 3)
+        instrumentation.timed("x", lambda: None)()
+        restored = pickle.loads(pickle.dumps(instrumentation))
+        self.assertEqual(instrumentation.to_dict(), restored.to_dict())
+        self.assertEqual(
+            instrumentation.to_dict(),
+            Instrumentation.from_dict(json.loads(instrumentation.to_json())).to_dict(),
+        )
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "instrumentation.json")
+            instrumentation.to_json(path)
+            with open(path, encoding="utf8") as f:
+                self.assertEqual(instrumentation.to_dict(), json.load(f))
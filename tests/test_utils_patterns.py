@@ -0,0 +1,37 @@
+import pickle
+import unittest
+
+from regex import regex
+
+from quantlaw.utils.patterns import LazyPattern
+
+
+class LazyPatternTestCase(unittest.TestCase):
+    def test_compiled_on_first_use(self):
+        pattern = LazyPattern(r"§\s*(\d+)", flags=regex.IGNORECASE)
+        self.assertFalse(pattern.is_compiled)
+        self.assertEqual("5", pattern.search("nach § 5 BGB")[1])
+        self.assertTrue(pattern.is_compiled)
+        self.assertEqual(regex.IGNORECASE, pattern.flags & regex.IGNORECASE)
+        self.assertEqual(["5", "6"], pattern.findall("§ 5 und §6"))
+
+    def test_attributes_cached(self):
+        pattern = LazyPattern(r"a+")
+        compiled = pattern.compile()
+        self.assertIs(compiled, pattern.compile())
+        self.assertEqual(compiled.match, pattern.match)
+        self.assertIn("match", vars(pattern))
+
+    def test_missing_attribute(self):
+        pattern = LazyPattern(r"a+")
+        with self.assertRaises(AttributeError):
+            pattern.no_attribute
+        with self.assertRaises(AttributeError):
+            pattern.__no_attribute__
+
+    def test_pickle(self):
+        pattern = LazyPattern(r"a+", flags=regex.IGNORECASE)
+        pattern.search("a")
+        unpickled = pickle.loads(pickle.dumps(pattern))
+        self.assertFalse(unpickled.is_compiled)
+        self.assertEqual("AA", unpickled.search("bAA")[0])
@@ -1,3 +1,6 @@
+import os
+import tempfile
+import time
 import unittest
 
 from quantlaw.utils.pipeline import PipelineStep
@@ -40,3 +43,226 @@ class PipelineTestCase(unittest.TestCase):
         self.assertEqual(["xaayaz", "xccyaz", "xcaadyaz"], result)
         result = step.execute_filtered_items(items)
         self.assertEqual(["xaayaz", "xbabyaz", "xccyaz", "xcaadyaz"], result)
+
+
+class CostStep(PipelineStep):
+    max_number_of_processes = 2
+    largest_first = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executed = []
+
+    def get_item_cost(self, item):
+        return len(item)
+
+    def execute_item(self, item, arg1):
+        self.executed.append(item)
+        return f"x{item}y{arg1}z"
+
+
+class ChunkedCostStep(CostStep):
+    chunksize = 4
+
+    def get_chunks(self, *args, **kwargs):
+        chunks = super().get_chunks(*args, **kwargs)
+        self.chunk_sizes = [len(chunk) for chunk in chunks]
+        return chunks
+
+
+class LargestFirstTestCase(unittest.TestCase):
+    items = ["a", "bbbb", "cc", "ddddddd", "eee"]
+
+    def test_results_in_order(self):
+        step = CostStep(execute_args=["a"])
+        result = step.execute_items(self.items)
+        self.assertEqual([f"x{i}yaz" for i in self.items], result)
+        self.assertEqual([1, 4, 2, 7, 3], step.item_costs)
+        self.assertEqual(5, len(step.item_durations))
+        self.assertTrue(all(seconds >= 0 for seconds in step.item_durations))
+
+    def test_execution_order(self):
+        step = CostStep(processes=1, execute_args=["a"])
+        result = step.execute_items(self.items)
+        self.assertEqual([f"x{i}yaz" for i in self.items], result)
+        self.assertEqual(["ddddddd", "bbbb", "eee", "cc", "a"], step.executed)
+
+    def test_duration_stats(self):
+        step = CostStep(processes=1, execute_args=["a"])
+        self.assertEqual({}, step.get_duration_stats())
+        step.execute_items(self.items)
+        stats = step.get_duration_stats()
+        self.assertEqual(5, stats["count"])
+        self.assertAlmostEqual(sum(step.item_durations), stats["total"])
+        self.assertAlmostEqual(stats["total"] / 17, stats["seconds_per_cost"])
+        self.assertIsNone(stats["chunksize"])
+
+    def test_chunks(self):
+        step = CostStep()
+        tasks = list(range(20))
+        chunks = step.get_chunks(tasks, [1] * 20, 2)
+        self.assertEqual(tasks, [task for chunk in chunks for task in chunk])
+        self.assertEqual(
+            [5, 3, 3, 2, 1, 1, 1, 1, 1, 1, 1], [len(chunk) for chunk in chunks]
+        )
+
+        # Chunks are limited by cost, the tail is dispatched one by one
+        costs = [100, 90, 80] + [10] * 30 + [1] * 40
+        chunks = step.get_chunks(list(range(len(costs))), costs, 4)
+        sizes = [len(chunk) for chunk in chunks]
+        self.assertEqual([1, 1, 1, 4, 3], sizes[:5])
+        self.assertEqual([1] * 8, sizes[-8:])
+
+    def test_chunks_without_costs(self):
+        chunks = CostStep().get_chunks(list(range(50)), [0] * 50, 2)
+        self.assertEqual(13, len(chunks[0]))
+        self.assertEqual(1, len(chunks[-1]))
+
+    def test_chunks_min_chunksize(self):
+        chunks = CostStep().get_chunks(list(range(50)), [1] * 50, 2, 4)
+        self.assertTrue(all(len(chunk) >= 4 for chunk in chunks[:-1]))
+        self.assertEqual(50, sum(len(chunk) for chunk in chunks))
+
+    def test_min_chunksize(self):
+        step = ChunkedCostStep(execute_args=["a"])
+        items = [str(i) * (50 - i) for i in range(50)]
+        self.assertEqual([f"x{i}yaz" for i in items], step.execute_items(items))
+        self.assertTrue(all(size >= 4 for size in step.chunk_sizes[:-1]))
+        self.assertEqual(50, sum(step.chunk_sizes))
+
+    def test_file_size_cost(self):
+        step = PipelineStep()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "a.xml")
+            with open(path, "w") as f:
+                f.write("12345")
+            self.assertEqual(5, step.get_item_cost(path))
+            self.assertEqual(0, step.get_item_cost(os.path.join(folder, "b.xml")))
+        self.assertEqual(0, step.get_item_cost(5))
+
+
+class AdaptiveStep(SampleStep):
+    adaptive_chunksize = True
+    max_ipc_overhead_fraction = 0.05
+
+
+class AdaptiveCostStep(CostStep):
+    adaptive_chunksize = True
+    max_ipc_overhead_fraction = 0.05
+
+
+class AdaptiveSleepStep(AdaptiveStep):
+    def execute_item(self, item):
+        time.sleep(item)
+        return item
+
+
+class AdaptiveChunksizeTestCase(unittest.TestCase):
+    def test_results_in_order(self):
+        step = AdaptiveStep(execute_args=["a"])
+        result = step.execute_items(range(50))
+        self.assertEqual([f"x{i}yaz" for i in range(50)], result)
+        self.assertEqual(50, len(step.item_durations))
+        self.assertGreaterEqual(step.chosen_chunksize, 1)
+        self.assertLessEqual(step.chosen_chunksize, 6)
+        self.assertTrue(0 <= step.ipc_overhead_fraction <= 1)
+
+    def test_no_items_after_warmup(self):
+        step = AdaptiveStep(execute_args=["a"])
+        self.assertEqual(["x1yaz", "x2yaz"], step.execute_items([1, 2]))
+        self.assertIsNone(step.chosen_chunksize)
+
+    def test_tune_chunksize_fast_items(self):
+        # 1 ms overhead per chunk, 0.1 ms per item
+        step = AdaptiveStep()
+        chunksize = step.tune_chunksize(0.001, [0.0001] * 4, 2, 10000)
+        self.assertEqual(190, chunksize)
+        self.assertAlmostEqual(0.05, step.ipc_overhead_fraction)
+
+        # Four chunks per process at most
+        self.assertEqual(13, step.tune_chunksize(0.001, [0.0001] * 4, 2, 100))
+        self.assertEqual(13, step.chosen_chunksize)
+
+    def test_tune_chunksize_slow_items(self):
+        step = AdaptiveStep()
+        self.assertEqual(1, step.tune_chunksize(0.0005, [1.0] * 4, 2, 10000))
+        self.assertAlmostEqual(0.0005 / 1.0005, step.ipc_overhead_fraction)
+
+        # 16 items of 1 to 3 seconds with 1 ms overhead
+        durations = [1 + i / 8 for i in range(16)]
+        self.assertEqual(1, step.tune_chunksize(0.001, durations, 8, 1000))
+        self.assertLess(step.ipc_overhead_fraction, 0.001)
+
+    def test_tune_chunksize_instant_items(self):
+        step = AdaptiveStep()
+        self.assertEqual(125, step.tune_chunksize(0.0005, [0.0] * 4, 2, 1000))
+        self.assertEqual(1.0, step.ipc_overhead_fraction)
+
+    def test_skewed_warmup(self):
+        step = AdaptiveSleepStep()
+        items = [0.04, 0.005, 0.005, 0.005] + [0.001] * 40
+        self.assertEqual(items, step.execute_items(items))
+        stats = step.get_duration_stats()
+        self.assertEqual(step.chosen_chunksize, stats["chunksize"])
+        self.assertEqual(step.ipc_overhead_fraction, stats["ipc_overhead_fraction"])
+
+    def test_estimate_overhead_skewed(self):
+        # Process 1 executes a slow item, while process 2 executes the other items
+        # of the warm-up and is idle at its end. Each process takes 0.1 s to start,
+        # the communication takes 1 ms each way.
+        stamps = [
+            (2, 0.0, 0.1, 0.15, 0.151),
+            (2, 0.151, 0.152, 0.202, 0.203),
+            (2, 0.203, 0.204, 0.254, 0.255),
+            (1, 0.0, 0.1, 0.5, 0.501),
+        ]
+        overhead = AdaptiveStep().estimate_overhead(stamps)
+        self.assertAlmostEqual(0.002, overhead)
+
+        step = AdaptiveStep()
+        self.assertEqual(1, step.tune_chunksize(overhead, [0.4, 0.05, 0.05], 2, 80))
+        self.assertLess(step.ipc_overhead_fraction, 0.05)
+
+    def test_estimate_overhead_first_tasks(self):
+        # The time to start is unknown if each process executed one task only
+        stamps = [(1, 0.0, 0.1, 0.2, 0.201), (2, 0.0, 0.1, 0.3, 0.303)]
+        self.assertAlmostEqual(0.004, AdaptiveStep().estimate_overhead(stamps))
+
+        # Timestamps of different clocks must not result in negative overheads
+        stamps = [(1, 0.0, 0.1, 0.2, 0.199), (1, 0.2, 0.199, 0.3, 0.301)]
+        self.assertAlmostEqual(0.0005, AdaptiveStep().estimate_overhead(stamps))
+
+    def test_estimate_durations(self):
+        costs = [100, 50, 2, 1]
+        durations = [1.0, 0.5, None, None]
+        warmup_tasks = [(0, "a"), (1, "b")]
+        tasks = [(2, "c"), (3, "d")]
+        estimated = AdaptiveCostStep().estimate_durations(
+            warmup_tasks, tasks, costs, durations
+        )
+        self.assertEqual(2, len(estimated))
+        self.assertAlmostEqual(0.02, estimated[0])
+        self.assertAlmostEqual(0.01, estimated[1])
+
+        # Without costs or largest_first, the warm-up durations are used
+        self.assertEqual(
+            [1.0, 0.5],
+            AdaptiveCostStep().estimate_durations(
+                warmup_tasks, tasks, [0] * 4, durations
+            ),
+        )
+        self.assertEqual(
+            [1.0, 0.5],
+            AdaptiveStep().estimate_durations(warmup_tasks, tasks, costs, durations),
+        )
+
+    def test_largest_first(self):
+        step = AdaptiveCostStep(execute_args=["a"])
+        items = [str(i) * (50 - i) for i in range(50)]
+        self.assertEqual([f"x{i}yaz" for i in items], step.execute_items(items))
+        self.assertEqual(step.chosen_chunksize, step.get_duration_stats()["chunksize"])
+
+    def test_warmup_error(self):
+        step = AdaptiveSleepStep()
+        with self.assertRaises(ValueError):
+            step.execute_items([0.01, -1, 0.01, 0.01, 0.01])